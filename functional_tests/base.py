@@ -1,6 +1,8 @@
 from django.contrib.staticfiles.testing import StaticLiveServerTestCase
 from django.contrib.auth.models import User
+from django.core.cache import cache
 from django.utils import timezone
+from vlog.ratelimit import reset_rate_limits
 from selenium import webdriver
 from selenium.webdriver.common.keys import Keys
 from selenium.webdriver.common.action_chains import ActionChains
@@ -12,6 +14,8 @@ class JugglingWebsiteTest(StaticLiveServerTestCase):
     MAX_WAIT = 10
 
     def setUp(self):
+        cache.clear()
+        reset_rate_limits()
         self.browser = webdriver.Firefox()
 
     def tearDown(self):
@@ -35,6 +39,8 @@ class JugglingWebsiteTest(StaticLiveServerTestCase):
 class AdminAndSiteVisitorTest(JugglingWebsiteTest):
 
     def setUp(self):
+        cache.clear()
+        reset_rate_limits()
         ## self.browser is the main browser (i.e. the site visitor), self.jj_browser is the admin browser
         self.browser = webdriver.Firefox()
         self.jj_browser = webdriver.Firefox()
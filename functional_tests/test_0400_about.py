@@ -1,6 +1,7 @@
 from os import environ as os_environ
 from .base import AdminAndSiteVisitorTest
 from django.core import mail
+from django.core.management import call_command
 from selenium.webdriver.common.action_chains import ActionChains
 
 class T04AboutPagesTest(AdminAndSiteVisitorTest):
@@ -84,7 +85,8 @@ class T04AboutPagesTest(AdminAndSiteVisitorTest):
         # A message appears to say that the message has been sent
         self.wait_for(lambda: self.assertIn("Your message has been sent!", self.browser.find_element_by_tag_name('body').text))
 
-        # JJ receives an email
+        # The mail worker runs and JJ receives an email
+        call_command('send_queued_mail')
         email = mail.outbox[0]
         self.assertIn(os_environ.get('EMAIL_ADDRESS'), email.to)
         self.assertIn(visitor_message['message'], email.body)
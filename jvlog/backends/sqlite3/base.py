@@ -0,0 +1,23 @@
+"""
+SQLite database backend that runs OPTIONS['init_command'] on each new connection
+
+This is used to switch on WAL mode and tune the connection (see SQLITE_INIT_COMMAND in jvlog/database.py),
+so that comment posts do not block the readers serving pages. Django only supports init_command
+for SQLite from version 5.1, so the option is handled here for the versions this project supports.
+"""
+from django.db.backends.sqlite3 import base
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+
+    def get_connection_params(self):
+        params = super().get_connection_params()
+        self.init_command = params.pop('init_command', '')
+        return params
+
+    def get_new_connection(self, conn_params):
+        conn = super().get_new_connection(conn_params)
+        for statement in self.init_command.split(';'):
+            if statement.strip():
+                conn.execute(statement)
+        return conn
@@ -0,0 +1,62 @@
+"""
+Database configuration from environment variables
+
+DJANGO_DB_ENGINE is 'sqlite' (the default) or 'postgresql'.
+SQLite uses DJANGO_DB_NAME as the database file (db.sqlite3 in the project directory by default).
+PostgreSQL uses DJANGO_DB_NAME, DJANGO_DB_USER, DJANGO_DB_PASSWORD, DJANGO_DB_HOST and DJANGO_DB_PORT.
+Connections are kept open for DJANGO_CONN_MAX_AGE seconds and reused by later requests. When
+DJANGO_DB_POOLER is set, connections go through an external transaction pooler such as PgBouncer,
+which cannot hold server-side cursors open between transactions.
+
+Setting DJANGO_DB_REPLICA_HOST (PostgreSQL) or DJANGO_DB_REPLICA_NAME (SQLite) adds a 'replica' database
+with the same settings, which jvlog.routers.PrimaryReplicaRouter uses for read-only views.
+"""
+
+# SQLite runs in WAL mode so that readers are not blocked while a comment is being written.
+# synchronous=NORMAL is safe in WAL mode (a power cut can lose the last commits, but not corrupt the database),
+# and mmap_size lets reads come straight from the memory-mapped file.
+SQLITE_INIT_COMMAND = 'PRAGMA journal_mode = WAL; PRAGMA synchronous = NORMAL; PRAGMA mmap_size = 268435456'
+
+
+def get_databases(environ, base_dir):
+    """
+    Returns the DATABASES setting for the given environment variables
+    """
+    conn_max_age = int(environ.get('DJANGO_CONN_MAX_AGE', 600))
+
+    if environ.get('DJANGO_DB_ENGINE', 'sqlite') == 'postgresql':
+        default = {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': environ.get('DJANGO_DB_NAME', 'jvlog'),
+            'USER': environ.get('DJANGO_DB_USER', ''),
+            'PASSWORD': environ.get('DJANGO_DB_PASSWORD', ''),
+            'HOST': environ.get('DJANGO_DB_HOST', ''),
+            'PORT': environ.get('DJANGO_DB_PORT', ''),
+            'CONN_MAX_AGE': conn_max_age,
+            # Persistent connections are checked before reuse, so a restarted server does not cause errors
+            'CONN_HEALTH_CHECKS': True,
+            'DISABLE_SERVER_SIDE_CURSORS': 'DJANGO_DB_POOLER' in environ,
+            'OPTIONS': {
+                'connect_timeout': 5,
+            },
+        }
+        replica = {'HOST': environ['DJANGO_DB_REPLICA_HOST']} if 'DJANGO_DB_REPLICA_HOST' in environ else None
+    else:
+        default = {
+            'ENGINE': 'jvlog.backends.sqlite3',
+            'NAME': environ.get('DJANGO_DB_NAME', base_dir / 'db.sqlite3'),
+            'CONN_MAX_AGE': conn_max_age,
+            'OPTIONS': {
+                # How long (in seconds) a writer waits for another writer's lock before raising 'database is locked'
+                'timeout': 20,
+                'init_command': SQLITE_INIT_COMMAND,
+            },
+        }
+        replica = {'NAME': environ['DJANGO_DB_REPLICA_NAME']} if 'DJANGO_DB_REPLICA_NAME' in environ else None
+
+    databases = {'default': default}
+    if replica:
+        # Tests use the default database in place of the replica
+        databases['replica'] = {**default, **replica, 'TEST': {'MIRROR': 'default'}}
+
+    return databases
@@ -0,0 +1,98 @@
+"""
+Pre-rendering of pages that do not use any data from the database
+
+The prerender_pages management command writes each page listed in settings.PRERENDERED_PAGES
+to PRERENDER_ROOT, along with a manifest that maps URL paths to the content-hashed files.
+PrerenderedPageMiddleware loads the manifest when the server starts and returns the stored bytes
+without running the rest of the middleware or the template engine (except in DEBUG mode).
+"""
+import hashlib
+import json
+from pathlib import Path
+from django.conf import settings
+from django.http import HttpRequest, HttpResponse, HttpResponseNotModified
+from django.urls import resolve, reverse
+from django.utils.cache import patch_cache_control
+from django.utils.http import parse_etags
+
+
+MANIFEST_NAME = 'manifest.json'
+
+
+def render_page(path):
+    """
+    Returns the rendered content of the page at a given URL path
+    """
+    request = HttpRequest()
+    request.method = 'GET'
+    request.path = request.path_info = path
+    request.META['SERVER_NAME'] = settings.ALLOWED_HOSTS[0] if settings.ALLOWED_HOSTS else 'localhost'
+    request.META['SERVER_PORT'] = '80'
+    match = request.resolver_match = resolve(path)
+    response = match.func(request, *match.args, **match.kwargs)
+
+    return response.content
+
+
+def write_prerendered_pages(root = None):
+    """
+    Renders the pages in settings.PRERENDERED_PAGES and writes them to disk with a manifest
+    Returns the manifest dict
+    """
+    root = Path(root or settings.PRERENDER_ROOT)
+    root.mkdir(parents = True, exist_ok = True)
+    manifest = {}
+
+    for url_name in settings.PRERENDERED_PAGES:
+        path = reverse(url_name)
+        content = render_page(path)
+        content_hash = hashlib.md5(content).hexdigest()[:12]
+        filename = f"{url_name.replace(':', '.')}.{content_hash}.html"
+        (root / filename).write_bytes(content)
+        manifest[path] = {'file': filename, 'etag': f'"{content_hash}"'}
+
+    (root / MANIFEST_NAME).write_text(json.dumps(manifest, indent = 2))
+
+    return manifest
+
+
+def load_prerendered_pages(root = None):
+    """
+    Returns a dict mapping URL paths to (content, etag) pairs, which is empty if the pages have not been built
+    """
+    root = Path(root or settings.PRERENDER_ROOT)
+
+    try:
+        manifest = json.loads((root / MANIFEST_NAME).read_text())
+    except FileNotFoundError:
+        return {}
+
+    return {
+        path: ((root / entry['file']).read_bytes(), entry['etag'])
+        for path, entry in manifest.items()
+    }
+
+
+class PrerenderedPageMiddleware:
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.pages = {} if settings.DEBUG else load_prerendered_pages()
+
+    def __call__(self, request):
+        page = self.pages.get(request.path_info) if request.method in ('GET', 'HEAD') else None
+
+        if page is None:
+            return self.get_response(request)
+
+        content, etag = page
+        if etag in parse_etags(request.META.get('HTTP_IF_NONE_MATCH', '')):
+            response = HttpResponseNotModified()
+        else:
+            response = HttpResponse(content, content_type = 'text/html; charset=utf-8')
+        response['ETag'] = etag
+        # The clickjacking middleware is skipped, so its header is added here
+        response['X-Frame-Options'] = getattr(settings, 'X_FRAME_OPTIONS', 'DENY')
+        patch_cache_control(response, no_cache = True)
+
+        return response
@@ -0,0 +1,71 @@
+"""
+Routing of database queries between the primary database and a read replica
+
+Views decorated with read_from_replica send the queries made while answering GET and HEAD requests
+to the 'replica' database, if one is configured (see jvlog/database.py). Everything else, including
+comment posts and the admin site, reads from and writes to the primary ('default') database.
+A replica may lag slightly behind the primary, so only pages that can be a moment out of date should use it.
+
+Pages rendered from a lagging replica would be stored in the page and fragment caches under the keys that
+a change has just moved on to, and served until the next change. So the code that retires cached pages after
+a change also calls pin_to_primary(), which makes all views read from the primary for the following
+settings.REPLICA_MAX_LAG seconds (recorded in the default cache, which the server processes share),
+by which time the replica is expected to have caught up.
+"""
+from contextvars import ContextVar
+from functools import wraps
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections
+
+
+REPLICA_ALIAS = 'replica'
+RECENT_CHANGE_KEY = 'jvlog:recent_change'
+
+_use_replica = ContextVar('use_replica', default = False)
+
+
+def has_replica():
+    return REPLICA_ALIAS in connections
+
+
+def pin_to_primary():
+    """
+    Sends all reads to the primary until the replica has had time to receive the latest changes
+    """
+    if has_replica():
+        cache.set(RECENT_CHANGE_KEY, True, settings.REPLICA_MAX_LAG)
+
+
+def read_from_replica(view):
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if request.method not in ('GET', 'HEAD') or not has_replica() or cache.get(RECENT_CHANGE_KEY):
+            return view(request, *args, **kwargs)
+
+        token = _use_replica.set(True)
+        try:
+            return view(request, *args, **kwargs)
+        finally:
+            _use_replica.reset(token)
+
+    return wrapper
+
+
+class PrimaryReplicaRouter:
+
+    def db_for_read(self, model, **hints):
+        if _use_replica.get() and has_replica():
+            return REPLICA_ALIAS
+        return 'default'
+
+    def db_for_write(self, model, **hints):
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # The replica holds a copy of the same data
+        return True
+
+    def allow_migrate(self, db, app_label, model_name = None, **hints):
+        # The replica gets its schema changes from the primary
+        return db != REPLICA_ALIAS
@@ -12,6 +12,7 @@ https://docs.djangoproject.com/en/3.2/ref/settings/
 
 from pathlib import Path
 import os
+from jvlog.database import get_databases
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -49,6 +50,7 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'jvlog.prerender.PrerenderedPageMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -80,11 +82,24 @@ WSGI_APPLICATION = 'jvlog.wsgi.application'
 
 # Database
 # https://docs.djangoproject.com/en/3.2/ref/settings/#databases
+# Configured from environment variables (see jvlog/database.py); SQLite is used by default
 
-DATABASES = {
+DATABASES = get_databases(os.environ, BASE_DIR)
+
+DATABASE_ROUTERS = ['jvlog.routers.PrimaryReplicaRouter']
+
+# Seconds after a write during which all reads go to the primary, while the replica catches up
+REPLICA_MAX_LAG = int(os.environ.get('DJANGO_DB_REPLICA_MAX_LAG', 10))
+
+
+# Cache
+# https://docs.djangoproject.com/en/3.2/topics/cache/
+# The default local-memory cache is per process, so use a shared backend (e.g. memcached) when running several workers
+
+CACHES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+        'BACKEND': os.environ.get('DJANGO_CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.environ.get('DJANGO_CACHE_LOCATION', ''),
     }
 }
 
@@ -130,6 +145,79 @@ STATIC_ROOT = os.path.join(BASE_DIR, 'static')
 
 STATICFILES_DIRS = []
 
+STORAGES = {
+    'default': {
+        'BACKEND': 'django.core.files.storage.FileSystemStorage',
+    },
+    'staticfiles': {
+        'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage',
+    },
+}
+
+# Content-hashed file names (from collectstatic's manifest) so that static files can be cached indefinitely
+# Videos, posters and HLS playlists are added to STATIC_ROOT after collectstatic, so templates link them
+# with {% video_static %} (vlog/templatetags/vlog_tags.py) rather than through the manifest
+if not DEBUG:
+    STORAGES['staticfiles']['BACKEND'] = 'jvlog.storage.CachedManifestStaticFilesStorage'
+
+# Set SERVE_STATIC if Django has to serve the collected static files itself (see jvlog/static.py)
+SERVE_STATIC = 'SERVE_STATIC' in os.environ
+
+# Video streaming (see vlog/streaming.py)
+# Set VIDEO_SENDFILE to 'x-accel-redirect' (nginx) or 'x-sendfile' (Apache) to offload transfers to the web server
+
+VIDEO_SENDFILE = os.environ.get('VIDEO_SENDFILE')
+VIDEO_ACCEL_REDIRECT_PREFIX = '/protected/videos/'
+
+# Pre-rendered pages (see jvlog/prerender.py)
+# Build with 'python manage.py prerender_pages' after each deployment
+
+PRERENDER_ROOT = BASE_DIR / 'prerendered'
+
+PRERENDERED_PAGES = [
+    'vlog:learn',
+    'vlog:about',
+    'vlog:history',
+    'dev:programming',
+    'dev:web_development',
+    'dev:portfolio',
+]
+
+# Critical CSS inlined in vlog/base.html (see vlog/critical_css.py)
+# Build with 'python manage.py extract_critical_css' after each deployment
+
+CRITICAL_CSS_ROOT = BASE_DIR / 'critical_css'
+
+CRITICAL_CSS_PAGES = [
+    'vlog:index',
+    'vlog:videos',
+    'vlog:detail',
+    'vlog:learn',
+    'vlog:about',
+    'vlog:history',
+    'vlog:thanks',
+    'vlog:contact',
+]
+
+# Comment spam filter (see vlog/spam.py)
+# Train with 'python manage.py train_spam_filter' as comments are moderated
+
+COMMENT_CLASSIFIER = 'vlog.spam.NaiveBayesCommentClassifier'
+SPAM_MODEL_PATH = BASE_DIR / 'spam_model.json'
+SPAM_THRESHOLD = 0.9
+
+# Rate limits for comment and contact form posts (see vlog/ratelimit.py)
+# Each limit is (number of posts, window in seconds)
+
+RATE_LIMITS = {
+    'comment': {'ip': (5, 60), 'video': (30, 60)},
+    'contact': {'ip': (3, 600)},
+}
+RATE_LIMIT_STORE = os.environ.get('RATE_LIMIT_STORE', 'vlog.ratelimit.LocalMemoryCounterStore')
+RATE_LIMIT_IP_HEADER = os.environ.get('RATE_LIMIT_IP_HEADER', 'REMOTE_ADDR')
+# The number of trusted proxies that append to the header when it is a list (e.g. HTTP_X_FORWARDED_FOR)
+RATE_LIMIT_PROXY_COUNT = int(os.environ.get('RATE_LIMIT_PROXY_COUNT', 1))
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/3.2/ref/settings/#default-auto-field
 
@@ -140,3 +228,6 @@ EMAIL_HOST_USER = os.environ.get('OUTBOUND_EMAIL_ADDRESS')
 EMAIL_HOST_PASSWORD = os.environ.get('OUTBOUND_EMAIL_PASSWORD')
 EMAIL_PORT = 587
 EMAIL_USE_TLS = True
+
+# Recipients of the new comment digest (see vlog/moderation.py)
+MODERATOR_EMAILS = [os.environ['EMAIL_ADDRESS']] if 'EMAIL_ADDRESS' in os.environ else []
@@ -0,0 +1,81 @@
+"""
+Serving of collected static files by Django, for deployments without a separate static file server
+
+Content-hashed files (see jvlog.storage) are sent with a far-future, immutable Cache-Control header.
+Other files must be revalidated, since their content can change under the same name.
+If the client accepts it, a precompressed .br or .gz copy written by collectstatic is sent instead of the file.
+"""
+import mimetypes
+import os
+from django.conf import settings
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.utils.cache import patch_cache_control, patch_vary_headers
+from django.views import static
+from jvlog.storage import PrecompressedStaticFilesMixin
+
+
+IMMUTABLE_MAX_AGE = 60 * 60 * 24 * 365
+PRECOMPRESSED_ENCODINGS = [('br', '.br'), ('gzip', '.gz')]
+
+
+def is_hashed_name(path):
+    is_hashed = getattr(staticfiles_storage, 'is_hashed', None)
+
+    return bool(is_hashed and is_hashed(path))
+
+
+def parse_accept_encoding(header):
+    """
+    Returns the set of content codings that the client accepts (ignoring any with q=0)
+    """
+    accepted = set()
+
+    for item in header.split(','):
+        coding, *parameters = [part.strip() for part in item.split(';')]
+        quality = 1.0
+        for parameter in parameters:
+            name, _, value = parameter.partition('=')
+            if name.strip() == 'q':
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        if coding and quality > 0:
+            accepted.add(coding.lower())
+
+    return accepted
+
+
+def find_precompressed(path, accept_encoding):
+    """
+    Returns the (content coding, file suffix) of the best precompressed copy of a file, or None
+    """
+    accepted = parse_accept_encoding(accept_encoding)
+
+    for encoding, suffix in PRECOMPRESSED_ENCODINGS:
+        if encoding in accepted and os.path.isfile(os.path.join(settings.STATIC_ROOT, path + suffix)):
+            return encoding, suffix
+
+    return None
+
+
+def serve(request, path):
+    precompressed = find_precompressed(path, request.META.get('HTTP_ACCEPT_ENCODING', ''))
+
+    if precompressed is None:
+        response = static.serve(request, path, document_root = settings.STATIC_ROOT)
+    else:
+        encoding, suffix = precompressed
+        response = static.serve(request, path + suffix, document_root = settings.STATIC_ROOT)
+        response['Content-Type'] = mimetypes.guess_type(path)[0] or 'application/octet-stream'
+        response['Content-Encoding'] = encoding
+
+    if path.endswith(PrecompressedStaticFilesMixin.compressible_extensions):
+        patch_vary_headers(response, ('Accept-Encoding',))
+
+    if is_hashed_name(path):
+        patch_cache_control(response, public = True, max_age = IMMUTABLE_MAX_AGE, immutable = True)
+    else:
+        patch_cache_control(response, public = True, no_cache = True)
+
+    return response
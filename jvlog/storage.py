@@ -0,0 +1,90 @@
+import gzip
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+class PrecompressedStaticFilesMixin:
+    """
+    Writes .gz (and, if the brotli package is installed, .br) copies of compressible files during collectstatic
+    A compressed copy is only kept if it is smaller than the original
+    """
+    compressible_extensions = ('.css', '.js', '.svg', '.pdf', '.txt', '.html', '.json', '.m3u8', '.map')
+
+    def post_process(self, paths, dry_run = False, **options):
+        names = set()
+
+        for name, hashed_name, processed in super().post_process(paths, dry_run, **options):
+            yield name, hashed_name, processed
+            names.add(name)
+            if isinstance(hashed_name, str):
+                names.add(hashed_name)
+
+        if not dry_run:
+            for name in sorted(names):
+                if name.endswith(self.compressible_extensions):
+                    self.write_compressed_copies(name)
+
+    def write_compressed_copies(self, name):
+        with self.open(name) as original:
+            content = original.read()
+
+        compressors = [('.gz', lambda data: gzip.compress(data, compresslevel = 9, mtime = 0))]
+        if brotli is not None:
+            compressors.append(('.br', lambda data: brotli.compress(data, quality = 11)))
+
+        for suffix, compress in compressors:
+            compressed = compress(content)
+            if len(compressed) < len(content):
+                with open(self.path(name + suffix), 'wb') as compressed_file:
+                    compressed_file.write(compressed)
+
+
+class CachedManifestStaticFilesStorage(PrecompressedStaticFilesMixin, ManifestStaticFilesStorage):
+    """
+    Content-hashed, precompressed static file storage with in-memory URL lookups
+
+    The manifest written by collectstatic is loaded once, when the storage is created at startup,
+    and the URL for each name is memoised so that repeated {% static %} tags are dictionary lookups.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.url_cache = {}
+        self.hashed_names = set(self.hashed_files.values())
+
+    def stored_name(self, name):
+        """
+        Falls back to the unhashed name for files that are not in the manifest, rather than raising ValueError,
+        e.g. when the tests run with production settings and collectstatic has not been run
+        The file is not hashed on the fly either (as it would be with manifest_strict off), since a hashed copy
+        of a file that was never collected would not exist
+        """
+        try:
+            return super().stored_name(name)
+        except ValueError:
+            return name
+
+    def url(self, name, force = False):
+        if force:
+            return super().url(name, force)
+
+        try:
+            return self.url_cache[name]
+        except KeyError:
+            url = self.url_cache[name] = super().url(name)
+            return url
+
+    def is_hashed(self, name):
+        """
+        Returns True if name is the content-hashed copy of a file (so its content can never change)
+        """
+        return name in self.hashed_names
+
+    def post_process(self, *args, **kwargs):
+        yield from super().post_process(*args, **kwargs)
+        self.url_cache = {}
+        self.hashed_names = set(self.hashed_files.values())
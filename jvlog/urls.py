@@ -13,11 +13,13 @@ Including another URLconf
     1. Import the include() function: from django.urls import include, path
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
+from django.conf import settings
 from django.contrib import admin
-from django.urls import include, path
+from django.urls import include, path, re_path
 from vlog import urls as vlog_urls
 from vlog import views as vlog_views
 from dev import urls as dev_urls
+from jvlog import static as static_views
 from os import environ as os_environ
 
 urlpatterns = [
@@ -26,3 +28,8 @@ urlpatterns = [
     path('juggling/', include(vlog_urls)),
     path('dev/', include(dev_urls)),
 ]
+
+if settings.SERVE_STATIC:
+    urlpatterns += [
+        re_path(rf"^{settings.STATIC_URL.lstrip('/')}(?P<path>.*)$", static_views.serve),
+    ]
@@ -1,12 +1,89 @@
-from django.contrib import admin
-from .models import JugglingVideo, VideoComment, Acknowledgement
+from django.contrib import admin, messages
+from django.core.exceptions import PermissionDenied
+from django.shortcuts import redirect
+from django.template.response import TemplateResponse
+from django.urls import path, reverse
+from django.utils.http import urlencode
+from .models import JugglingVideo, VideoComment, Acknowledgement, OutboundEmail
+from .moderation import MODERATION_PAGE_SIZE, approve_comments, reject_comments, delete_comments, get_moderation_page
 
 
 # Register your models here.
 
 class VideoCommentAdmin(admin.ModelAdmin):
-    list_display = ('text', 'video_id', 'video', 'is_approved')
+    list_display = ('text', 'video_id', 'video', 'date', 'is_approved', 'is_rejected')
+    list_select_related = ('video',)
+    list_filter = ('is_approved', 'is_rejected')
+    # Counting every comment again for the 'Show all' link is slow once there are many of them
+    show_full_result_count = False
+    actions = ('approve_selected', 'reject_selected', 'delete_selected_comments')
+
+    def get_actions(self, request):
+        # Django's delete action loads and deletes each comment separately, so delete_selected_comments replaces it
+        actions = super().get_actions(request)
+        actions.pop('delete_selected', None)
+        return actions
+
+    @admin.action(description = 'Approve selected comments', permissions = ['change'])
+    def approve_selected(self, request, queryset):
+        count = approve_comments(queryset)
+        self.message_user(request, f'Approved {count} comments.', messages.SUCCESS)
+
+    @admin.action(description = 'Reject selected comments', permissions = ['change'])
+    def reject_selected(self, request, queryset):
+        count = reject_comments(queryset)
+        self.message_user(request, f'Rejected {count} comments.', messages.SUCCESS)
+
+    @admin.action(description = 'Delete selected comments', permissions = ['delete'])
+    def delete_selected_comments(self, request, queryset):
+        count = delete_comments(queryset)
+        self.message_user(request, f'Deleted {count} comments.', messages.SUCCESS)
+
+    def get_urls(self):
+        return [
+            path(
+                'moderation/',
+                self.admin_site.admin_view(self.moderation_queue_view),
+                name = 'vlog_videocomment_moderation',
+            ),
+        ] + super().get_urls()
+
+    def moderation_queue_view(self, request):
+        """
+        Lists the comments awaiting approval, oldest first, with buttons to approve, reject or delete the selected ones
+        """
+        if not self.has_change_permission(request):
+            raise PermissionDenied
+
+        after = request.GET.get('after')
+
+        if request.method == 'POST':
+            # Ids that are not numbers are ignored, rather than failing the query
+            comment_ids = [comment_id for comment_id in request.POST.getlist('comment') if comment_id.isdigit()]
+            selected = VideoComment.objects.filter(is_approved = False, is_rejected = False, pk__in = comment_ids)
+            if request.POST.get('action') == 'approve':
+                self.message_user(request, f'Approved {approve_comments(selected)} comments.', messages.SUCCESS)
+            elif request.POST.get('action') == 'reject':
+                self.message_user(request, f'Rejected {reject_comments(selected)} comments.', messages.SUCCESS)
+            elif request.POST.get('action') == 'delete' and self.has_delete_permission(request):
+                self.message_user(request, f'Deleted {delete_comments(selected)} comments.', messages.SUCCESS)
+            url = reverse('admin:vlog_videocomment_moderation', current_app = self.admin_site.name)
+            return redirect(f"{url}?{urlencode({'after': after})}" if after else url)
+
+        return TemplateResponse(request, 'admin/vlog/videocomment/moderation_queue.html', {
+            **self.admin_site.each_context(request),
+            'opts': self.model._meta,
+            'title': 'Comments awaiting approval',
+            'page': get_moderation_page(after, page_size = MODERATION_PAGE_SIZE),
+            'can_delete': self.has_delete_permission(request),
+        })
+
+
+class OutboundEmailAdmin(admin.ModelAdmin):
+    list_display = ('subject', 'created', 'attempts', 'send_after', 'sent_at')
+    list_filter = ('sent_at',)
 
 admin.site.register(JugglingVideo)
 admin.site.register(VideoComment, VideoCommentAdmin)
 admin.site.register(Acknowledgement)
+admin.site.register(OutboundEmail, OutboundEmailAdmin)
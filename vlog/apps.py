@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class VlogConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'vlog'
+
+    def ready(self):
+        from vlog import signals
@@ -0,0 +1,172 @@
+import time
+from functools import wraps
+from django.core.cache import cache
+from django.db.models import Count, Max, Sum
+from django.utils.cache import (
+    get_cache_key, learn_cache_key, has_vary_header, patch_vary_headers, patch_cache_control, get_conditional_response,
+)
+from django.utils.http import http_date, quote_etag
+from jvlog.routers import pin_to_primary
+from vlog.models import JugglingVideo
+from vlog.scheduling import publish_due_videos, seconds_until_next_publication
+
+
+PAGE_CACHE_TIMEOUT = 60 * 60 * 24
+PAGE_VERSION_KEY = 'vlog:page_version'
+COMMENT_VERSION_KEY = 'vlog:comment_version'
+COMMENT_THREAD_TIMEOUT = 60 * 60 * 24
+
+
+def get_page_version():
+    """
+    Returns the version that is included in all cached page keys
+    A fresh timestamp is used if the version has been evicted so that old entries can never be reused
+    """
+    return cache.get_or_set(PAGE_VERSION_KEY, time.time_ns, None)
+
+
+def invalidate_cached_pages():
+    """
+    Retires every cached vlog page by moving on to a new page version
+    """
+    cache.set(PAGE_VERSION_KEY, time.time_ns(), None)
+    # Pages for the new version must not be rendered from a replica that does not have the change yet
+    pin_to_primary()
+
+
+def get_comment_version(video_id):
+    """
+    Returns the version of a video's comments, which is part of the key of its cached comment thread
+    """
+    return cache.get_or_set(f'{COMMENT_VERSION_KEY}:{video_id}', time.time_ns, None)
+
+
+def invalidate_comment_threads(video_ids):
+    """
+    Retires the cached comment threads of the given videos by moving on to new comment versions
+    """
+    version = time.time_ns()
+    cache.set_many({f'{COMMENT_VERSION_KEY}:{video_id}': version for video_id in video_ids}, None)
+    pin_to_primary()
+
+
+def get_page_cache_timeout():
+    """
+    Cached pages should expire when the next scheduled video is published
+    """
+    return min(PAGE_CACHE_TIMEOUT, seconds_until_next_publication(default = PAGE_CACHE_TIMEOUT))
+
+
+def cache_published_page(view):
+    """
+    Caches the full response of a GET request to a vlog page, keyed by its URL
+    Pages that use a CSRF token are only cached per browser (they vary on the Cookie header)
+    """
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if request.method not in ('GET', 'HEAD'):
+            return view(request, *args, **kwargs)
+
+        publish_due_videos()
+        key_prefix = f'vlog.{get_page_version()}'
+        cache_key = get_cache_key(request, key_prefix, 'GET', cache = cache)
+        if cache_key is not None:
+            response = cache.get(cache_key)
+            if response is not None:
+                return response
+
+        response = view(request, *args, **kwargs)
+
+        if request.META.get('CSRF_COOKIE_NEEDS_UPDATE') or request.META.get('CSRF_COOKIE_USED'):
+            patch_vary_headers(response, ('Cookie',))
+
+        # Don't cache a response that will set a (user-specific) cookie on a cookie-less request
+        if response.status_code != 200 or response.streaming or (not request.COOKIES and has_vary_header(response, 'Cookie')):
+            return response
+
+        timeout = get_page_cache_timeout()
+        cache_key = learn_cache_key(request, response, timeout, key_prefix, cache = cache)
+        cache.set(cache_key, response, timeout)
+
+        return response
+
+    return wrapper
+
+
+def published_videos_validators(*args, **kwargs):
+    """
+    Returns the (ETag, Last-Modified) pair for pages that list the published videos
+    """
+    # The archive shows each video's comment count, so the pages also change when comments do
+    stats = JugglingVideo.published.aggregate(
+        latest_pub_date = Max('pub_date'),
+        latest_edit = Max('modified'),
+        video_count = Count('id'),
+        comment_count = Sum('approved_comment_count'),
+        latest_comment_date = Max('last_comment_at'),
+    )
+
+    if stats['latest_pub_date'] is None:
+        return None, None
+
+    last_modified = max(stats['latest_pub_date'], stats['latest_edit'], stats['latest_comment_date'] or stats['latest_pub_date'])
+    etag = quote_etag(
+        f"{stats['latest_pub_date']:%Y%m%d%H%M%S%f}-{stats['video_count']}-"
+        f"{last_modified:%Y%m%d%H%M%S%f}-{stats['comment_count']}"
+    )
+
+    return etag, last_modified
+
+
+def video_detail_validators(jugglingvideo_id):
+    """
+    Returns the (ETag, Last-Modified) pair for a video's detail page, from the video and its approved comments
+    """
+    stats = JugglingVideo.published.filter(id = jugglingvideo_id).values(
+        'pub_date', 'modified', 'approved_comment_count', 'last_comment_at',
+    ).first()
+
+    if stats is None:
+        return None, None
+
+    last_modified = max(stats['pub_date'], stats['modified'], stats['last_comment_at'] or stats['pub_date'])
+    etag = quote_etag(
+        f"{stats['pub_date']:%Y%m%d%H%M%S%f}-{stats['modified']:%Y%m%d%H%M%S%f}-"
+        f"{last_modified:%Y%m%d%H%M%S%f}-{stats['approved_comment_count']}"
+    )
+
+    return etag, last_modified
+
+
+def conditional_page(get_validators):
+    """
+    Answers GET requests with 304 Not Modified if the client's copy of the page is still current
+    get_validators is called with the view's arguments and returns an (ETag, Last-Modified) pair
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method not in ('GET', 'HEAD'):
+                return view(request, *args, **kwargs)
+
+            etag, last_modified = get_validators(*args, **kwargs)
+            if etag is None:
+                return view(request, *args, **kwargs)
+
+            last_modified_timestamp = int(last_modified.timestamp())
+            response = get_conditional_response(request, etag = etag, last_modified = last_modified_timestamp)
+            if response is None:
+                response = view(request, *args, **kwargs)
+                if response.status_code != 200:
+                    return response
+
+            response['ETag'] = etag
+            response['Last-Modified'] = http_date(last_modified_timestamp)
+            # Browsers must revalidate, rather than guessing how long the page stays fresh
+            patch_cache_control(response, no_cache = True)
+
+            return response
+
+        return wrapper
+
+    return decorator
@@ -0,0 +1,219 @@
+"""
+Extraction of the critical (above-the-fold) CSS for each page
+
+The extract_critical_css management command renders each page in settings.CRITICAL_CSS_PAGES,
+collects the tags, classes and ids of the first CRITICAL_ELEMENT_LIMIT elements in the body,
+and writes the rules of the main stylesheet that can apply to them to CRITICAL_CSS_ROOT.
+The {% critical_stylesheet %} tag inlines this CSS in base.html and defers loading the full stylesheet.
+"""
+import os
+import posixpath
+import re
+from html.parser import HTMLParser
+from pathlib import Path
+from django.conf import settings
+from django.contrib.staticfiles import finders
+from django.templatetags.static import static
+from django.urls import NoReverseMatch, reverse
+from jvlog.prerender import render_page
+from vlog.models import JugglingVideo
+
+
+STYLESHEET = 'vlog/style/style.css'
+CRITICAL_ELEMENT_LIMIT = 40
+
+# Pseudo-classes that only apply after user interaction are not needed for the first render
+INTERACTIVE_PSEUDO_CLASSES = re.compile(r':(hover|active|focus|focus-within|focus-visible|visited)\b')
+COMMENTS = re.compile(r'/\*.*?\*/', re.DOTALL)
+SELECTOR_TOKENS = re.compile(r'[.#]?-?[A-Za-z_][\w-]*')
+URLS = re.compile(r'''url\(\s*(['"]?)([^'")]+)\1\s*\)''')
+
+
+class AboveFoldParser(HTMLParser):
+    """
+    Collects the tag names, classes and ids of the first elements in the body of an HTML page
+    """
+
+    def __init__(self, element_limit):
+        super().__init__()
+        self.element_limit = element_limit
+        self.element_count = 0
+        self.in_body = False
+        self.tokens = {'html', 'body'}
+
+    def handle_starttag(self, tag, attrs):
+        if tag == 'body':
+            self.in_body = True
+            return
+        if not self.in_body or self.element_count >= self.element_limit:
+            return
+
+        self.element_count += 1
+        self.tokens.add(tag)
+        for name, value in attrs:
+            if name == 'class' and value:
+                self.tokens.update(f'.{class_name}' for class_name in value.split())
+            elif name == 'id' and value:
+                self.tokens.add(f'#{value}')
+
+
+def get_above_fold_tokens(html, element_limit = CRITICAL_ELEMENT_LIMIT):
+    parser = AboveFoldParser(element_limit)
+    parser.feed(html)
+
+    return parser.tokens
+
+
+def find_block_end(css, start):
+    """
+    Returns the index of the brace that closes the block opened at css[start]
+    """
+    depth = 0
+
+    for index in range(start, len(css)):
+        if css[index] == '{':
+            depth += 1
+        elif css[index] == '}':
+            depth -= 1
+            if depth == 0:
+                return index
+
+    return len(css)
+
+
+def parse_stylesheet(css):
+    """
+    Returns a list of (prelude, body) pairs, where the body of an @media rule is itself a list of rules
+    """
+    css = COMMENTS.sub('', css)
+    rules = []
+    position = 0
+
+    while True:
+        start = css.find('{', position)
+        if start == -1:
+            return rules
+        end = find_block_end(css, start)
+        prelude = ' '.join(css[position:start].split())
+        body = css[start + 1:end]
+        if prelude.startswith('@media'):
+            rules.append((prelude, parse_stylesheet(body)))
+        else:
+            rules.append((prelude, ' '.join(body.split())))
+        position = end + 1
+
+
+def selector_is_critical(selector, tokens):
+    """
+    Returns True if a selector could match one of the above-the-fold elements on first render
+    Attribute selectors and structural pseudo-classes are ignored, so some selectors match too broadly,
+    which only makes the critical CSS a little larger.
+    """
+    if '::' in selector or INTERACTIVE_PSEUDO_CLASSES.search(selector):
+        return False
+
+    selector = re.sub(r'\[[^\]]*\]', '', selector)
+    selector = re.sub(r':[\w-]+(\([^)]*\))?', '', selector)
+
+    return all(token.lower() in tokens for token in SELECTOR_TOKENS.findall(selector))
+
+
+def extract_rules(rules, tokens):
+    """
+    Returns the CSS text of the rules that apply to the given tokens
+    """
+    critical = []
+
+    for prelude, body in rules:
+        if prelude.startswith('@font-face'):
+            critical.append(f'{prelude}{{{body}}}')
+        elif prelude.startswith('@media'):
+            nested = extract_rules(body, tokens)
+            if nested:
+                critical.append(f'{prelude}{{{nested}}}')
+        elif not prelude.startswith('@'):
+            selectors = [selector.strip() for selector in prelude.split(',')]
+            selectors = [selector for selector in selectors if selector_is_critical(selector, tokens)]
+            if selectors:
+                critical.append(f"{','.join(selectors)}{{{body}}}")
+
+    return ''.join(critical)
+
+
+def extract_critical_css(html, css, element_limit = CRITICAL_ELEMENT_LIMIT):
+    return extract_rules(parse_stylesheet(css), get_above_fold_tokens(html, element_limit))
+
+
+def get_critical_css_path(url_name, root = None):
+    return Path(root or settings.CRITICAL_CSS_ROOT) / f"{url_name.replace(':', '.')}.css"
+
+
+def get_sample_path(url_name):
+    """
+    Returns a URL path for a page, using the latest video for pages that show one video
+    Returns None if there is no video to show
+    """
+    try:
+        return reverse(url_name)
+    except NoReverseMatch:
+        video = JugglingVideo.published.first()
+        return reverse(url_name, args = (video.id,)) if video else None
+
+
+def write_critical_css(root = None):
+    """
+    Writes the critical CSS for each page in settings.CRITICAL_CSS_PAGES
+    Returns a dict mapping each page written to its (critical CSS size, full stylesheet size) in bytes
+    """
+    with open(finders.find(STYLESHEET), encoding = 'utf-8') as stylesheet:
+        css = stylesheet.read()
+    rules = parse_stylesheet(css)
+    sizes = {}
+
+    for url_name in settings.CRITICAL_CSS_PAGES:
+        path = get_sample_path(url_name)
+        if path is None:
+            continue
+        html = render_page(path).decode()
+        critical_css = extract_rules(rules, get_above_fold_tokens(html))
+        critical_css_path = get_critical_css_path(url_name, root)
+        critical_css_path.parent.mkdir(parents = True, exist_ok = True)
+        critical_css_path.write_text(critical_css, encoding = 'utf-8')
+        sizes[url_name] = (len(critical_css.encode()), len(css.encode()))
+
+    return sizes
+
+
+def rewrite_url(match):
+    """
+    Replaces a URL relative to the stylesheet with the URL of the static file, since the CSS is inlined in the page
+    """
+    url = match.group(2)
+    if url.startswith(('/', 'data:', 'http:', 'https:', '#')):
+        return match.group(0)
+
+    return f"url('{static(posixpath.normpath(posixpath.join(posixpath.dirname(STYLESHEET), url)))}')"
+
+
+_loaded_critical_css = {}
+
+
+def load_critical_css(url_name):
+    """
+    Returns the critical CSS for a page, with relative URLs pointing to the static files,
+    or None if it has not been extracted
+    The file is read again only if it has changed.
+    """
+    path = get_critical_css_path(url_name)
+
+    try:
+        modified = os.stat(path).st_mtime_ns
+    except (FileNotFoundError, NotADirectoryError):
+        return None
+
+    cached = _loaded_critical_css.get(path)
+    if cached is None or cached[0] != modified:
+        critical_css = URLS.sub(rewrite_url, path.read_text(encoding = 'utf-8'))
+        cached = _loaded_critical_css[path] = (modified, critical_css)
+
+    return cached[1]
@@ -1,10 +1,9 @@
 from django import forms
-from django.core.exceptions import ValidationError
-from vlog.models import VideoComment
+from vlog.models import VideoComment, DUPLICATE_COMMENT_ERROR
+from vlog.spam import get_comment_classifier
 
 
 EMPTY_COMMENT_ERROR = 'You cannot submit an empty comment.'
-DUPLICATE_COMMENT_ERROR = 'That comment has already been posted!'
 
 
 class CommentForm(forms.models.ModelForm):
@@ -39,17 +38,18 @@ class CommentForm(forms.models.ModelForm):
         super().__init__(*args, **kwargs)
         self.instance.video = for_video
 
-    def validate_unique(self):
-        try:
-            self.instance.validate_unique()
-        except ValidationError as e:
-            e.error_dict = {'text': [DUPLICATE_COMMENT_ERROR]}
-            self._update_errors(e)
-
     def clean_author(self):
         data = self.cleaned_data['author'] if self.cleaned_data['author'] else 'anonymous'
         return data
 
+    def clean(self):
+        cleaned_data = super().clean()
+        if cleaned_data.get('text'):
+            # Spam is saved unapproved, so it waits in the moderation queue rather than appearing on the site
+            is_spam = get_comment_classifier().is_spam(cleaned_data['text'], cleaned_data.get('author', ''))
+            self.instance.is_approved = not is_spam
+        return cleaned_data
+
     class Meta:
         model = VideoComment
         fields = ('author', 'text',)
@@ -0,0 +1,91 @@
+"""
+A database-backed queue for outbound email
+
+Views call enqueue_mail, which only writes a row, so a slow or unavailable SMTP server never holds up a request.
+The send_queued_mail management command delivers the queued messages in batches over a single SMTP connection.
+A message that fails is retried with exponential backoff until it has been attempted MAX_ATTEMPTS times.
+Only one worker should run at a time, since messages are not locked while they are being sent.
+"""
+from datetime import timedelta
+from django.core.mail import EmailMessage, get_connection
+from django.utils import timezone
+from vlog.models import OutboundEmail
+
+
+BATCH_SIZE = 50
+MAX_ATTEMPTS = 5
+RETRY_DELAY = timedelta(minutes = 1)
+
+
+def enqueue_mail(subject, body, from_email, recipient_list):
+    return OutboundEmail.objects.create(
+        subject = subject,
+        body = body,
+        from_email = from_email or '',
+        recipients = '\n'.join(address for address in recipient_list if address),
+    )
+
+
+def get_retry_delay(attempts):
+    """
+    Returns how long to wait before the next attempt, which doubles after each failure
+    """
+    return RETRY_DELAY * 2 ** (attempts - 1)
+
+
+def get_due_mail(batch_size = BATCH_SIZE):
+    return list(
+        OutboundEmail.objects
+        .filter(sent_at__isnull = True, send_after__lte = timezone.now(), attempts__lt = MAX_ATTEMPTS)
+        .order_by('send_after', 'id')[:batch_size]
+    )
+
+
+def record_failure(message, error):
+    message.attempts += 1
+    message.last_error = f'{error.__class__.__name__}: {error}'
+    message.send_after = timezone.now() + get_retry_delay(message.attempts)
+    message.save(update_fields = ['attempts', 'last_error', 'send_after'])
+
+
+def send_queued_mail(batch_size = BATCH_SIZE, connection = None):
+    """
+    Sends the queued messages that are due, using one connection for the batch
+    Returns the number of messages sent and the number that failed
+    """
+    messages = get_due_mail(batch_size)
+    if not messages:
+        return 0, 0
+
+    connection = connection or get_connection()
+    sent = failed = 0
+
+    try:
+        connection.open()
+    except Exception as error:
+        # Nothing can be sent, so every message in the batch is retried later
+        for message in messages:
+            record_failure(message, error)
+        return 0, len(messages)
+
+    try:
+        for message in messages:
+            try:
+                EmailMessage(
+                    message.subject,
+                    message.body,
+                    message.from_email or None,
+                    message.recipient_list,
+                    connection = connection,
+                ).send()
+            except Exception as error:
+                record_failure(message, error)
+                failed += 1
+            else:
+                message.sent_at = timezone.now()
+                message.save(update_fields = ['sent_at'])
+                sent += 1
+    finally:
+        connection.close()
+
+    return sent, failed
@@ -0,0 +1,34 @@
+import time
+from django.core.management.base import BaseCommand
+from vlog.models import VideoComment
+from vlog.spam import get_comment_classifier
+
+
+class Command(BaseCommand):
+    help = 'Measures how quickly the comment spam filter classifies the stored comments'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--limit', type = int, default = 1000, help = 'number of comments to classify')
+        parser.add_argument('--repeat', type = int, default = 5)
+
+    def handle(self, *args, **options):
+        comments = list(VideoComment.objects.values_list('text', 'author')[:options['limit']])
+        if not comments:
+            self.stdout.write('There are no comments to classify')
+            return
+
+        classifier = get_comment_classifier()
+        # The first call loads the model, which is not part of the cost of classifying a comment
+        classifier.is_spam(*comments[0])
+        timings = []
+        for _ in range(options['repeat']):
+            start = time.perf_counter()
+            for text, author in comments:
+                classifier.is_spam(text, author)
+            timings.append(time.perf_counter() - start)
+
+        best = min(timings)
+        self.stdout.write(
+            f'Classified {len(comments)} comments in {best * 1000:.1f} ms '
+            f'({best / len(comments) * 1e6:.1f} microseconds per comment, {len(comments) / best:.0f} comments/s)'
+        )
@@ -0,0 +1,17 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from vlog.critical_css import write_critical_css
+
+
+class Command(BaseCommand):
+    help = 'Extracts the above-the-fold CSS for the pages in settings.CRITICAL_CSS_PAGES'
+
+    def handle(self, *args, **options):
+        sizes = write_critical_css()
+
+        for url_name, (critical_size, full_size) in sizes.items():
+            self.stdout.write(
+                f'{url_name}: {critical_size} bytes of render-blocking CSS '
+                f'(was {full_size}, {100 * (full_size - critical_size) // full_size}% less)'
+            )
+        self.stdout.write(f'Wrote critical CSS for {len(sizes)} pages to {settings.CRITICAL_CSS_ROOT}')
@@ -0,0 +1,32 @@
+from subprocess import CalledProcessError
+from django.core.management.base import BaseCommand, CommandError
+from vlog.models import JugglingVideo
+from vlog.thumbnails import generate_poster, PosterError
+
+
+class Command(BaseCommand):
+    help = 'Extracts poster images from juggling videos (requires ffmpeg)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('video_ids', nargs = '*', type = int, help = 'IDs of the videos to process (default: those without a poster)')
+        parser.add_argument('--force', action = 'store_true', help = 'Replace existing posters')
+
+    def handle(self, *args, **options):
+        videos = JugglingVideo.objects.all()
+        if options['video_ids']:
+            videos = videos.filter(id__in = options['video_ids'])
+        if not options['force']:
+            videos = videos.filter(poster = '')
+
+        failures = 0
+        for video in videos:
+            try:
+                poster = generate_poster(video)
+            except (PosterError, CalledProcessError, OSError) as e:
+                failures += 1
+                self.stderr.write(f'{video.filename}: {getattr(e, "stderr", None) or e}')
+                continue
+            self.stdout.write(f'{video.filename}: {poster}')
+
+        if failures:
+            raise CommandError(f'{failures} poster(s) could not be generated')
@@ -0,0 +1,14 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from jvlog.prerender import write_prerendered_pages
+
+
+class Command(BaseCommand):
+    help = 'Renders the pages in settings.PRERENDERED_PAGES to static HTML files'
+
+    def handle(self, *args, **options):
+        manifest = write_prerendered_pages()
+
+        for path, entry in manifest.items():
+            self.stdout.write(f"{path} -> {entry['file']}")
+        self.stdout.write(f'Wrote {len(manifest)} pages to {settings.PRERENDER_ROOT}')
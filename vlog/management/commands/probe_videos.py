@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand, CommandError
+from vlog.models import JugglingVideo
+from vlog.media import update_video_metadata
+from vlog.mp4 import MP4Error
+
+
+class Command(BaseCommand):
+    help = "Reads juggling videos' MP4 headers to record their duration, size, bitrate and faststart status"
+
+    def add_arguments(self, parser):
+        parser.add_argument('video_ids', nargs = '*', type = int, help = 'IDs of the videos to probe (default: all videos)')
+        parser.add_argument('--faststart', action = 'store_true', help = 'Move the moov box to the start of files that need it')
+
+    def handle(self, *args, **options):
+        videos = JugglingVideo.objects.all()
+        if options['video_ids']:
+            videos = videos.filter(id__in = options['video_ids'])
+
+        failures = 0
+        for video in videos:
+            try:
+                info = update_video_metadata(video, faststart = options['faststart'])
+            except (MP4Error, OSError) as e:
+                failures += 1
+                self.stderr.write(f'{video.filename}: {e}')
+                continue
+            self.stdout.write(
+                f'{video.filename}: {info.width}x{info.height}, {info.duration or 0:.1f}s, {info.bitrate} kbit/s, '
+                f"{'faststart' if info.is_faststart else 'not faststart'}"
+            )
+
+        if failures:
+            raise CommandError(f'{failures} video(s) could not be probed')
@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+from vlog.scheduling import publish_due_videos
+
+
+class Command(BaseCommand):
+    help = 'Announces scheduled videos whose publication date has passed (run every minute, e.g. from cron)'
+
+    def handle(self, *args, **options):
+        for video in publish_due_videos():
+            self.stdout.write(f'Published {video.title}')
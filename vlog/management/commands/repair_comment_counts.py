@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+from vlog.models import JugglingVideo
+
+
+class Command(BaseCommand):
+    help = "Recomputes every video's approved comment count and latest comment date"
+
+    def handle(self, *args, **options):
+        corrected = JugglingVideo.repair_comment_counts()
+        self.stdout.write(f'Corrected the comment counts of {corrected} videos')
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+from vlog.mail import send_queued_mail
+from vlog.moderation import queue_comment_digest
+
+
+class Command(BaseCommand):
+    help = 'Queues a digest email of new comments for the moderators (run on a schedule, e.g. hourly from cron)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--send', action = 'store_true', help = 'send the queued mail straight away')
+
+    def handle(self, *args, **options):
+        count = queue_comment_digest()
+        if count:
+            self.stdout.write(f'Queued a digest of {count} new comments')
+        if options['send']:
+            sent, failed = send_queued_mail()
+            self.stdout.write(f'Sent {sent} messages, {failed} failed')
@@ -0,0 +1,23 @@
+import time
+from django.core.management.base import BaseCommand
+from vlog.mail import BATCH_SIZE, send_queued_mail
+
+
+class Command(BaseCommand):
+    help = 'Sends the queued outbound email that is due (run every minute, e.g. from cron, or with --loop)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type = int, default = BATCH_SIZE)
+        parser.add_argument('--loop', action = 'store_true', help = 'keep checking the queue instead of exiting')
+        parser.add_argument('--interval', type = float, default = 10, help = 'seconds between checks with --loop')
+
+    def handle(self, *args, **options):
+        while True:
+            sent, failed = send_queued_mail(options['batch_size'])
+            if sent or failed:
+                self.stdout.write(f'Sent {sent} messages, {failed} failed')
+            # A full batch suggests more messages are waiting, so the queue is checked again straight away
+            if not options['loop']:
+                break
+            if sent + failed < options['batch_size']:
+                time.sleep(options['interval'])
@@ -0,0 +1,12 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from vlog.spam import train_model
+
+
+class Command(BaseCommand):
+    help = 'Trains the comment spam filter from approved (ham) and rejected (spam) comments'
+
+    def handle(self, *args, **options):
+        ham_count, spam_count = train_model()
+        self.stdout.write(f'Trained on {ham_count} approved and {spam_count} rejected comments')
+        self.stdout.write(f'Wrote the model to {settings.SPAM_MODEL_PATH}')
@@ -0,0 +1,32 @@
+from subprocess import CalledProcessError
+from django.core.management.base import BaseCommand, CommandError
+from vlog.models import JugglingVideo
+from vlog.transcoding import transcode_to_hls, TranscodingError
+
+
+class Command(BaseCommand):
+    help = 'Encodes juggling videos as multi-bitrate HLS streams (requires ffmpeg)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('video_ids', nargs = '*', type = int, help = 'IDs of the videos to transcode (default: those without an HLS stream)')
+        parser.add_argument('--force', action = 'store_true', help = 'Transcode videos that already have an HLS stream')
+
+    def handle(self, *args, **options):
+        videos = JugglingVideo.objects.all()
+        if options['video_ids']:
+            videos = videos.filter(id__in = options['video_ids'])
+        if not options['force']:
+            videos = videos.filter(hls_playlist = '')
+
+        failures = 0
+        for video in videos:
+            try:
+                renditions = transcode_to_hls(video)
+            except (TranscodingError, CalledProcessError, OSError) as e:
+                failures += 1
+                self.stderr.write(f'{video.filename}: {getattr(e, "stderr", None) or e}')
+                continue
+            self.stdout.write(f"{video.filename}: {', '.join(rendition.name for rendition in renditions)}")
+
+        if failures:
+            raise CommandError(f'{failures} video(s) could not be transcoded')
@@ -0,0 +1,85 @@
+import json
+import os
+import subprocess
+from django.conf import settings
+from django.contrib.staticfiles import finders
+from vlog.mp4 import probe_mp4, make_faststart
+
+
+def find_static_file(path):
+    """
+    Returns the absolute filesystem path of a static file, or None if it cannot be found
+    Collected files (in STATIC_ROOT) are preferred to those in the apps' static directories
+    """
+    if settings.STATIC_ROOT:
+        collected_path = os.path.join(settings.STATIC_ROOT, path)
+        if os.path.isfile(collected_path):
+            return collected_path
+
+    return finders.find(path)
+
+
+def find_video_file(video):
+    return find_static_file(video.get_static_filename())
+
+
+def get_output_path(source, source_static_path, output_static_path):
+    """
+    Returns the filesystem path for a file generated from source, in the same static location as the source
+    """
+    static_location = source[:-len(source_static_path)]
+
+    return os.path.join(static_location, output_static_path)
+
+
+def ffmpeg_binary(name = 'ffmpeg'):
+    """
+    Returns the command for one of the ffmpeg tools ('ffmpeg' or 'ffprobe'), which can be set in the settings
+    """
+    return getattr(settings, f'{name.upper()}_BINARY', name)
+
+
+def run_ffmpeg(arguments):
+    """
+    Runs ffmpeg with the given arguments, raising subprocess.CalledProcessError if it fails
+    """
+    return subprocess.run([ffmpeg_binary(), '-hide_banner', '-loglevel', 'error', '-y', *arguments], check = True, capture_output = True)
+
+
+def probe_streams(path):
+    """
+    Returns a list of dicts describing the streams in a media file (codec_type, width, height, duration)
+    """
+    result = subprocess.run(
+        [ffmpeg_binary('ffprobe'), '-v', 'error', '-show_entries', 'stream=codec_type,width,height,duration', '-of', 'json', path],
+        check = True,
+        capture_output = True,
+    )
+
+    return json.loads(result.stdout).get('streams', [])
+
+
+def update_video_metadata(video, faststart = False):
+    """
+    Reads the video file's MP4 headers and saves its duration, size, bitrate and faststart status on the model
+    With faststart=True, a file whose moov box follows the media data is rewritten first
+    """
+    path = find_video_file(video)
+    if path is None:
+        raise FileNotFoundError(f'Could not find the video file for {video.filename}')
+
+    if faststart:
+        temporary_path = f'{path}.faststart'
+        try:
+            if make_faststart(path, temporary_path):
+                os.replace(temporary_path, path)
+        finally:
+            if os.path.exists(temporary_path):
+                os.remove(temporary_path)
+
+    info = probe_mp4(path)
+    for field, value in info._asdict().items():
+        setattr(video, field, value)
+    video.save(update_fields = list(info._fields))
+
+    return info
@@ -0,0 +1,21 @@
+# Generated by Django 4.2.30 on 2026-10-18 14:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('vlog', '0012_alter_videocomment_unique_together'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='jugglingvideo',
+            index=models.Index(fields=['-pub_date', '-id'], name='vlog_video_pub_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='videocomment',
+            index=models.Index(condition=models.Q(('is_approved', True)), fields=['video', 'date', 'id'], name='vlog_comment_approved_idx'),
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 4.2.30 on 2026-10-18 14:57
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('vlog', '0013_video_and_comment_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='jugglingvideo',
+            name='hls_playlist',
+            field=models.CharField(blank=True, default='', max_length=200),
+        ),
+        migrations.CreateModel(
+            name='VideoRendition',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=20)),
+                ('width', models.PositiveIntegerField()),
+                ('height', models.PositiveIntegerField()),
+                ('video_bitrate', models.PositiveIntegerField(help_text='kbit/s')),
+                ('audio_bitrate', models.PositiveIntegerField(default=0, help_text='kbit/s')),
+                ('playlist', models.CharField(max_length=200)),
+                ('video', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='renditions', to='vlog.jugglingvideo')),
+            ],
+            options={
+                'ordering': ('-height',),
+                'unique_together': {('video', 'name')},
+            },
+        ),
+    ]
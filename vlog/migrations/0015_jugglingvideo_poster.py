@@ -0,0 +1,18 @@
+# Generated by Django 4.2.30 on 2026-10-18 14:58
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('vlog', '0014_hls_renditions'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='jugglingvideo',
+            name='poster',
+            field=models.CharField(blank=True, default='', max_length=200),
+        ),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 4.2.30 on 2026-10-18 14:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('vlog', '0015_jugglingvideo_poster'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='jugglingvideo',
+            name='bitrate',
+            field=models.PositiveIntegerField(blank=True, help_text='kbit/s', null=True),
+        ),
+        migrations.AddField(
+            model_name='jugglingvideo',
+            name='duration',
+            field=models.FloatField(blank=True, help_text='seconds', null=True),
+        ),
+        migrations.AddField(
+            model_name='jugglingvideo',
+            name='file_size',
+            field=models.BigIntegerField(blank=True, help_text='bytes', null=True),
+        ),
+        migrations.AddField(
+            model_name='jugglingvideo',
+            name='height',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='jugglingvideo',
+            name='is_faststart',
+            field=models.BooleanField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='jugglingvideo',
+            name='width',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+    ]
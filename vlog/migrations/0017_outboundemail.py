@@ -0,0 +1,32 @@
+# Generated by Django 4.2.30 on 2026-10-18 15:05
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('vlog', '0016_jugglingvideo_file_metadata'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OutboundEmail',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('subject', models.TextField(default='')),
+                ('body', models.TextField(default='')),
+                ('from_email', models.TextField(blank=True, default='')),
+                ('recipients', models.TextField(default='', help_text='one address per line')),
+                ('created', models.DateTimeField(default=django.utils.timezone.now)),
+                ('send_after', models.DateTimeField(default=django.utils.timezone.now)),
+                ('attempts', models.PositiveIntegerField(default=0)),
+                ('last_error', models.TextField(blank=True, default='')),
+                ('sent_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'indexes': [models.Index(condition=models.Q(('sent_at__isnull', True)), fields=['send_after', 'id'], name='vlog_outbound_unsent_idx')],
+            },
+        ),
+    ]
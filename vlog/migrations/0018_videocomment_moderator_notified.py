@@ -0,0 +1,24 @@
+# Generated by Django 4.2.30 on 2026-10-18 15:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('vlog', '0017_outboundemail'),
+    ]
+
+    operations = [
+        # Existing comments are marked as notified, so the first digest only includes new comments
+        migrations.AddField(
+            model_name='videocomment',
+            name='moderator_notified',
+            field=models.BooleanField(default=True),
+        ),
+        migrations.AlterField(
+            model_name='videocomment',
+            name='moderator_notified',
+            field=models.BooleanField(default=False),
+        ),
+    ]
@@ -0,0 +1,54 @@
+# Generated by Django 4.2.30 on 2026-10-18 15:06
+
+import hashlib
+import json
+import unicodedata
+from django.db import migrations, models
+
+
+def get_comment_content_hash(text, author):
+    # A copy of vlog.models.get_comment_content_hash as it was when this migration was written
+    content = json.dumps([unicodedata.normalize('NFC', author.strip()), unicodedata.normalize('NFC', text.strip())])
+
+    return hashlib.sha256(content.encode()).hexdigest()
+
+
+def backfill_content_hashes(apps, schema_editor):
+    VideoComment = apps.get_model('vlog', 'VideoComment')
+    seen = set()
+    updated = []
+
+    for comment in VideoComment.objects.only('id', 'video_id', 'text', 'author').order_by('id').iterator():
+        content_hash = get_comment_content_hash(comment.text, comment.author)
+        if (comment.video_id, content_hash) in seen:
+            # Comments that only differed by surrounding whitespace were allowed before, so they are kept
+            content_hash = hashlib.sha256(f'legacy duplicate {comment.id}'.encode()).hexdigest()
+        seen.add((comment.video_id, content_hash))
+        comment.content_hash = content_hash
+        updated.append(comment)
+
+    VideoComment.objects.bulk_update(updated, ['content_hash'], batch_size = 500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('vlog', '0018_videocomment_moderator_notified'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='videocomment',
+            name='content_hash',
+            field=models.CharField(default='', editable=False, max_length=64),
+        ),
+        migrations.RunPython(backfill_content_hashes, migrations.RunPython.noop),
+        migrations.AlterUniqueTogether(
+            name='videocomment',
+            unique_together=set(),
+        ),
+        migrations.AddConstraint(
+            model_name='videocomment',
+            constraint=models.UniqueConstraint(fields=('video', 'content_hash'), name='vlog_comment_unique_content'),
+        ),
+    ]
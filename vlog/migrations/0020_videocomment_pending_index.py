@@ -0,0 +1,17 @@
+# Generated by Django 4.2.30 on 2026-10-18 15:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('vlog', '0019_videocomment_content_hash'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='videocomment',
+            index=models.Index(condition=models.Q(('is_approved', False)), fields=['date', 'id'], name='vlog_comment_pending_idx'),
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 4.2.30 on 2026-10-18 15:14
+
+from django.db import migrations, models
+from django.db.models import Count, Max, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def count_approved_comments(apps, schema_editor):
+    JugglingVideo = apps.get_model('vlog', 'JugglingVideo')
+    VideoComment = apps.get_model('vlog', 'VideoComment')
+    approved = VideoComment.objects.filter(video = OuterRef('pk'), is_approved = True).order_by().values('video')
+
+    JugglingVideo.objects.update(
+        approved_comment_count = Coalesce(Subquery(approved.annotate(count = Count('id')).values('count')), 0),
+        last_comment_at = Subquery(approved.annotate(latest = Max('date')).values('latest')),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('vlog', '0020_videocomment_pending_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='jugglingvideo',
+            name='approved_comment_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='jugglingvideo',
+            name='last_comment_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.RunPython(count_approved_comments, migrations.RunPython.noop),
+    ]
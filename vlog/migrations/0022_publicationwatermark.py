@@ -0,0 +1,28 @@
+# Generated by Django 4.2.30 on 2026-10-18 15:27
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+def start_watermark(apps, schema_editor):
+    # Videos that are already live when the watermark is introduced are not announced again
+    PublicationWatermark = apps.get_model('vlog', 'PublicationWatermark')
+    PublicationWatermark.objects.create(pk = 1, announced_up_to = django.utils.timezone.now())
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('vlog', '0021_jugglingvideo_comment_counts'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PublicationWatermark',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('announced_up_to', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+        ),
+        migrations.RunPython(start_watermark, migrations.RunPython.noop),
+    ]
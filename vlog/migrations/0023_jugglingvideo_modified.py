@@ -0,0 +1,18 @@
+# Generated by Django 4.2.30 on 2026-10-18 15:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('vlog', '0022_publicationwatermark'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='jugglingvideo',
+            name='modified',
+            field=models.DateTimeField(auto_now=True),
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 4.2.30 on 2026-10-18 15:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('vlog', '0023_jugglingvideo_modified'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='videocomment',
+            name='vlog_comment_pending_idx',
+        ),
+        migrations.AddField(
+            model_name='videocomment',
+            name='is_rejected',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddIndex(
+            model_name='videocomment',
+            index=models.Index(condition=models.Q(('is_approved', False), ('is_rejected', False)), fields=['date', 'id'], name='vlog_comment_pending_idx'),
+        ),
+    ]
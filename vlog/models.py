@@ -1,4 +1,9 @@
-from django.db import models
+import hashlib
+import json
+import unicodedata
+from django.db import models, router, transaction
+from django.db.models import Count, Max, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
 from django.urls import reverse
 from django.utils import timezone
 from django.core.exceptions import ValidationError
@@ -6,29 +11,135 @@ from django.core.exceptions import ValidationError
 # Create your models here.
 
 
+# Written only by JugglingVideo.refresh_comment_counts() and repair_comment_counts()
+COMMENT_COUNT_FIELDS = ('approved_comment_count', 'last_comment_at')
+
+
+class PublishedVideoQuerySet(models.QuerySet):
+
+    def for_listing(self):
+        """
+        Skip the author_comment text, which is only displayed on the detail page
+        """
+        return self.defer('author_comment')
+
+    def older_than(self, pub_date, video_id):
+        """
+        Keyset filter for the videos that follow (pub_date, video_id) in newest first order
+        """
+        return self.filter(Q(pub_date__lt = pub_date) | Q(pub_date = pub_date, id__lt = video_id))
+
+    def newer_than(self, pub_date, video_id):
+        """
+        Keyset filter for the videos that precede (pub_date, video_id), ordered oldest first
+        """
+        return self.filter(
+            Q(pub_date__gt = pub_date) | Q(pub_date = pub_date, id__gt = video_id)
+        ).order_by('pub_date', 'id')
+
+
+class PublishedVideoManager(models.Manager.from_queryset(PublishedVideoQuerySet)):
+    """
+    Only returns videos whose publication date has been reached, newest first
+    """
+
+    def get_queryset(self):
+        return super().get_queryset().filter(pub_date__lte = timezone.now()).order_by('-pub_date', '-id')
+
+
 class JugglingVideo(models.Model):
     filename = models.CharField(max_length = 60, default = '')
     title = models.CharField(max_length = 50, default = '')
     pub_date = models.DateTimeField(default = timezone.now)
     author_comment = models.TextField(default = '')
+    hls_playlist = models.CharField(max_length = 200, default = '', blank = True)
+    poster = models.CharField(max_length = 200, default = '', blank = True)
+    duration = models.FloatField(null = True, blank = True, help_text = 'seconds')
+    width = models.PositiveIntegerField(null = True, blank = True)
+    height = models.PositiveIntegerField(null = True, blank = True)
+    bitrate = models.PositiveIntegerField(null = True, blank = True, help_text = 'kbit/s')
+    file_size = models.BigIntegerField(null = True, blank = True, help_text = 'bytes')
+    is_faststart = models.BooleanField(null = True, blank = True)
+    # Part of the pages' ETags, so that returning visitors see edits to the video
+    modified = models.DateTimeField(auto_now = True)
+    # Kept up to date from the comments by refresh_comment_counts, so pages do not have to count them
+    approved_comment_count = models.PositiveIntegerField(default = 0, editable = False)
+    last_comment_at = models.DateTimeField(null = True, blank = True, editable = False)
+
+    objects = models.Manager()
+    published = PublishedVideoManager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields = ['-pub_date', '-id'], name = 'vlog_video_pub_date_idx'),
+        ]
 
     @classmethod
     def get_homepage_video(cls):
-        videos = JugglingVideo.objects.filter(pub_date__lte = timezone.now()).order_by('-pub_date')
+        video = cls.published.for_listing().first()
 
-        return videos[0] if videos else ''
+        return video if video else ''
 
     @classmethod
     def get_archive_videos(cls):
-        videos = JugglingVideo.objects.filter(pub_date__lte = timezone.now()).order_by('-pub_date')
+        return list(cls.published.for_listing()[1:])
 
-        return videos[1:] if (len(videos) > 1) else []
+    @classmethod
+    def refresh_comment_counts(cls, video_ids):
+        """
+        Recounts the approved comments of the given videos with a single UPDATE
+        """
+        approved = VideoComment.objects.filter(video = OuterRef('pk'), is_approved = True).order_by().values('video')
+        cls.objects.filter(id__in = video_ids).update(
+            approved_comment_count = Coalesce(Subquery(approved.annotate(count = Count('id')).values('count')), 0),
+            last_comment_at = Subquery(approved.annotate(latest = Max('date')).values('latest')),
+        )
+
+    @classmethod
+    def repair_comment_counts(cls):
+        """
+        Recounts the approved comments of every video with one grouped query, saving the counts that were wrong
+        Returns the number of videos that were corrected
+        """
+        counts = {
+            row['video']: (row['count'], row['latest'])
+            for row in VideoComment.objects.filter(is_approved = True).order_by().values('video')
+            .annotate(count = Count('id'), latest = Max('date'))
+        }
+        corrected = []
+
+        for video in cls.objects.only('id', 'approved_comment_count', 'last_comment_at'):
+            count, latest = counts.get(video.id, (0, None))
+            if (video.approved_comment_count, video.last_comment_at) != (count, latest):
+                video.approved_comment_count, video.last_comment_at = count, latest
+                corrected.append(video)
+
+        cls.objects.bulk_update(corrected, ['approved_comment_count', 'last_comment_at'], batch_size = 500)
+
+        return len(corrected)
+
+    def save(self, force_insert = False, force_update = False, using = None, update_fields = None):
+        """
+        Leaves out the comment counts unless they are named in update_fields
+        They are kept up to date by refresh_comment_counts(), so a video loaded before a comment was posted
+        (e.g. in the admin site) must not write its stale counts back
+        Saving any other field also updates modified, which the pages' ETags are based on
+        """
+        if update_fields is None and not force_insert and not self._state.adding:
+            update_fields = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in COMMENT_COUNT_FIELDS
+            ]
+        elif update_fields is not None and set(update_fields) - set(COMMENT_COUNT_FIELDS):
+            update_fields = {*update_fields, 'modified'}
+
+        super().save(force_insert = force_insert, force_update = force_update, using = using, update_fields = update_fields)
 
     def get_static_filename(self):
         return f'vlog/videos/{self.filename}'
 
     def get_approved_comments(self):
-        return self.videocomment_set.filter(is_approved = True)
+        return self.videocomment_set.filter(is_approved = True).order_by('date', 'id')
 
     def get_absolute_url(self):
         return reverse('vlog:detail', args = [self.id])
@@ -40,15 +151,120 @@ class JugglingVideo(models.Model):
         return f'{self.__class__}: {self.filename}'
 
 
+class PublicationWatermark(models.Model):
+    """
+    The publication date up to which the videos that went live have been announced (a single row)
+    Kept in the database so that no video is missed if the cached schedule is lost (see vlog/scheduling.py)
+    """
+    announced_up_to = models.DateTimeField(default = timezone.now)
+
+    def __str__(self):
+        return f'Announced up to {self.announced_up_to}'
+
+
+class VideoRendition(models.Model):
+    """
+    One of the bitrate variants in a video's adaptive (HLS) stream
+    """
+    video = models.ForeignKey(JugglingVideo, on_delete = models.CASCADE, related_name = 'renditions')
+    name = models.CharField(max_length = 20)
+    width = models.PositiveIntegerField()
+    height = models.PositiveIntegerField()
+    video_bitrate = models.PositiveIntegerField(help_text = 'kbit/s')
+    audio_bitrate = models.PositiveIntegerField(default = 0, help_text = 'kbit/s')
+    playlist = models.CharField(max_length = 200)
+
+    class Meta:
+        unique_together = ('video', 'name')
+        ordering = ('-height',)
+
+    def __str__(self):
+        return f'{self.video.filename} ({self.name})'
+
+    def __repr__(self):
+        return f'{self.__class__}: {self.video_id} {self.name}'
+
+
+DUPLICATE_COMMENT_ERROR = 'That comment has already been posted!'
+
+
+def get_comment_content_hash(text, author):
+    """
+    Returns the SHA-256 hex digest that identifies a comment's content, which duplicate comments share
+    """
+    content = json.dumps([unicodedata.normalize('NFC', author.strip()), unicodedata.normalize('NFC', text.strip())])
+
+    return hashlib.sha256(content.encode()).hexdigest()
+
+
 class VideoComment(models.Model):
     text = models.TextField(default = '')
     author = models.TextField(default = 'anonymous')
     video = models.ForeignKey(JugglingVideo, default = None, on_delete = models.SET_DEFAULT)
     date = models.DateTimeField(default = timezone.now)
     is_approved = models.BooleanField(default = True)
+    # Set when a moderator rejects a comment, which then leaves the moderation queue (and counts as spam in training)
+    is_rejected = models.BooleanField(default = False)
+    moderator_notified = models.BooleanField(default = False)
+    # Duplicate comments are detected with this short hash instead of a unique index over the text columns
+    content_hash = models.CharField(max_length = 64, default = '', editable = False)
 
     class Meta:
-        unique_together = ('text', 'author', 'video')
+        constraints = [
+            models.UniqueConstraint(fields = ['video', 'content_hash'], name = 'vlog_comment_unique_content'),
+        ]
+        indexes = [
+            # Partial index (where supported) covering the approved comments shown on a video's detail page
+            models.Index(
+                fields = ['video', 'date', 'id'],
+                name = 'vlog_comment_approved_idx',
+                condition = Q(is_approved = True),
+            ),
+            # Partial index (where supported) covering the moderation queue in the admin site
+            models.Index(
+                fields = ['date', 'id'],
+                name = 'vlog_comment_pending_idx',
+                condition = Q(is_approved = False, is_rejected = False),
+            ),
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        comment = super().from_db(db, field_names, values)
+        # Remembered so that the old video's comment count can be updated if the comment is moved
+        comment._loaded_video_id = comment.__dict__.get('video_id')
+        return comment
+
+    @property
+    def is_pending(self):
+        return not self.is_approved and not self.is_rejected
+
+    def clean(self):
+        self.content_hash = get_comment_content_hash(self.text, self.author)
+        if self.is_approved:
+            self.is_rejected = False
+
+    def validate_unique(self, exclude = None):
+        """
+        Forms leave out content_hash (it is not editable), so they would not check the unique constraint on it
+        Duplicates are looked up by hash here instead, so that forms (including the admin's) report them as errors
+        """
+        super().validate_unique(exclude)
+
+        if exclude and ('text' in exclude or 'author' in exclude):
+            # One of the fields already has an error
+            return
+
+        self.content_hash = get_comment_content_hash(self.text, self.author)
+        duplicates = VideoComment.objects.filter(video_id = self.video_id, content_hash = self.content_hash)
+        if duplicates.exclude(pk = self.pk).exists():
+            raise ValidationError({'text': [DUPLICATE_COMMENT_ERROR]})
+
+    def save(self, *args, **kwargs):
+        self.content_hash = get_comment_content_hash(self.text, self.author)
+        # The video's comment count is updated by a post_save receiver in the same transaction
+        with transaction.atomic(using = kwargs.get('using') or router.db_for_write(VideoComment, instance = self)):
+            super().save(*args, **kwargs)
 
     def __str__(self):
         return self.text
@@ -68,3 +284,37 @@ class Acknowledgement(models.Model):
     def __repr__(self):
         return f'{self.__class__}: {self.name}'
 
+
+class OutboundEmail(models.Model):
+    """
+    An email waiting in the queue that the send_queued_mail command delivers (see vlog/mail.py)
+    """
+    subject = models.TextField(default = '')
+    body = models.TextField(default = '')
+    from_email = models.TextField(default = '', blank = True)
+    recipients = models.TextField(default = '', help_text = 'one address per line')
+    created = models.DateTimeField(default = timezone.now)
+    send_after = models.DateTimeField(default = timezone.now)
+    attempts = models.PositiveIntegerField(default = 0)
+    last_error = models.TextField(default = '', blank = True)
+    sent_at = models.DateTimeField(null = True, blank = True)
+
+    class Meta:
+        indexes = [
+            # Partial index (where supported) covering the messages that the worker still has to send
+            models.Index(
+                fields = ['send_after', 'id'],
+                name = 'vlog_outbound_unsent_idx',
+                condition = Q(sent_at__isnull = True),
+            ),
+        ]
+
+    @property
+    def recipient_list(self):
+        return self.recipients.splitlines()
+
+    def __str__(self):
+        return self.subject
+
+    def __repr__(self):
+        return f'{self.__class__}: {self.subject}'
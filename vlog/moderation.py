@@ -0,0 +1,153 @@
+"""
+Comment moderation
+
+The send_comment_digest management command (run on a schedule, e.g. hourly from cron) collects the comments
+that moderators have not been told about yet and queues a single summary email for them (see vlog/mail.py),
+so a burst of comments produces one email rather than one per comment, and posting a comment does no email work.
+
+The bulk actions and the moderation queue in the admin site (see vlog/admin.py) use the functions below,
+which change any number of comments with one statement.
+"""
+from django.conf import settings
+from django.db import connections, router, transaction
+from django.db.models import Count, Max, Q
+from django.utils import timezone
+from vlog.cache import invalidate_cached_pages, invalidate_comment_threads
+from vlog.mail import enqueue_mail
+from vlog.models import JugglingVideo, VideoComment
+from vlog.pagination import decode_cursor, encode_cursor
+
+
+DIGEST_COMMENT_LIMIT = 100
+MODERATION_PAGE_SIZE = 100
+
+
+def format_comment(comment):
+    date = timezone.localtime(comment.date).strftime('%d %b %Y %H:%M')
+
+    return f'{comment.video.title}\n{comment.author} ({date}):\n{comment.text}\n'
+
+
+def build_comment_digest(comments, total):
+    """
+    Returns the subject and body of a digest email listing the given comments, with those awaiting approval first
+    """
+    pending = [comment for comment in comments if comment.is_pending]
+    approved = [comment for comment in comments if comment.is_approved]
+    subject = f"{total} new comment{'s' if total != 1 else ''} ({len(pending)} awaiting approval)"
+    sections = []
+
+    if pending:
+        sections.append('Awaiting approval:\n\n' + '\n'.join(format_comment(comment) for comment in pending))
+    if approved:
+        sections.append('Published:\n\n' + '\n'.join(format_comment(comment) for comment in approved))
+    if total > len(comments):
+        sections.append(f'...and {total - len(comments)} more. See the admin site for the full list.')
+
+    return subject, '\n\n'.join(sections)
+
+
+def queue_comment_digest(recipient_list = None):
+    """
+    Queues one digest email covering every comment that moderators have not been notified about
+    Returns the number of comments included, which is 0 if no email was queued
+    """
+    recipient_list = settings.MODERATOR_EMAILS if recipient_list is None else recipient_list
+    if not recipient_list:
+        return 0
+
+    with transaction.atomic():
+        summary = VideoComment.objects.filter(moderator_notified = False).aggregate(total = Count('id'), last_id = Max('id'))
+        if not summary['total']:
+            return 0
+        # Only the comments that were counted are included, so any posted meanwhile go in the next digest
+        new_comments = VideoComment.objects.filter(moderator_notified = False, id__lte = summary['last_id'])
+        comments = list(new_comments.select_related('video').order_by('date', 'id')[:DIGEST_COMMENT_LIMIT])
+        subject, body = build_comment_digest(comments, summary['total'])
+        enqueue_mail(subject, body, settings.EMAIL_HOST_USER, recipient_list)
+        new_comments.update(moderator_notified = True)
+
+    return summary['total']
+
+
+def change_comments(queryset, change):
+    """
+    Applies a bulk change to the comments in a queryset and updates the comment counts of their videos
+    The bulk statements do not send the post_save and post_delete signals that usually do this,
+    so the counts are updated here, with one more statement, and the cached pages and comment threads are retired.
+    """
+    with transaction.atomic():
+        video_ids = set(queryset.order_by().values_list('video_id', flat = True).distinct())
+        count = change(queryset)
+        JugglingVideo.refresh_comment_counts(video_ids)
+    invalidate_cached_pages()
+    invalidate_comment_threads(video_ids)
+
+    return count
+
+
+def approve_comments(queryset):
+    """
+    Approves the comments in a queryset with a single UPDATE and returns the number changed
+    """
+    return change_comments(queryset, lambda comments: comments.update(is_approved = True, is_rejected = False))
+
+
+def reject_comments(queryset):
+    """
+    Hides the comments in a queryset and takes them out of the moderation queue with a single UPDATE
+    Returns the number changed
+    """
+    return change_comments(queryset, lambda comments: comments.update(is_approved = False, is_rejected = True))
+
+
+def delete_rows(comments):
+    """
+    Deletes the comments in a queryset with one DELETE ... WHERE id IN (SELECT ...) statement
+    QuerySet.delete() would fetch every row first to send post_delete, which change_comments() makes unnecessary,
+    and nothing else refers to comments
+    """
+    database = router.db_for_write(VideoComment)
+    connection = connections[database]
+    ids_sql, params = comments.order_by().values('pk').query.get_compiler(using = database).as_sql()
+    table = connection.ops.quote_name(VideoComment._meta.db_table)
+    pk_column = connection.ops.quote_name(VideoComment._meta.pk.column)
+
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {table} WHERE {pk_column} IN ({ids_sql})', params)
+        return cursor.rowcount
+
+
+def delete_comments(queryset):
+    """
+    Deletes the comments in a queryset with a single DELETE and returns the number deleted
+    """
+    return change_comments(queryset, delete_rows)
+
+
+class ModerationPage:
+    """
+    One page of the comments awaiting moderation, oldest first
+    """
+
+    def __init__(self, comments, has_more):
+        self.comments = comments
+        self.has_more = has_more and bool(comments)
+
+    @property
+    def next_cursor(self):
+        return encode_cursor(self.comments[-1], date_field = 'date') if self.has_more else None
+
+
+def get_moderation_page(after = None, page_size = MODERATION_PAGE_SIZE):
+    """
+    Returns a ModerationPage of the comments that are waiting for approval (neither approved nor rejected)
+    Pages are found by seeking from a cursor, so the queue stays fast however many comments are waiting
+    """
+    comments = VideoComment.objects.filter(is_approved = False, is_rejected = False).select_related('video').order_by('date', 'id')
+    if after:
+        date, comment_id = decode_cursor(after)
+        comments = comments.filter(Q(date__gt = date) | Q(date = date, id__gt = comment_id))
+    comments = list(comments[:page_size + 1])
+
+    return ModerationPage(comments[:page_size], has_more = len(comments) > page_size)
@@ -0,0 +1,194 @@
+"""
+A minimal MP4 (ISO base media file) box parser
+
+Reads the metadata that the site needs from a video's headers without any external tools:
+duration, frame size, overall bitrate, file size and whether the file is 'faststart' (i.e. its
+moov box comes before the media data, so that playback can begin before the whole file has loaded).
+It can also rewrite a file so that it is faststart.
+"""
+import io
+import os
+import struct
+from collections import namedtuple
+
+
+CONTAINER_BOXES = {b'moov', b'trak', b'mdia', b'minf', b'stbl', b'edts', b'dinf', b'udta'}
+COPY_CHUNK_SIZE = 1024 * 1024
+
+Box = namedtuple('Box', ['type', 'start', 'header_size', 'size'])
+MP4Info = namedtuple('MP4Info', ['duration', 'width', 'height', 'bitrate', 'file_size', 'is_faststart'])
+
+
+class MP4Error(Exception):
+    pass
+
+
+def iter_boxes(file, start, end):
+    """
+    Yields the boxes between two offsets of a file without reading their contents
+    """
+    offset = start
+
+    while offset + 8 <= end:
+        file.seek(offset)
+        size, box_type = struct.unpack('>I4s', file.read(8))
+        header_size = 8
+        if size == 1:
+            size = struct.unpack('>Q', file.read(8))[0]
+            header_size = 16
+        elif size == 0:
+            # The box extends to the end of the file
+            size = end - offset
+        if size < header_size or offset + size > end:
+            raise MP4Error(f'Invalid size for {box_type!r} box at offset {offset}')
+
+        yield Box(box_type, offset, header_size, size)
+        offset += size
+
+
+def read_payload(file, box):
+    file.seek(box.start + box.header_size)
+
+    return file.read(box.size - box.header_size)
+
+
+def find_child(file, box, box_type):
+    return next((child for child in iter_boxes(file, box.start + box.header_size, box.start + box.size) if child.type == box_type), None)
+
+
+def parse_mvhd(payload):
+    """
+    Returns the duration in seconds from a movie header
+    """
+    if payload[0] == 1:
+        timescale, duration = struct.unpack('>IQ', payload[20:32])
+    else:
+        timescale, duration = struct.unpack('>II', payload[12:20])
+
+    return duration / timescale if timescale else None
+
+
+def parse_track(file, trak):
+    """
+    Returns the (width, height) of a video track, or None for other kinds of track
+    """
+    mdia = find_child(file, trak, b'mdia')
+    hdlr = find_child(file, mdia, b'hdlr') if mdia else None
+    tkhd = find_child(file, trak, b'tkhd')
+
+    if hdlr is None or tkhd is None or read_payload(file, hdlr)[8:12] != b'vide':
+        return None
+
+    # The track header ends with the width and height as 16.16 fixed point numbers
+    width, height = struct.unpack('>II', read_payload(file, tkhd)[-8:])
+
+    return width >> 16, height >> 16
+
+
+def probe_mp4(path):
+    """
+    Returns an MP4Info for the file at path
+    """
+    file_size = os.path.getsize(path)
+
+    with open(path, 'rb') as file:
+        try:
+            boxes = list(iter_boxes(file, 0, file_size))
+            moov = next((box for box in boxes if box.type == b'moov'), None)
+            if moov is None:
+                raise MP4Error('The file does not contain a moov box')
+
+            mvhd = find_child(file, moov, b'mvhd')
+            duration = parse_mvhd(read_payload(file, mvhd)) if mvhd else None
+            width = height = None
+            for box in iter_boxes(file, moov.start + moov.header_size, moov.start + moov.size):
+                if box.type == b'trak':
+                    dimensions = parse_track(file, box)
+                    if dimensions:
+                        width, height = dimensions
+                        break
+        except struct.error:
+            raise MP4Error('The file is truncated')
+
+    mdat_offsets = [box.start for box in boxes if box.type == b'mdat']
+    bitrate = round(file_size * 8 / duration / 1000) if duration else None
+
+    return MP4Info(
+        duration = duration,
+        width = width,
+        height = height,
+        bitrate = bitrate,
+        file_size = file_size,
+        is_faststart = not mdat_offsets or moov.start < min(mdat_offsets),
+    )
+
+
+def shift_chunk_offsets(moov, header_size, shift, moved_start, moved_end):
+    """
+    Adds shift to the chunk offsets (stco/co64 entries) in the moov box's bytes that point into the data
+    between moved_start and moved_end, in place
+    """
+    stream = io.BytesIO(moov)
+    pending = [Box(b'moov', 0, header_size, len(moov))]
+
+    while pending:
+        parent = pending.pop()
+        for box in iter_boxes(stream, parent.start + parent.header_size, parent.start + parent.size):
+            if box.type in CONTAINER_BOXES:
+                pending.append(box)
+            elif box.type in (b'stco', b'co64'):
+                table_start = box.start + box.header_size + 8
+                entry_count = struct.unpack_from('>I', moov, table_start - 4)[0]
+                entry_format = '>I' if box.type == b'stco' else '>Q'
+                entry_size = struct.calcsize(entry_format)
+                for i in range(entry_count):
+                    position = table_start + i * entry_size
+                    offset = struct.unpack_from(entry_format, moov, position)[0]
+                    if not moved_start <= offset < moved_end:
+                        continue
+                    offset += shift
+                    if box.type == b'stco' and offset > 0xFFFFFFFF:
+                        raise MP4Error('Chunk offsets would overflow a stco box')
+                    struct.pack_into(entry_format, moov, position, offset)
+
+
+def make_faststart(path, output_path):
+    """
+    Writes a copy of the MP4 at path to output_path with its moov box moved in front of the media data
+    Returns False (and writes nothing) if the file is already faststart
+    """
+    file_size = os.path.getsize(path)
+
+    with open(path, 'rb') as file:
+        boxes = list(iter_boxes(file, 0, file_size))
+        moov = next((box for box in boxes if box.type == b'moov'), None)
+        first_mdat = next((box for box in boxes if box.type == b'mdat'), None)
+        if moov is None:
+            raise MP4Error('The file does not contain a moov box')
+        if first_mdat is None or moov.start < first_mdat.start:
+            return False
+
+        file.seek(moov.start)
+        moov_bytes = bytearray(file.read(moov.size))
+        # Only the data between the first mdat and the old moov box moves (back by the size of the moov box),
+        # as anything after the old moov box stays where it was
+        shift_chunk_offsets(moov_bytes, moov.header_size, moov.size, first_mdat.start, moov.start)
+
+        with open(output_path, 'wb') as output:
+            for box in boxes:
+                if box is first_mdat:
+                    output.write(moov_bytes)
+                if box is not moov:
+                    file.seek(box.start)
+                    copy_bytes(file, output, box.size)
+
+    return True
+
+
+def copy_bytes(source, destination, length):
+    while length > 0:
+        chunk = source.read(min(COPY_CHUNK_SIZE, length))
+        if not chunk:
+            raise MP4Error('The file is truncated')
+        destination.write(chunk)
+        length -= len(chunk)
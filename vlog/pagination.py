@@ -0,0 +1,71 @@
+from datetime import datetime, timezone as dt_timezone
+from django.http import Http404
+
+
+ARCHIVE_PAGE_SIZE = 10
+CURSOR_DATE_FORMAT = '%Y%m%d%H%M%S%f'
+
+
+def encode_cursor(item, date_field = 'pub_date'):
+    """
+    Returns a URL-safe cursor for an item's position in a list ordered by date and id, e.g. '20210809204600000000-12'
+    """
+    date = getattr(item, date_field).astimezone(dt_timezone.utc)
+
+    return f'{date.strftime(CURSOR_DATE_FORMAT)}-{item.id}'
+
+
+def decode_cursor(cursor):
+    """
+    Returns the (date, id) pair from a cursor, raising Http404 if the cursor is malformed
+    """
+    try:
+        date_string, item_id = cursor.split('-')
+        date = datetime.strptime(date_string, CURSOR_DATE_FORMAT).replace(tzinfo = dt_timezone.utc)
+        return date, int(item_id)
+    except ValueError:
+        raise Http404('Invalid cursor')
+
+
+class ArchivePage:
+    """
+    One page of the video archive, ordered newest first
+    """
+
+    def __init__(self, videos, has_older, has_newer):
+        self.videos = videos
+        self.has_older = has_older and bool(videos)
+        self.has_newer = has_newer and bool(videos)
+
+    @property
+    def older_cursor(self):
+        return encode_cursor(self.videos[-1]) if self.has_older else None
+
+    @property
+    def newer_cursor(self):
+        return encode_cursor(self.videos[0]) if self.has_newer else None
+
+
+def get_archive_page(queryset, before = None, after = None, page_size = ARCHIVE_PAGE_SIZE):
+    """
+    Returns an ArchivePage from a queryset of published videos (newest first)
+    The newest video belongs to the homepage, so it is never included in the archive
+    Pages are found by seeking from a cursor rather than with an OFFSET, so deep pages are as cheap as the first one
+    """
+    if after:
+        # One extra row tells us whether there are newer pages and one more is the homepage video
+        videos = list(queryset.newer_than(*decode_cursor(after))[:page_size + 2])
+        has_newer = len(videos) > page_size + 1
+        videos = videos[:page_size] if has_newer else videos[:-1]
+        videos.reverse()
+
+        return ArchivePage(videos, has_older = True, has_newer = has_newer)
+
+    if before:
+        videos = list(queryset.older_than(*decode_cursor(before))[:page_size + 1])
+        has_newer = True
+    else:
+        videos = list(queryset[1:page_size + 2])
+        has_newer = False
+
+    return ArchivePage(videos[:page_size], has_older = len(videos) > page_size, has_newer = has_newer)
@@ -0,0 +1,150 @@
+"""
+Rate limiting for form submissions
+
+Each limit in settings.RATE_LIMITS allows a number of POSTs per window of seconds for each client IP
+address (or each video), estimated with a sliding window counter: the count for the current fixed window
+plus the previous window's count weighted by how much of it still overlaps the sliding window.
+Requests over a limit get a 429 response before the view runs, so they cost no database work.
+
+Counters are kept in the store named by settings.RATE_LIMIT_STORE. LocalMemoryCounterStore suits a single
+server process; CacheCounterStore shares counters between processes and servers through the default cache.
+"""
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.utils.module_loading import import_string
+
+
+class LocalMemoryCounterStore:
+    """
+    Counters held in this process, discarding the least recently used once there are max_entries of them
+    """
+
+    def __init__(self, max_entries = 10000):
+        self.max_entries = max_entries
+        self.counters = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            count, expires = self.counters.get(key, (0, 0))
+            return count if expires > time.monotonic() else 0
+
+    def increment(self, key, timeout):
+        with self.lock:
+            now = time.monotonic()
+            count, expires = self.counters.pop(key, (0, 0))
+            if expires <= now:
+                count, expires = 0, now + timeout
+            self.counters[key] = (count + 1, expires)
+            while len(self.counters) > self.max_entries:
+                self.counters.popitem(last = False)
+            return count + 1
+
+    def clear(self):
+        with self.lock:
+            self.counters.clear()
+
+
+class CacheCounterStore:
+    """
+    Counters held in the default cache, which should be one that all the server processes share
+    """
+
+    def get(self, key):
+        return cache.get(key, 0)
+
+    def increment(self, key, timeout):
+        cache.add(key, 0, timeout)
+        try:
+            return cache.incr(key)
+        except ValueError:
+            # The key expired between add() and incr()
+            cache.add(key, 1, timeout)
+            return 1
+
+    def clear(self):
+        # Counters expire with their windows, and cache.clear() would also remove cached pages
+        pass
+
+
+_store = None
+
+
+def get_counter_store():
+    global _store
+
+    store_class = import_string(settings.RATE_LIMIT_STORE)
+    if not isinstance(_store, store_class):
+        _store = store_class()
+
+    return _store
+
+
+def reset_rate_limits():
+    get_counter_store().clear()
+
+
+def get_client_ip(request, view_kwargs):
+    """
+    Returns the client's IP address from settings.RATE_LIMIT_IP_HEADER (e.g. HTTP_X_REAL_IP behind a proxy)
+    For a list such as X-Forwarded-For, each of the settings.RATE_LIMIT_PROXY_COUNT trusted proxies appends
+    the address it received the request from, so the client's address is that many entries from the end.
+    The entries before it are supplied by the client, which could change them to avoid the limits.
+    """
+    addresses = [address.strip() for address in request.META.get(settings.RATE_LIMIT_IP_HEADER, '').split(',')]
+    hops = min(max(settings.RATE_LIMIT_PROXY_COUNT, 1), len(addresses))
+
+    return addresses[-hops]
+
+
+def get_video_id(request, view_kwargs):
+    return view_kwargs.get('jugglingvideo_id')
+
+
+KEY_FUNCTIONS = {
+    'ip': get_client_ip,
+    'video': get_video_id,
+}
+
+
+def is_over_limit(key, limit, window):
+    """
+    Counts a request against a limit and returns True if the sliding window count is over it
+    """
+    now = time.time()
+    current_window = int(now // window)
+    previous_weight = 1 - (now % window) / window
+    previous_count = get_counter_store().get(f'{key}:{current_window - 1}')
+    # Each window's counter is needed until the end of the following window
+    current_count = get_counter_store().increment(f'{key}:{current_window}', 2 * window)
+
+    return previous_count * previous_weight + current_count > limit
+
+
+def rate_limit_posts(scope):
+    """
+    Answers POST requests with 429 Too Many Requests once they exceed any of settings.RATE_LIMITS[scope]
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method != 'POST':
+                return view(request, *args, **kwargs)
+
+            for key_name, (limit, window) in settings.RATE_LIMITS[scope].items():
+                identifier = KEY_FUNCTIONS[key_name](request, kwargs)
+                if is_over_limit(f'vlog.ratelimit:{scope}:{key_name}:{identifier}', limit, window):
+                    response = HttpResponse('Too many requests. Please try again later.', status = 429)
+                    response['Retry-After'] = str(window)
+                    return response
+
+            return view(request, *args, **kwargs)
+
+        return wrapper
+
+    return decorator
@@ -0,0 +1,95 @@
+from math import ceil
+from django.core.cache import cache
+from django.db import router
+from django.db.models import Min
+from django.dispatch import Signal
+from django.utils import timezone
+from vlog.models import JugglingVideo, PublicationWatermark
+
+
+# Sent with a 'video' argument when a scheduled video's publication date is reached
+video_published = Signal()
+
+WATERMARK_ID = 1
+
+NEXT_PUB_DATE_KEY = 'vlog:next_pub_date'
+NEXT_PUB_DATE_TIMEOUT = 60 * 60 * 24
+_MISSING = object()
+
+
+def get_announced_up_to():
+    """
+    Returns the publication date up to which videos have been announced, read from the primary database
+    """
+    watermark, created = PublicationWatermark.objects.using(router.db_for_write(PublicationWatermark)).get_or_create(
+        pk = WATERMARK_ID
+    )
+
+    return watermark.announced_up_to
+
+
+def get_next_pub_date():
+    """
+    Returns the publication date of the next video that has not been announced yet (or None)
+    This is in the past if a video has gone live without being announced, which publish_due_videos() then does
+    The date is cached until a video is saved or deleted, or until the scheduled video is announced
+    """
+    next_pub_date = cache.get(NEXT_PUB_DATE_KEY, _MISSING)
+
+    if next_pub_date is _MISSING:
+        next_pub_date = JugglingVideo.objects.using(router.db_for_write(JugglingVideo)).filter(
+            pub_date__gt = get_announced_up_to()
+        ).aggregate(Min('pub_date'))['pub_date__min']
+        cache.set(NEXT_PUB_DATE_KEY, next_pub_date, NEXT_PUB_DATE_TIMEOUT)
+
+    return next_pub_date
+
+
+def reset_schedule():
+    cache.delete(NEXT_PUB_DATE_KEY)
+
+
+def seconds_until_next_publication(default = None):
+    """
+    Returns the number of seconds until the next scheduled video is published (at least 1)
+    The default is returned if no videos are scheduled
+    """
+    next_pub_date = get_next_pub_date()
+
+    if next_pub_date is None:
+        return default
+
+    return max(1, ceil((next_pub_date - timezone.now()).total_seconds()))
+
+
+def publish_due_videos():
+    """
+    Sends video_published for each video whose publication date has passed since the last announcement
+    Returns the list of videos that went live
+    """
+    next_pub_date = get_next_pub_date()
+    now = timezone.now()
+
+    if next_pub_date is None or next_pub_date > now:
+        return []
+
+    reset_schedule()
+    database = router.db_for_write(PublicationWatermark)
+    announced_up_to = get_announced_up_to()
+
+    # Only the process that moves the watermark on announces the videos
+    if not PublicationWatermark.objects.using(database).filter(
+        pk = WATERMARK_ID, announced_up_to = announced_up_to,
+    ).update(announced_up_to = now):
+        return []
+
+    videos = list(
+        JugglingVideo.objects.using(database).filter(pub_date__gt = announced_up_to, pub_date__lte = now).order_by('pub_date', 'id')
+    )
+    for video in videos:
+        video_published.send(sender = JugglingVideo, video = video)
+
+    # Caches the date of the next video now that the watermark has moved on
+    get_next_pub_date()
+
+    return videos
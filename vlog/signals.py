@@ -0,0 +1,29 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from vlog.cache import invalidate_cached_pages, invalidate_comment_threads
+from vlog.models import JugglingVideo, VideoComment
+from vlog.scheduling import video_published, reset_schedule
+
+
+@receiver([post_save, post_delete], sender = JugglingVideo)
+@receiver([post_save, post_delete], sender = VideoComment)
+def invalidate_cached_pages_on_change(sender, **kwargs):
+    invalidate_cached_pages()
+
+
+@receiver([post_save, post_delete], sender = VideoComment)
+def refresh_comment_counts_on_change(sender, instance, **kwargs):
+    video_ids = {instance.video_id, getattr(instance, '_loaded_video_id', None)} - {None}
+    JugglingVideo.refresh_comment_counts(video_ids)
+    invalidate_comment_threads(video_ids)
+    instance._loaded_video_id = instance.video_id
+
+
+@receiver([post_save, post_delete], sender = JugglingVideo)
+def reset_schedule_on_video_change(sender, **kwargs):
+    reset_schedule()
+
+
+@receiver(video_published)
+def invalidate_cached_pages_on_publication(sender, video, **kwargs):
+    invalidate_cached_pages()
@@ -0,0 +1,157 @@
+"""
+Spam filtering for comments
+
+CommentForm asks the classifier named by settings.COMMENT_CLASSIFIER whether each new comment is spam,
+and spam is saved unapproved so that it waits in the moderation queue instead of appearing on the site.
+A classifier is any class with an is_spam(text, author) method.
+
+The default classifier is a naive Bayes model over the words in comments, trained by the train_spam_filter
+command from approved comments (ham) and comments that a moderator rejected (spam). Comments still awaiting
+moderation, including those the filter held back, are left out so that the model does not learn from its own
+guesses. Moderators should reject spam (in the moderation queue or with the admin action) rather than delete it,
+so it stays available for training. The model is kept in memory and reloaded when its file changes.
+"""
+import json
+import math
+import os
+import re
+from collections import Counter
+from django.conf import settings
+from django.db.models import Q
+from django.utils.module_loading import import_string
+from vlog.models import VideoComment
+
+
+TOKENS = re.compile(r"[a-z0-9][a-z0-9'_-]{1,29}")
+URLS = re.compile(r'https?://|www\.')
+
+
+def tokenize(text, author = ''):
+    """
+    Returns the set of features in a comment: its words, plus markers for links and for its author
+    """
+    tokens = set(TOKENS.findall(text.lower()))
+    if URLS.search(text):
+        tokens.add('__link__')
+    if author and author != 'anonymous':
+        tokens.add(f'__author__{author.lower()}')
+
+    return tokens
+
+
+class NaiveBayesModel:
+    """
+    A naive Bayes model, stored as the log likelihood ratio (spam vs ham) of each token
+    so that scoring a comment only needs one dictionary lookup per token
+    Tokens that were not in the training data are neutral: a new word is no evidence either way,
+    and scoring it from the class sizes alone would push every new word towards the smaller class.
+    """
+
+    def __init__(self, prior, log_ratios):
+        self.prior = prior
+        self.log_ratios = log_ratios
+
+    @classmethod
+    def train(cls, ham_documents, spam_documents):
+        """
+        Returns a model trained from lists of token sets, using add-one smoothing
+        """
+        ham_counts = Counter(token for tokens in ham_documents for token in tokens)
+        spam_counts = Counter(token for tokens in spam_documents for token in tokens)
+        ham_total = len(ham_documents) + 2
+        spam_total = len(spam_documents) + 2
+
+        log_ratios = {
+            token: math.log((spam_counts[token] + 1) / spam_total) - math.log((ham_counts[token] + 1) / ham_total)
+            for token in ham_counts.keys() | spam_counts.keys()
+        }
+        prior = math.log((len(spam_documents) + 1) / (len(ham_documents) + 1))
+
+        return cls(prior, log_ratios)
+
+    def spam_probability(self, tokens):
+        log_odds = self.prior + sum(self.log_ratios.get(token, 0.0) for token in tokens)
+        # Clamped so that very long comments cannot overflow math.exp
+        log_odds = max(-50.0, min(50.0, log_odds))
+
+        return 1 / (1 + math.exp(-log_odds))
+
+    def to_dict(self):
+        return {'prior': self.prior, 'log_ratios': self.log_ratios}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data['prior'], data['log_ratios'])
+
+
+def train_model(path = None):
+    """
+    Trains a model from the moderated comments in the database and writes it to settings.SPAM_MODEL_PATH
+    Returns the number of ham and spam comments used
+    """
+    ham_documents = []
+    spam_documents = []
+    moderated = VideoComment.objects.filter(Q(is_approved = True) | Q(is_rejected = True))
+
+    for text, author, is_approved in moderated.values_list('text', 'author', 'is_approved').iterator():
+        (ham_documents if is_approved else spam_documents).append(tokenize(text, author))
+
+    model = NaiveBayesModel.train(ham_documents, spam_documents)
+    path = path or settings.SPAM_MODEL_PATH
+    temporary_path = f'{path}.tmp'
+    with open(temporary_path, 'w', encoding = 'utf-8') as model_file:
+        json.dump(model.to_dict(), model_file)
+    # Replaced in one step so that a running server never reads a half-written model
+    os.replace(temporary_path, path)
+
+    return len(ham_documents), len(spam_documents)
+
+
+class NaiveBayesCommentClassifier:
+    """
+    Classifies comments with the model in settings.SPAM_MODEL_PATH, which is reloaded whenever the file changes
+    Every comment is accepted until a model has been trained.
+    """
+
+    def __init__(self):
+        self.model = None
+        self.model_version = None
+
+    def get_model(self):
+        path = settings.SPAM_MODEL_PATH
+        try:
+            version = (str(path), os.stat(path).st_mtime_ns)
+        except FileNotFoundError:
+            self.model = self.model_version = None
+            return None
+
+        if version != self.model_version:
+            with open(path, encoding = 'utf-8') as model_file:
+                self.model = NaiveBayesModel.from_dict(json.load(model_file))
+            self.model_version = version
+
+        return self.model
+
+    def spam_probability(self, text, author = ''):
+        model = self.get_model()
+
+        return model.spam_probability(tokenize(text, author)) if model else 0.0
+
+    def is_spam(self, text, author = ''):
+        return self.spam_probability(text, author) >= settings.SPAM_THRESHOLD
+
+
+_classifier = None
+
+
+def get_comment_classifier():
+    """
+    Returns the shared instance of the classifier named by settings.COMMENT_CLASSIFIER
+    """
+    global _classifier
+
+    classifier_class = import_string(settings.COMMENT_CLASSIFIER)
+    if not isinstance(_classifier, classifier_class):
+        _classifier = classifier_class()
+
+    return _classifier
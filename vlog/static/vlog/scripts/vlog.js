@@ -1,5 +1,23 @@
 window.jvlog = {};
 
+window.jvlog.loadOlderVideos = (link) => {
+  if (link.data('loading')) {
+    return;
+  }
+  link.data('loading', true);
+
+  $.getJSON(link.data('more-url'), { before: link.data('cursor') }, (data) => {
+    $('.archive_videos').append(data.html);
+    if (data.older_cursor) {
+      link.data('cursor', data.older_cursor);
+      link.attr('href', `${link.attr('href').split('?')[0]}?before=${data.older_cursor}`);
+      link.data('loading', false);
+    } else {
+      link.remove();
+    }
+  });
+};
+
 window.jvlog.initialise = () => {
   $('#id_author').on('keypress', () => {
     $('.comment.error').hide();
@@ -35,4 +53,15 @@ window.jvlog.initialise = () => {
     $(this).children('a').removeClass('displaying-flyout');
   });
 
+  if ($('.older_link').length && 'IntersectionObserver' in window) {
+    const observer = new IntersectionObserver((entries) => {
+      entries.forEach((entry) => {
+        if (entry.isIntersecting) {
+          window.jvlog.loadOlderVideos($(entry.target));
+        }
+      });
+    });
+    observer.observe($('.older_link')[0]);
+  }
+
 };
@@ -0,0 +1,120 @@
+"""
+Byte-serving of video files, so that browsers can seek without downloading from the start
+
+Set VIDEO_SENDFILE to 'x-accel-redirect' (nginx) or 'x-sendfile' (Apache/lighttpd) to hand the
+transfer to the front web server instead. With x-accel-redirect, VIDEO_ACCEL_REDIRECT_PREFIX
+should be an internal nginx location that maps on to the videos directory.
+"""
+import os
+import re
+from django.conf import settings
+from django.http import FileResponse, HttpResponse, StreamingHttpResponse
+from django.utils.http import http_date, quote_etag
+
+
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+CHUNK_SIZE = 64 * 1024
+
+
+class UnsatisfiableRange(Exception):
+    pass
+
+
+def parse_range_header(header, size):
+    """
+    Returns the (start, end) byte positions (inclusive) requested by a Range header
+    None is returned if the whole file should be sent (no range, or a form that isn't supported)
+    UnsatisfiableRange is raised if the range lies outside the file
+    """
+    match = RANGE_RE.match(header.strip()) if header else None
+
+    if match is None or match.groups() == ('', ''):
+        return None
+
+    start, end = match.groups()
+    if start == '':
+        # A suffix range, i.e. the last N bytes
+        length = int(end)
+        if length == 0:
+            raise UnsatisfiableRange()
+        return max(0, size - length), size - 1
+
+    start = int(start)
+    end = min(int(end), size - 1) if end else size - 1
+    if start >= size or start > end:
+        raise UnsatisfiableRange()
+
+    return start, end
+
+
+def file_range_iterator(file, start, length, chunk_size = CHUNK_SIZE):
+    with file:
+        file.seek(start)
+        while length > 0:
+            chunk = file.read(min(chunk_size, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+
+
+def offload_response(path, relative_path, content_type):
+    """
+    Returns an empty response that asks the front web server to send the file, or None if offloading is disabled
+    """
+    backend = getattr(settings, 'VIDEO_SENDFILE', None)
+
+    if backend == 'x-accel-redirect':
+        response = HttpResponse(content_type = content_type)
+        response['X-Accel-Redirect'] = f"{settings.VIDEO_ACCEL_REDIRECT_PREFIX.rstrip('/')}/{relative_path}"
+    elif backend == 'x-sendfile':
+        response = HttpResponse(content_type = content_type)
+        response['X-Sendfile'] = path
+    else:
+        return None
+
+    return response
+
+
+def serve_file_range(request, path, relative_path, content_type = 'video/mp4'):
+    """
+    Returns a response for the file at path, honouring the request's Range header
+    """
+    response = offload_response(path, relative_path, content_type)
+    if response is not None:
+        return response
+
+    stat = os.stat(path)
+    etag = quote_etag(f'{int(stat.st_mtime):x}-{stat.st_size:x}')
+    last_modified = http_date(stat.st_mtime)
+
+    # A range only applies to the version of the file that the client already has part of
+    if_range = request.META.get('HTTP_IF_RANGE')
+    range_header = request.META.get('HTTP_RANGE') if if_range in (None, etag, last_modified) else None
+
+    try:
+        byte_range = parse_range_header(range_header, stat.st_size)
+    except UnsatisfiableRange:
+        response = HttpResponse(status = 416)
+        response['Content-Range'] = f'bytes */{stat.st_size}'
+        return response
+
+    if byte_range is None:
+        # FileResponse can use the server's wsgi.file_wrapper (e.g. sendfile) for the whole file
+        response = FileResponse(open(path, 'rb'), content_type = content_type)
+    else:
+        start, end = byte_range
+        length = end - start + 1
+        response = StreamingHttpResponse(
+            file_range_iterator(open(path, 'rb'), start, length),
+            status = 206,
+            content_type = content_type,
+        )
+        response['Content-Length'] = str(length)
+        response['Content-Range'] = f'bytes {start}-{end}/{stat.st_size}'
+
+    response['Accept-Ranges'] = 'bytes'
+    response['ETag'] = etag
+    response['Last-Modified'] = last_modified
+
+    return response
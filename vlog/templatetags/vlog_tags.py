@@ -0,0 +1,41 @@
+from urllib.parse import quote, urljoin
+from django import template
+from django.templatetags.static import PrefixNode, static
+from django.utils.html import format_html
+from django.utils.safestring import mark_safe
+from vlog.critical_css import STYLESHEET, load_critical_css
+
+
+register = template.Library()
+
+
+@register.simple_tag(takes_context = True)
+def critical_stylesheet(context):
+    """
+    Inlines the critical CSS for the current page and loads the full stylesheet without blocking the first render
+    Falls back to a normal stylesheet link if no critical CSS has been extracted for the page
+    """
+    request = context.get('request')
+    resolver_match = getattr(request, 'resolver_match', None)
+    critical_css = load_critical_css(resolver_match.view_name) if resolver_match else None
+    href = static(STYLESHEET)
+
+    if critical_css is None:
+        return format_html('<link rel="stylesheet" type="text/css" href="{}">', href)
+
+    return format_html(
+        '<style>{}</style>\n'
+        '    <link rel="preload" href="{}" as="style" onload="this.onload=null;this.rel=\'stylesheet\'">\n'
+        '    <noscript><link rel="stylesheet" type="text/css" href="{}"></noscript>',
+        mark_safe(critical_css), href, href,
+    )
+
+
+@register.simple_tag
+def video_static(path):
+    """
+    Returns the URL of a video, poster or HLS playlist under STATIC_ROOT
+    These files are added after collectstatic (see vlog/media.py), so they are not in the staticfiles manifest
+    and have to be linked by their own names rather than through {% static %}
+    """
+    return urljoin(PrefixNode.handle_simple('STATIC_URL'), quote(path))
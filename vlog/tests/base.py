@@ -1,10 +1,17 @@
 from django.test import TestCase
+from django.core.cache import cache
 from django.urls import reverse
 from vlog.models import JugglingVideo
+from vlog.ratelimit import reset_rate_limits
 
 
 class JugglingVideoSiteTest(TestCase):
 
+    def setUp(self):
+        # Cached pages would otherwise outlive the database rollback at the end of each test
+        cache.clear()
+        reset_rate_limits()
+
     def check_context_dict_contains_correct_selected_item_for_view(self, view_name, desired_selected_value, arguments = None):
         """
         The context dict for a given view should contain the correct value for 'selected' in the context dict
@@ -0,0 +1,199 @@
+from django.contrib.auth.models import User
+from django.urls import reverse
+from unittest.mock import patch
+from vlog.models import VideoComment, DUPLICATE_COMMENT_ERROR
+from vlog.moderation import approve_comments, delete_comments, reject_comments
+from .base import JugglingVideoSiteTest
+
+
+class CommentModerationTest(JugglingVideoSiteTest):
+    """
+    Tests for moderating comments in the admin site
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.video = self.post_video()
+        self.admin_user = User.objects.create_superuser('moderator', 'moderator@example.com', 'password')
+        self.client.force_login(self.admin_user)
+
+    def add_comments(self, count, is_approved = False):
+        return [
+            VideoComment.objects.create(video = self.video, text = f'Comment {number}', is_approved = is_approved)
+            for number in range(count)
+        ]
+
+    def test_bulk_functions_use_a_fixed_number_of_statements(self):
+        """
+        One statement changes the comments, plus one to find their videos and one to update the videos' comment counts
+        (The other two are the savepoint statements of the transaction within the test's transaction)
+        """
+        self.add_comments(5)
+
+        with self.assertNumQueries(5):
+            self.assertEqual(approve_comments(VideoComment.objects.all()), 5)
+        with self.assertNumQueries(5):
+            self.assertEqual(reject_comments(VideoComment.objects.filter(text = 'Comment 0')), 1)
+        with self.assertNumQueries(5):
+            self.assertEqual(delete_comments(VideoComment.objects.filter(is_approved = False)), 1)
+
+        self.assertEqual(VideoComment.objects.count(), 4)
+
+    def test_bulk_functions_update_comment_counts(self):
+        self.add_comments(3)
+
+        approve_comments(VideoComment.objects.all())
+        self.video.refresh_from_db()
+        self.assertEqual(self.video.approved_comment_count, 3)
+
+        delete_comments(VideoComment.objects.filter(text = 'Comment 0'))
+        reject_comments(VideoComment.objects.filter(text = 'Comment 1'))
+        self.video.refresh_from_db()
+        self.assertEqual(self.video.approved_comment_count, 1)
+        self.assertEqual(self.video.last_comment_at, VideoComment.objects.get(text = 'Comment 2').date)
+
+    def test_bulk_approval_updates_cached_pages(self):
+        self.add_comments(1)
+        detail_url = reverse('vlog:detail', args = [self.video.id])
+        self.client.get(detail_url)
+
+        approve_comments(VideoComment.objects.all())
+
+        self.assertContains(self.client.get(detail_url), 'Comment 0')
+
+    def test_changelist_query_count_does_not_depend_on_number_of_comments(self):
+        """
+        Session, user, count and one query for the comments joined to their videos
+        """
+        changelist_url = reverse('admin:vlog_videocomment_changelist')
+        self.add_comments(1)
+
+        with self.assertNumQueries(4):
+            self.client.get(changelist_url)
+        second_video = self.post_video(video = 'second')
+        for number in range(3):
+            VideoComment.objects.create(video = second_video, text = f'Another comment {number}')
+        with self.assertNumQueries(4):
+            self.client.get(changelist_url)
+
+    def test_changelist_actions_approve_and_delete_comments(self):
+        comments = self.add_comments(3)
+        changelist_url = reverse('admin:vlog_videocomment_changelist')
+
+        self.client.post(changelist_url, {'action': 'approve_selected', '_selected_action': [comments[0].id]})
+        self.client.post(changelist_url, {'action': 'delete_selected_comments', '_selected_action': [comments[1].id]})
+
+        self.assertEqual(
+            list(VideoComment.objects.order_by('id').values_list('text', 'is_approved')),
+            [('Comment 0', True), ('Comment 2', False)],
+        )
+
+    def test_changelist_can_be_filtered_by_approval(self):
+        self.add_comments(1)
+        VideoComment.objects.create(video = self.video, text = 'Approved comment')
+
+        response = self.client.get(reverse('admin:vlog_videocomment_changelist'), {'is_approved__exact': '0'})
+
+        self.assertContains(response, 'Comment 0')
+        self.assertNotContains(response, 'Approved comment')
+
+    def test_editing_a_comment_into_a_duplicate_shows_an_error(self):
+        """
+        The unique constraint on the content hash should be reported as a form error rather than an IntegrityError
+        """
+        VideoComment.objects.create(video = self.video, text = 'Nice video!', author = 'Juggler')
+        other_comment = VideoComment.objects.create(video = self.video, text = 'Great video!', author = 'Juggler')
+
+        response = self.client.post(reverse('admin:vlog_videocomment_change', args = [other_comment.id]), {
+            'text': 'Nice video!',
+            'author': 'Juggler',
+            'video': self.video.id,
+            'date_0': other_comment.date.strftime('%Y-%m-%d'),
+            'date_1': other_comment.date.strftime('%H:%M:%S'),
+            'is_approved': 'on',
+        })
+
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, DUPLICATE_COMMENT_ERROR)
+        other_comment.refresh_from_db()
+        self.assertEqual(other_comment.text, 'Great video!')
+
+    @patch('vlog.admin.MODERATION_PAGE_SIZE', 2)
+    def test_moderation_queue_pages_through_pending_comments(self):
+        self.add_comments(3)
+        VideoComment.objects.create(video = self.video, text = 'Approved comment')
+        queue_url = reverse('admin:vlog_videocomment_moderation')
+
+        first_page = self.client.get(queue_url)
+        second_page = self.client.get(queue_url, {'after': first_page.context['page'].next_cursor})
+
+        self.assertEqual([comment.text for comment in first_page.context['page'].comments], ['Comment 0', 'Comment 1'])
+        self.assertEqual([comment.text for comment in second_page.context['page'].comments], ['Comment 2'])
+        self.assertFalse(second_page.context['page'].has_more)
+        self.assertNotContains(second_page, 'Approved comment')
+
+    def test_moderation_queue_approves_selected_comments(self):
+        comments = self.add_comments(2)
+        queue_url = reverse('admin:vlog_videocomment_moderation')
+
+        response = self.client.post(queue_url, {'action': 'approve', 'comment': [comments[1].id]})
+
+        self.assertRedirects(response, queue_url)
+        self.assertEqual(list(VideoComment.objects.filter(is_approved = True)), [comments[1]])
+
+    def test_moderation_queue_rejects_selected_comments(self):
+        """
+        Rejected comments should leave the queue, unlike comments that are only unapproved
+        """
+        comments = self.add_comments(2)
+        queue_url = reverse('admin:vlog_videocomment_moderation')
+
+        self.client.post(queue_url, {'action': 'reject', 'comment': [comments[0].id]})
+        response = self.client.get(queue_url)
+
+        self.assertEqual(response.context['page'].comments, [comments[1]])
+        self.assertEqual(list(VideoComment.objects.filter(is_rejected = True)), [comments[0]])
+        self.assertFalse(VideoComment.objects.get(id = comments[0].id).is_approved)
+
+    def test_approving_a_rejected_comment_clears_the_rejection(self):
+        comment = self.add_comments(1)[0]
+        reject_comments(VideoComment.objects.all())
+
+        approve_comments(VideoComment.objects.all())
+        comment.refresh_from_db()
+
+        self.assertTrue(comment.is_approved)
+        self.assertFalse(comment.is_rejected)
+
+    def test_moderation_queue_deletes_selected_comments(self):
+        comments = self.add_comments(2)
+
+        self.client.post(reverse('admin:vlog_videocomment_moderation'), {'action': 'delete', 'comment': [comments[0].id]})
+
+        self.assertEqual(list(VideoComment.objects.all()), [comments[1]])
+
+    def test_moderation_queue_comments_are_not_selected_by_default(self):
+        """
+        A click on the wrong button should not change a whole page of comments
+        """
+        comment = self.add_comments(1)[0]
+
+        response = self.client.get(reverse('admin:vlog_videocomment_moderation'))
+
+        self.assertContains(response, f'<input type="checkbox" name="comment" value="{comment.id}">', html = True)
+        self.assertNotContains(response, 'checked')
+
+    def test_moderation_queue_ignores_invalid_comment_ids(self):
+        comments = self.add_comments(2)
+
+        response = self.client.post(reverse('admin:vlog_videocomment_moderation'), {'action': 'approve', 'comment': ['x', '1.5', comments[0].id]})
+
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(list(VideoComment.objects.filter(is_approved = True)), [comments[0]])
+
+    def test_moderation_queue_requires_staff_login(self):
+        self.client.logout()
+
+        response = self.client.get(reverse('admin:vlog_videocomment_moderation'))
+
+        self.assertEqual(response.status_code, 302)
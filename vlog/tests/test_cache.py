@@ -0,0 +1,282 @@
+from django.test import Client
+from django.urls import reverse
+from django.utils import timezone
+from datetime import timedelta
+from vlog.cache import PAGE_CACHE_TIMEOUT, get_page_cache_timeout
+from vlog.models import VideoComment
+from vlog.moderation import approve_comments
+from .base import JugglingVideoSiteTest
+
+
+class PageCacheTest(JugglingVideoSiteTest):
+    """
+    Tests for the full-response cache used by the vlog's video pages
+    """
+
+    def test_home_page_is_served_from_the_cache_on_a_repeat_visit(self):
+        """
+        A second request for the home page should only run the query for its ETag
+        """
+        self.post_video()
+        self.client.get(reverse('vlog:index'))
+
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('vlog:index'))
+
+        self.assertContains(response, 'five_ball_juggle_50_catches.mp4')
+
+    def test_cached_pages_are_keyed_by_url(self):
+        """
+        Archive pages with different query strings should be cached separately
+        """
+        self.client.get(reverse('vlog:videos'))
+
+        with self.assertNumQueries(2):
+            response = self.client.get(reverse('vlog:videos'), {'before': '20210809204600000000-12'})
+
+        self.assertEqual(response.status_code, 200)
+
+    def test_saving_a_video_invalidates_cached_pages(self):
+        """
+        A newly published video should appear on the home page straight away
+        """
+        first_video = self.post_video(video = 'first', pub_date = timezone.now() - timedelta(days = 1))
+        self.client.get(reverse('vlog:index'))
+
+        second_video = self.post_video(video = 'second')
+        response = self.client.get(reverse('vlog:index'))
+
+        self.assertContains(response, second_video.filename)
+
+    def test_approving_a_comment_invalidates_the_cached_detail_page(self):
+        """
+        A comment should appear on the detail page as soon as it is approved
+        """
+        juggling_video = self.post_video()
+        comment = VideoComment.objects.create(text = 'Awaiting moderation', video = juggling_video, is_approved = False)
+        # The first visit sets the CSRF cookie, after which the page can be cached for this browser
+        self.client.get(reverse('vlog:detail', args = [juggling_video.id]))
+        self.client.get(reverse('vlog:detail', args = [juggling_video.id]))
+
+        comment.is_approved = True
+        comment.save()
+        response = self.client.get(reverse('vlog:detail', args = [juggling_video.id]))
+
+        self.assertContains(response, 'Awaiting moderation')
+
+    def test_detail_page_is_not_shared_between_browsers(self):
+        """
+        The detail page contains a CSRF token, so one visitor's cached copy must not be served to another
+        Another visitor's page is rendered again, but it reuses the cached comment thread
+        """
+        juggling_video = self.post_video()
+        self.client.get(reverse('vlog:detail', args = [juggling_video.id]))
+        self.client.get(reverse('vlog:detail', args = [juggling_video.id]))
+
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('vlog:detail', args = [juggling_video.id]))
+        with self.assertNumQueries(2):
+            other_response = Client().get(reverse('vlog:detail', args = [juggling_video.id]))
+
+        self.assertIn('csrftoken', other_response.cookies)
+
+    def test_comment_posts_are_not_cached(self):
+        """
+        POST requests should always reach the view
+        """
+        juggling_video = self.post_video()
+
+        self.post_comment(juggling_video, text = 'First comment!')
+        self.post_comment(juggling_video, text = 'Second comment!')
+
+        self.assertEqual(VideoComment.objects.count(), 2)
+
+    def test_page_cache_timeout_is_bounded_by_the_next_scheduled_video(self):
+        """
+        Cached pages should expire no later than the publication date of the next scheduled video
+        """
+        self.assertEqual(get_page_cache_timeout(), PAGE_CACHE_TIMEOUT)
+
+        self.post_video(video = 'first', pub_date = timezone.now() - timedelta(days = 1))
+        self.post_video(video = 'second', pub_date = timezone.now() + timedelta(minutes = 5))
+
+        self.assertLessEqual(get_page_cache_timeout(), 5 * 60)
+
+
+class ConditionalGetTest(JugglingVideoSiteTest):
+    """
+    Tests for ETag and Last-Modified support on the video pages
+    """
+
+    def test_video_pages_have_etag_and_last_modified_headers(self):
+        juggling_video = self.post_video()
+
+        for response in (
+            self.client.get(reverse('vlog:index')),
+            self.client.get(reverse('vlog:videos')),
+            self.client.get(reverse('vlog:detail', args = [juggling_video.id])),
+        ):
+            self.assertTrue(response.has_header('ETag'))
+            self.assertTrue(response.has_header('Last-Modified'))
+
+    def test_home_page_responds_not_modified_with_a_single_query(self):
+        """
+        A repeat visit with a current ETag should get a 304 after one aggregate query
+        """
+        self.post_video()
+        etag = self.client.get(reverse('vlog:index'))['ETag']
+
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('vlog:index'), HTTP_IF_NONE_MATCH = etag)
+
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b'')
+
+    def test_home_page_responds_not_modified_to_if_modified_since(self):
+        self.post_video(pub_date = timezone.now() - timedelta(days = 1))
+        last_modified = self.client.get(reverse('vlog:index'))['Last-Modified']
+
+        response = self.client.get(reverse('vlog:index'), HTTP_IF_MODIFIED_SINCE = last_modified)
+
+        self.assertEqual(response.status_code, 304)
+
+    def test_publishing_a_video_changes_the_etag(self):
+        self.post_video(video = 'first', pub_date = timezone.now() - timedelta(days = 1))
+        etag = self.client.get(reverse('vlog:videos'))['ETag']
+
+        self.post_video(video = 'second')
+        response = self.client.get(reverse('vlog:videos'), HTTP_IF_NONE_MATCH = etag)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_editing_a_video_changes_the_etags(self):
+        """
+        Returning visitors should see edits to a video's details rather than a 304
+        """
+        juggling_video = self.post_video()
+        index_etag = self.client.get(reverse('vlog:index'))['ETag']
+        detail_etag = self.client.get(reverse('vlog:detail', args = [juggling_video.id]))['ETag']
+
+        juggling_video.title = 'A new title'
+        juggling_video.author_comment = 'A new comment from the author'
+        juggling_video.save()
+        index_response = self.client.get(reverse('vlog:index'), HTTP_IF_NONE_MATCH = index_etag)
+        detail_response = self.client.get(reverse('vlog:detail', args = [juggling_video.id]), HTTP_IF_NONE_MATCH = detail_etag)
+
+        self.assertEqual(index_response.status_code, 200)
+        self.assertEqual(detail_response.status_code, 200)
+        self.assertContains(detail_response, 'A new comment from the author')
+
+    def test_saving_selected_video_fields_changes_the_etags(self):
+        """
+        The poster, HLS and metadata commands save only the fields they change, which should still update the ETags
+        """
+        juggling_video = self.post_video()
+        detail_url = reverse('vlog:detail', args = [juggling_video.id])
+
+        for field, value in (('poster', 'vlog/posters/poster.jpg'), ('hls_playlist', 'vlog/hls/video/master.m3u8')):
+            index_etag = self.client.get(reverse('vlog:index'))['ETag']
+            detail_etag = self.client.get(detail_url)['ETag']
+
+            setattr(juggling_video, field, value)
+            juggling_video.save(update_fields = [field])
+
+            self.assertEqual(self.client.get(reverse('vlog:index'), HTTP_IF_NONE_MATCH = index_etag).status_code, 200)
+            self.assertEqual(self.client.get(detail_url, HTTP_IF_NONE_MATCH = detail_etag).status_code, 200)
+
+    def test_detail_page_etag_only_changes_when_an_approved_comment_is_added(self):
+        """
+        Comments awaiting moderation are not displayed, so they should not change the detail page's ETag
+        """
+        juggling_video = self.post_video()
+        etag = self.client.get(reverse('vlog:detail', args = [juggling_video.id]))['ETag']
+
+        VideoComment.objects.create(text = 'Awaiting moderation', video = juggling_video, is_approved = False)
+        unapproved_response = self.client.get(reverse('vlog:detail', args = [juggling_video.id]), HTTP_IF_NONE_MATCH = etag)
+        VideoComment.objects.create(text = 'First comment!', video = juggling_video)
+        approved_response = self.client.get(reverse('vlog:detail', args = [juggling_video.id]), HTTP_IF_NONE_MATCH = etag)
+
+        self.assertEqual(unapproved_response.status_code, 304)
+        self.assertEqual(approved_response.status_code, 200)
+        self.assertContains(approved_response, 'First comment!')
+
+    def test_pages_without_videos_have_no_etag(self):
+        response = self.client.get(reverse('vlog:index'))
+
+        self.assertFalse(response.has_header('ETag'))
+
+    def test_unpublished_video_detail_page_is_still_not_found(self):
+        future_video = self.post_video(pub_date = timezone.now() + timedelta(days = 5))
+
+        response = self.client.get(reverse('vlog:detail', args = [future_video.id]))
+
+        self.assertEqual(response.status_code, 404)
+
+
+class CommentThreadCacheTest(JugglingVideoSiteTest):
+    """
+    Tests for the cached comment thread on the video detail page
+    """
+
+    def get_detail_page(self, video):
+        # A first-time visitor, so that the page is rendered rather than served from the page cache
+        return Client().get(reverse('vlog:detail', args = [video.id]))
+
+    def test_comment_thread_is_reused_by_other_visitors(self):
+        """
+        Only the first visitor's page should need the query for the comments
+        """
+        juggling_video = self.post_video()
+        VideoComment.objects.create(text = 'First comment!', video = juggling_video)
+        self.get_detail_page(juggling_video)
+
+        with self.assertNumQueries(2):
+            response = self.get_detail_page(juggling_video)
+
+        self.assertContains(response, 'First comment!')
+        self.assertIn('csrftoken', response.cookies)
+
+    def test_comment_thread_is_cached_per_video(self):
+        juggling_video = self.post_video()
+        other_video = self.post_video('second')
+        VideoComment.objects.create(text = 'First comment!', video = juggling_video)
+        self.get_detail_page(juggling_video)
+
+        response = self.get_detail_page(other_video)
+
+        self.assertNotContains(response, 'First comment!')
+        self.assertContains(response, 'There are no comments for this video yet')
+
+    def test_saving_a_comment_renders_the_comment_thread_again(self):
+        juggling_video = self.post_video()
+        self.get_detail_page(juggling_video)
+
+        VideoComment.objects.create(text = 'First comment!', video = juggling_video)
+        response = self.get_detail_page(juggling_video)
+
+        self.assertContains(response, 'First comment!')
+        self.assertNotContains(response, 'There are no comments for this video yet')
+
+    def test_deleting_a_comment_renders_the_comment_thread_again(self):
+        juggling_video = self.post_video()
+        video_comment = VideoComment.objects.create(text = 'First comment!', video = juggling_video)
+        self.get_detail_page(juggling_video)
+
+        video_comment.delete()
+        response = self.get_detail_page(juggling_video)
+
+        self.assertNotContains(response, 'First comment!')
+
+    def test_bulk_moderation_renders_the_comment_thread_again(self):
+        """
+        Bulk moderation does not send model signals, so it has to retire the cached comment threads itself
+        """
+        juggling_video = self.post_video()
+        VideoComment.objects.create(text = 'Awaiting moderation', video = juggling_video, is_approved = False)
+        self.get_detail_page(juggling_video)
+
+        approve_comments(VideoComment.objects.all())
+        response = self.get_detail_page(juggling_video)
+
+        self.assertContains(response, 'Awaiting moderation')
@@ -0,0 +1,112 @@
+import tempfile
+from pathlib import Path
+from django.core.management import call_command
+from django.test import SimpleTestCase, override_settings
+from django.urls import reverse
+from io import StringIO
+from vlog.critical_css import extract_critical_css, get_above_fold_tokens, selector_is_critical
+from .base import JugglingVideoSiteTest
+
+
+class CriticalCSSExtractionTest(SimpleTestCase):
+    """
+    Tests for selecting the CSS rules that apply to the top of a page
+    """
+
+    html = (
+        '<html><head><style>.ignored {}</style></head><body>'
+        '<header><nav><ul class="navlinks"><li class="navlink selected"><a href="/">Home</a></li></ul></nav></header>'
+        '<main><p class="later">Below the fold</p></main></body></html>'
+    )
+
+    def test_tokens_are_collected_from_the_first_body_elements_only(self):
+        tokens = get_above_fold_tokens(self.html, element_limit = 5)
+
+        self.assertTrue({'header', 'nav', 'ul', '.navlinks', 'li', '.navlink', '.selected', 'a'} <= tokens)
+        self.assertNotIn('main', tokens)
+        self.assertNotIn('.later', tokens)
+        self.assertNotIn('.ignored', tokens)
+
+    def test_selectors_are_matched_against_tokens(self):
+        tokens = {'html', 'body', 'nav', 'ul', 'a', '.navlinks', '.selected'}
+
+        self.assertTrue(selector_is_critical('*', tokens))
+        self.assertTrue(selector_is_critical('nav > ul', tokens))
+        self.assertTrue(selector_is_critical('.navlinks > li:nth-of-type(odd)', tokens | {'li'}))
+        self.assertTrue(selector_is_critical('a[href^="http"]', tokens))
+        self.assertFalse(selector_is_critical('nav a:hover', tokens))
+        self.assertFalse(selector_is_critical('*::selection', tokens))
+        self.assertFalse(selector_is_critical('footer', tokens))
+
+    def test_only_matching_rules_and_font_faces_are_extracted(self):
+        css = """
+            /* Fonts */
+            @font-face { font-family: 'f'; src: url('../fonts/f.woff2'); }
+            nav a, footer { color: green; }
+            .later { color: red; }
+            @media (min-width: 600px) {
+              .selected > a { border: none; }
+              .later { display: none; }
+            }
+            @media print { main { display: none; } }
+        """
+
+        critical_css = extract_critical_css(self.html, css, element_limit = 5)
+
+        self.assertEqual(critical_css, (
+            "@font-face{font-family: 'f'; src: url('../fonts/f.woff2');}"
+            'nav a{color: green;}'
+            '@media (min-width: 600px){.selected > a{border: none;}}'
+        ))
+
+
+class CriticalStylesheetTest(JugglingVideoSiteTest):
+    """
+    Tests for inlining the critical CSS in pages
+    """
+
+    def setUp(self):
+        super().setUp()
+        temporary_directory = tempfile.TemporaryDirectory()
+        self.addCleanup(temporary_directory.cleanup)
+        self.root = Path(temporary_directory.name)
+        settings_override = override_settings(CRITICAL_CSS_ROOT = self.root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def test_full_stylesheet_blocks_rendering_if_critical_css_has_not_been_extracted(self):
+        response = self.client.get(reverse('vlog:learn'))
+
+        self.assertContains(response, '<link rel="stylesheet" type="text/css" href="/static/vlog/style/style.css">', html = True)
+        self.assertNotContains(response, '<style>')
+
+    def test_extract_critical_css_command_writes_css_for_each_page(self):
+        self.post_video()
+        output = StringIO()
+
+        call_command('extract_critical_css', stdout = output)
+
+        for url_name in ('vlog:index', 'vlog:videos', 'vlog:detail', 'vlog:learn', 'vlog:contact'):
+            critical_css = (self.root / f"{url_name.replace(':', '.')}.css").read_text()
+            self.assertIn('nav > ul{', critical_css)
+            self.assertNotIn(':hover', critical_css)
+        self.assertIn('vlog:index:', output.getvalue())
+
+    def test_pages_inline_critical_css_and_defer_the_stylesheet(self):
+        call_command('extract_critical_css', stdout = StringIO())
+
+        response = self.client.get(reverse('vlog:learn'))
+
+        self.assertContains(response, 'nav > ul{')
+        self.assertContains(response, "url('/static/vlog/fonts/refbeverage-webfont.woff2')")
+        self.assertContains(response, '<link rel="preload" href="/static/vlog/style/style.css" as="style"')
+        self.assertContains(response, '<noscript><link rel="stylesheet" type="text/css" href="/static/vlog/style/style.css"></noscript>')
+
+    def test_woff2_fonts_are_preloaded(self):
+        response = self.client.get(reverse('vlog:index'))
+
+        for font in ('linguisticspro-regular-webfont.woff2', 'refbeverage-webfont.woff2'):
+            self.assertContains(
+                response,
+                f'<link rel="preload" href="/static/vlog/fonts/{font}" as="font" type="font/woff2" crossorigin>',
+            )
@@ -0,0 +1,96 @@
+import tempfile
+import threading
+import time
+from pathlib import Path
+from django.db import connections
+from django.test import SimpleTestCase
+from jvlog.backends.sqlite3.base import DatabaseWrapper
+from jvlog.database import SQLITE_INIT_COMMAND
+
+
+class SQLiteConcurrencyTest(SimpleTestCase):
+    """
+    Load test showing that pages can still be read while comments are being written
+    The test database is in memory, so these tests use a database file with the production connection settings.
+    """
+
+    def setUp(self):
+        temporary_directory = tempfile.TemporaryDirectory()
+        self.addCleanup(temporary_directory.cleanup)
+        self.settings_dict = {
+            **connections['default'].settings_dict,
+            'ENGINE': 'jvlog.backends.sqlite3',
+            'NAME': str(Path(temporary_directory.name) / 'db.sqlite3'),
+            'OPTIONS': {
+                'timeout': 20,
+                'init_command': SQLITE_INIT_COMMAND,
+            },
+        }
+        self.execute('CREATE TABLE comment (id INTEGER PRIMARY KEY, text TEXT)')
+
+    def connect(self, timeout = 20):
+        options = {**self.settings_dict['OPTIONS'], 'timeout': timeout}
+        return DatabaseWrapper({**self.settings_dict, 'OPTIONS': options})
+
+    def execute(self, sql):
+        connection = self.connect()
+        try:
+            with connection.cursor() as cursor:
+                return cursor.execute(sql).fetchone()
+        finally:
+            connection.close()
+
+    def test_connections_use_wal_mode_and_tuned_pragmas(self):
+        pragmas = [self.execute(f'PRAGMA {name}')[0] for name in ('journal_mode', 'synchronous', 'busy_timeout')]
+
+        self.assertEqual(pragmas, ['wal', 1, 20000])
+
+    def test_reads_continue_while_comments_are_written(self):
+        writing = threading.Event()
+        finished = threading.Event()
+        errors = []
+        reads_during_writes = []
+
+        def write_comments():
+            connection = self.connect()
+            try:
+                cursor = connection.cursor()
+                for number in range(50):
+                    cursor.execute('BEGIN IMMEDIATE')
+                    cursor.execute('INSERT INTO comment (text) VALUES (%s)', [f'Comment {number}'])
+                    # The write lock is held for a while, as it would be by a slow request
+                    writing.set()
+                    time.sleep(0.002)
+                    writing.clear()
+                    cursor.execute('COMMIT')
+            except Exception as error:
+                errors.append(error)
+            finally:
+                finished.set()
+                connection.close()
+
+        def read_comments():
+            # A short timeout, so a reader that had to wait for the writer would fail
+            connection = self.connect(timeout = 0.001)
+            try:
+                cursor = connection.cursor()
+                while not finished.is_set():
+                    was_writing = writing.is_set()
+                    cursor.execute('SELECT COUNT(*) FROM comment').fetchone()
+                    if was_writing and writing.is_set():
+                        reads_during_writes.append(True)
+            except Exception as error:
+                errors.append(error)
+            finally:
+                connection.close()
+
+        writer = threading.Thread(target = write_comments)
+        readers = [threading.Thread(target = read_comments) for _ in range(4)]
+        for thread in [writer, *readers]:
+            thread.start()
+        for thread in [writer, *readers]:
+            thread.join(timeout = 30)
+
+        self.assertEqual(errors, [])
+        self.assertGreater(len(reads_during_writes), 0)
+        self.assertEqual(self.execute('SELECT COUNT(*) FROM comment'), (50,))
@@ -56,6 +56,13 @@ class CommentFormTest(JugglingVideoSiteTest):
         self.assertFalse(form.is_valid())
         self.assertEqual(form.errors['text'], [DUPLICATE_COMMENT_ERROR])
 
+    def test_duplicate_check_is_a_single_query(self):
+        juggling_video = self.post_video()
+        VideoComment.objects.create(text = 'No duplicates!', video = juggling_video)
+        form = CommentForm(for_video = juggling_video, data = {'text': 'No duplicates!'})
+
+        with self.assertNumQueries(1):
+            self.assertFalse(form.is_valid())
 
     def test_form_does_not_have_labels(self):
         juggling_video = self.post_video()
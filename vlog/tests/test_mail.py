@@ -0,0 +1,158 @@
+import socketserver
+import threading
+from datetime import timedelta
+from django.core import mail
+from django.core.mail.backends.locmem import EmailBackend
+from django.core.management import call_command
+from django.test import override_settings
+from django.utils import timezone
+from io import StringIO
+from vlog.mail import MAX_ATTEMPTS, RETRY_DELAY, enqueue_mail, send_queued_mail
+from vlog.models import OutboundEmail
+from .base import JugglingVideoSiteTest
+
+
+class FailingEmailBackend(EmailBackend):
+    """
+    Email backend that fails to send messages whose subject contains 'fail'
+    """
+
+    def send_messages(self, messages):
+        if any('fail' in message.subject for message in messages):
+            raise ConnectionError('Server unavailable')
+        return super().send_messages(messages)
+
+
+class UnreachableEmailBackend(EmailBackend):
+
+    def open(self):
+        raise ConnectionRefusedError('Connection refused')
+
+
+class SMTPHandler(socketserver.StreamRequestHandler):
+    """
+    Handles one connection to a minimal SMTP server that accepts every message
+    """
+
+    def reply(self, line):
+        self.wfile.write(f'{line}\r\n'.encode())
+
+    def handle(self):
+        self.server.connection_count += 1
+        self.reply('220 localhost ready')
+        for line in self.rfile:
+            command = line.decode().strip().upper()
+            if command.startswith('EHLO'):
+                self.reply('250 localhost')
+            elif command == 'DATA':
+                self.reply('354 End data with <CR><LF>.<CR><LF>')
+                data = b''.join(iter(self.rfile.readline, b'.\r\n'))
+                self.server.messages.append(data.decode())
+                self.reply('250 OK')
+            elif command == 'QUIT':
+                self.reply('221 Bye')
+                return
+            else:
+                self.reply('250 OK')
+
+
+class SMTPServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(('127.0.0.1', 0), SMTPHandler)
+        self.connection_count = 0
+        self.messages = []
+
+
+class MailQueueTest(JugglingVideoSiteTest):
+    """
+    Tests for queueing outbound email and sending it from the worker
+    """
+
+    def queue_messages(self, *subjects):
+        for subject in subjects:
+            enqueue_mail(subject, 'Body', 'website@example.com', ['me@example.com'])
+
+    def test_queued_mail_is_sent_and_marked_as_sent(self):
+        self.queue_messages('First', 'Second')
+
+        self.assertEqual(send_queued_mail(), (2, 0))
+
+        self.assertEqual([message.subject for message in mail.outbox], ['First', 'Second'])
+        self.assertEqual(mail.outbox[0].to, ['me@example.com'])
+        self.assertFalse(OutboundEmail.objects.filter(sent_at__isnull = True).exists())
+        self.assertEqual(send_queued_mail(), (0, 0))
+
+    def test_batch_size_limits_messages_sent(self):
+        self.queue_messages('First', 'Second', 'Third')
+
+        self.assertEqual(send_queued_mail(batch_size = 2), (2, 0))
+        self.assertEqual(send_queued_mail(batch_size = 2), (1, 0))
+
+    @override_settings(EMAIL_BACKEND = 'vlog.tests.test_mail.FailingEmailBackend')
+    def test_failed_message_is_retried_with_backoff(self):
+        self.queue_messages('This will fail', 'This will be sent')
+
+        self.assertEqual(send_queued_mail(), (1, 1))
+
+        failed = OutboundEmail.objects.get(subject = 'This will fail')
+        self.assertEqual(failed.attempts, 1)
+        self.assertIn('Server unavailable', failed.last_error)
+        self.assertIsNone(failed.sent_at)
+        self.assertAlmostEqual(failed.send_after, timezone.now() + RETRY_DELAY, delta = timedelta(seconds = 5))
+        # Not due again until the delay has passed
+        self.assertEqual(send_queued_mail(), (0, 0))
+
+        OutboundEmail.objects.update(send_after = timezone.now())
+        send_queued_mail()
+        failed.refresh_from_db()
+        self.assertAlmostEqual(failed.send_after, timezone.now() + 2 * RETRY_DELAY, delta = timedelta(seconds = 5))
+
+    @override_settings(EMAIL_BACKEND = 'vlog.tests.test_mail.FailingEmailBackend')
+    def test_message_is_abandoned_after_max_attempts(self):
+        self.queue_messages('This will fail')
+        OutboundEmail.objects.update(attempts = MAX_ATTEMPTS - 1)
+
+        send_queued_mail()
+        OutboundEmail.objects.update(send_after = timezone.now())
+
+        self.assertEqual(OutboundEmail.objects.get().attempts, MAX_ATTEMPTS)
+        self.assertEqual(send_queued_mail(), (0, 0))
+
+    @override_settings(EMAIL_BACKEND = 'vlog.tests.test_mail.UnreachableEmailBackend')
+    def test_whole_batch_is_retried_if_server_is_unreachable(self):
+        self.queue_messages('First', 'Second')
+
+        self.assertEqual(send_queued_mail(), (0, 2))
+
+        self.assertEqual(list(OutboundEmail.objects.values_list('attempts', flat = True)), [1, 1])
+
+    def test_send_queued_mail_command_reports_messages_sent(self):
+        self.queue_messages('First')
+        output = StringIO()
+
+        call_command('send_queued_mail', stdout = output)
+
+        self.assertIn('Sent 1 messages, 0 failed', output.getvalue())
+
+    def test_batch_is_sent_over_one_smtp_connection(self):
+        server = SMTPServer()
+        threading.Thread(target = server.serve_forever, daemon = True).start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        self.queue_messages('First', 'Second', 'Third')
+
+        with self.settings(
+            EMAIL_BACKEND = 'django.core.mail.backends.smtp.EmailBackend',
+            EMAIL_HOST = '127.0.0.1',
+            EMAIL_PORT = server.server_address[1],
+            EMAIL_USE_TLS = False,
+            EMAIL_HOST_USER = '',
+            EMAIL_HOST_PASSWORD = '',
+        ):
+            self.assertEqual(send_queued_mail(), (3, 0))
+
+        self.assertEqual(server.connection_count, 1)
+        self.assertEqual(len(server.messages), 3)
+        self.assertIn('Subject: Second', server.messages[1])
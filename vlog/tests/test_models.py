@@ -1,9 +1,12 @@
+from django.core.management import call_command
 from django.test import TestCase
+from django.db import IntegrityError, connection, transaction
 from django.urls import reverse
 from django.utils import timezone
 from django.core.exceptions import ValidationError
 from datetime import timedelta
-from vlog.models import JugglingVideo, VideoComment, Acknowledgement
+from io import StringIO
+from vlog.models import JugglingVideo, VideoComment, Acknowledgement, get_comment_content_hash
 from .base import JugglingVideoSiteTest
 
 
@@ -132,6 +135,37 @@ class VideoModelTest(JugglingVideoSiteTest):
 
         self.assertEqual(archive_videos, [old_video])
 
+    def test_published_manager_excludes_future_videos_and_orders_newest_first(self):
+        """
+        JugglingVideo.published should only return videos that have been published, newest first
+        """
+        future_video = self.post_video(video = 'first', pub_date = timezone.now() + timedelta(days = 5))
+        old_video = self.post_video(video = 'second', pub_date = timezone.now() - timedelta(days = 5))
+        current_video = self.post_video(video = 'third', pub_date = timezone.now())
+
+        self.assertEqual(list(JugglingVideo.published.all()), [current_video, old_video])
+
+    def test_get_archive_videos_class_method_uses_a_single_query(self):
+        """
+        The archive should not be evaluated once to count it and again to slice it
+        """
+        self.post_video(video = 'first', pub_date = timezone.now() - timedelta(days = 5))
+        self.post_video(video = 'second', pub_date = timezone.now())
+
+        with self.assertNumQueries(1):
+            JugglingVideo.get_archive_videos()
+
+    def test_listing_querysets_do_not_load_author_comment(self):
+        """
+        The author comment is only needed on the detail page, so list pages should not load it
+        """
+        self.post_video(video = 'first', pub_date = timezone.now())
+
+        homepage_video = JugglingVideo.get_homepage_video()
+
+        self.assertIn('author_comment', homepage_video.get_deferred_fields())
+
+
 class VideoAndCommentModelTest(JugglingVideoSiteTest):
     """
     Tests for the video comments database
@@ -198,6 +232,29 @@ class VideoAndCommentModelTest(JugglingVideoSiteTest):
         comment = VideoComment(video = juggling_video, text = 'Nice!', author = 'Juggling fan')
         comment.full_clean() # Should not raise
 
+    def test_comments_with_the_same_content_apart_from_surrounding_whitespace_are_duplicates(self):
+        juggling_video = self.post_video()
+        VideoComment.objects.create(video = juggling_video, text = 'Nice!', author = 'Site visitor')
+
+        with self.assertRaises(ValidationError):
+            VideoComment(video = juggling_video, text = '  Nice!\n', author = 'Site visitor ').full_clean()
+
+    def test_database_rejects_duplicate_comments(self):
+        juggling_video = self.post_video()
+        VideoComment.objects.create(video = juggling_video, text = 'Nice!', author = 'Site visitor')
+
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            VideoComment.objects.create(video = juggling_video, text = 'Nice!', author = 'Site visitor')
+
+    def test_content_hash_is_updated_when_comment_is_edited(self):
+        juggling_video = self.post_video()
+        comment = VideoComment.objects.create(video = juggling_video, text = 'Nice!')
+
+        comment.text = 'Very nice!'
+        comment.save()
+
+        self.assertEqual(comment.content_hash, get_comment_content_hash('Very nice!', 'anonymous'))
+
     def test_comment_ordering(self):
         """
         VideoComment.objects should return comments in the order that they were saved
@@ -219,6 +276,128 @@ class VideoAndCommentModelTest(JugglingVideoSiteTest):
         self.assertEqual(str(comment), 'comment text')
 
 
+class CommentCountTest(JugglingVideoSiteTest):
+    """
+    Tests for the approved comment counts stored on each video
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.video = self.post_video()
+
+    def assertCommentCount(self, video, count, last_comment = None):
+        video.refresh_from_db()
+        self.assertEqual(video.approved_comment_count, count)
+        self.assertEqual(video.last_comment_at, last_comment.date if last_comment else None)
+
+    def test_counts_follow_comments_being_added_approved_and_deleted(self):
+        first_comment = VideoComment.objects.create(video = self.video, text = 'First')
+        self.assertCommentCount(self.video, 1, first_comment)
+
+        second_comment = VideoComment.objects.create(video = self.video, text = 'Second', is_approved = False)
+        self.assertCommentCount(self.video, 1, first_comment)
+
+        second_comment.is_approved = True
+        second_comment.save()
+        self.assertCommentCount(self.video, 2, second_comment)
+
+        second_comment.delete()
+        self.assertCommentCount(self.video, 1, first_comment)
+
+    def test_counts_of_both_videos_change_when_a_comment_is_moved(self):
+        other_video = self.post_video(video = 'second')
+        comment = VideoComment.objects.create(video = self.video, text = 'Wrong video')
+
+        comment = VideoComment.objects.get(id = comment.id)
+        comment.video = other_video
+        comment.save()
+
+        self.assertCommentCount(self.video, 0)
+        self.assertCommentCount(other_video, 1, comment)
+
+    def test_saving_a_stale_video_does_not_overwrite_the_counts(self):
+        """
+        A video loaded before comments were posted (e.g. in the admin site) should not write back its old counts
+        """
+        stale_video = JugglingVideo.objects.get(id = self.video.id)
+        VideoComment.objects.create(video = self.video, text = 'First')
+        second_comment = VideoComment.objects.create(video = self.video, text = 'Second')
+
+        stale_video.title = 'A new title'
+        stale_video.save()
+
+        self.assertCommentCount(self.video, 2, second_comment)
+        self.assertEqual(self.video.title, 'A new title')
+
+    def test_counts_can_be_saved_by_naming_them(self):
+        self.video.approved_comment_count = 3
+        self.video.save(update_fields = ['approved_comment_count'])
+
+        self.assertEqual(JugglingVideo.objects.get(id = self.video.id).approved_comment_count, 3)
+
+    def test_repair_command_recomputes_counts(self):
+        comment = VideoComment.objects.create(video = self.video, text = 'First')
+        other_video = self.post_video(video = 'second')
+        JugglingVideo.objects.update(approved_comment_count = 5, last_comment_at = None)
+        output = StringIO()
+
+        with self.assertNumQueries(3):
+            call_command('repair_comment_counts', stdout = output)
+
+        self.assertCommentCount(self.video, 1, comment)
+        self.assertCommentCount(other_video, 0)
+        self.assertIn('Corrected the comment counts of 2 videos', output.getvalue())
+
+
+class QueryPlanTest(JugglingVideoSiteTest):
+    """
+    EXPLAIN-based checks that the main vlog queries are served by an index
+    """
+
+    def setUp(self):
+        super().setUp()
+        if connection.vendor == 'postgresql':
+            # The planner prefers sequential scans for tiny tables, so discourage them for this test's transaction
+            with connection.cursor() as cursor:
+                cursor.execute('SET LOCAL enable_seqscan = off')
+        elif connection.vendor != 'sqlite':
+            self.skipTest(f'Query plans are not checked for {connection.vendor}')
+
+        self.video = self.post_video(pub_date = timezone.now() - timedelta(days = 1))
+        VideoComment.objects.create(text = 'First comment!', video = self.video)
+
+    def assertUsesIndex(self, queryset, index_name = None):
+        plan = queryset.explain()
+
+        if connection.vendor == 'sqlite':
+            self.assertRegex(plan, r'USING (COVERING )?(INDEX|INTEGER PRIMARY KEY)')
+        else:
+            self.assertRegex(plan, r'Index (Only )?Scan')
+        if index_name:
+            self.assertIn(index_name, plan)
+
+    def test_homepage_query_uses_pub_date_index(self):
+        self.assertUsesIndex(JugglingVideo.published.for_listing()[:1], 'vlog_video_pub_date_idx')
+
+    def test_archive_queries_use_pub_date_index(self):
+        self.assertUsesIndex(JugglingVideo.published.for_listing()[1:12], 'vlog_video_pub_date_idx')
+        self.assertUsesIndex(
+            JugglingVideo.published.for_listing().older_than(self.video.pub_date, self.video.id)[:11],
+            'vlog_video_pub_date_idx',
+        )
+
+    def test_detail_video_query_uses_primary_key(self):
+        self.assertUsesIndex(JugglingVideo.published.filter(id = self.video.id))
+
+    def test_approved_comments_query_uses_partial_comment_index(self):
+        self.assertUsesIndex(self.video.get_approved_comments(), 'vlog_comment_approved_idx')
+
+    def test_duplicate_comment_query_uses_content_hash_index(self):
+        content_hash = get_comment_content_hash('First comment!', 'anonymous')
+
+        self.assertUsesIndex(VideoComment.objects.filter(video = self.video, content_hash = content_hash))
+
+
 class AcknowledgementsModelTest(TestCase):
     """
     Tests for the acknowledgements database
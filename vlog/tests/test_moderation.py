@@ -0,0 +1,68 @@
+from django.core import mail
+from django.core.management import call_command
+from django.test import override_settings
+from io import StringIO
+from vlog.models import OutboundEmail, VideoComment
+from vlog.moderation import DIGEST_COMMENT_LIMIT, queue_comment_digest
+from .base import JugglingVideoSiteTest
+
+
+@override_settings(MODERATOR_EMAILS = ['moderator@example.com'])
+class CommentDigestTest(JugglingVideoSiteTest):
+    """
+    Tests for the digest emails about new comments
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.video = self.post_video()
+
+    def add_comments(self, count, **kwargs):
+        for number in range(count):
+            VideoComment.objects.create(video = self.video, text = f'Comment {number}', **kwargs)
+
+    def test_one_digest_is_queued_for_many_comments(self):
+        self.add_comments(3)
+        self.add_comments(2, author = 'Spammer', is_approved = False)
+
+        self.assertEqual(queue_comment_digest(), 5)
+
+        email = OutboundEmail.objects.get()
+        self.assertEqual(email.subject, '5 new comments (2 awaiting approval)')
+        self.assertEqual(email.recipient_list, ['moderator@example.com'])
+        self.assertLess(email.body.index('Awaiting approval'), email.body.index('Published'))
+        self.assertIn('Spammer', email.body)
+        self.assertIn(self.video.title, email.body)
+
+    def test_comments_are_only_included_in_one_digest(self):
+        self.add_comments(2)
+        queue_comment_digest()
+
+        self.assertFalse(VideoComment.objects.filter(moderator_notified = False).exists())
+        self.assertEqual(queue_comment_digest(), 0)
+        self.assertEqual(OutboundEmail.objects.count(), 1)
+
+    def test_digest_lists_a_limited_number_of_comments(self):
+        self.add_comments(DIGEST_COMMENT_LIMIT + 2)
+
+        queue_comment_digest()
+
+        body = OutboundEmail.objects.get().body
+        self.assertEqual(body.count('Comment '), DIGEST_COMMENT_LIMIT)
+        self.assertIn('...and 2 more.', body)
+
+    @override_settings(MODERATOR_EMAILS = [])
+    def test_nothing_is_queued_without_moderators(self):
+        self.add_comments(1)
+
+        self.assertEqual(queue_comment_digest(), 0)
+        self.assertFalse(OutboundEmail.objects.exists())
+
+    def test_command_can_send_digest_immediately(self):
+        self.add_comments(1, is_approved = False)
+        output = StringIO()
+
+        call_command('send_comment_digest', '--send', stdout = output)
+
+        self.assertEqual(mail.outbox[0].subject, '1 new comment (1 awaiting approval)')
+        self.assertIn('Queued a digest of 1 new comments', output.getvalue())
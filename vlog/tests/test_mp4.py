@@ -0,0 +1,195 @@
+import os
+import struct
+import tempfile
+from django.core.management import call_command
+from django.test import override_settings
+from django.urls import reverse
+from io import StringIO
+from vlog.mp4 import probe_mp4, make_faststart, iter_boxes, MP4Error
+from .base import JugglingVideoSiteTest
+
+
+MEDIA_DATA = bytes(range(256)) * 8
+
+
+def box(box_type, payload):
+    return struct.pack('>I4s', 8 + len(payload), box_type) + payload
+
+
+def full_box(box_type, payload, version = 0):
+    return box(box_type, bytes([version, 0, 0, 0]) + payload)
+
+
+def build_moov(chunk_offsets, width = 1280, height = 720, timescale = 1000, duration = 4000):
+    mvhd = full_box(b'mvhd', struct.pack('>IIII', 0, 0, timescale, duration) + bytes(80))
+    tkhd = full_box(b'tkhd', struct.pack('>IIIII', 0, 0, 1, 0, duration) + bytes(52) + struct.pack('>II', width << 16, height << 16))
+    hdlr = full_box(b'hdlr', struct.pack('>I4s', 0, b'vide') + bytes(12) + b'VideoHandler\0')
+    stco = full_box(b'stco', struct.pack(f'>I{len(chunk_offsets)}I', len(chunk_offsets), *chunk_offsets))
+    trak = box(b'trak', tkhd + box(b'mdia', hdlr + box(b'minf', box(b'stbl', stco))))
+
+    return box(b'moov', mvhd + trak)
+
+
+def build_mp4(faststart):
+    """
+    Returns the bytes of a small MP4 with two chunks of media data, and the chunks
+    """
+    ftyp = box(b'ftyp', b'isom\0\0\0\0isomavc1')
+    chunks = [MEDIA_DATA[:1000], MEDIA_DATA[1000:]]
+    # The moov box's size doesn't depend on the offsets, so a placeholder is used to find where the media data will be
+    moov_size = len(build_moov([0, 0]))
+    media_start = len(ftyp) + (moov_size if faststart else 0) + 8
+    moov = build_moov([media_start, media_start + len(chunks[0])])
+    mdat = box(b'mdat', MEDIA_DATA)
+
+    return (ftyp + moov + mdat if faststart else ftyp + mdat + moov), chunks
+
+
+def read_chunk_offsets(path):
+    with open(path, 'rb') as mp4_file:
+        content = mp4_file.read()
+    position = content.index(b'stco') + 8
+
+    return struct.unpack_from('>II', content, position + 4), content
+
+
+class MP4ParserTest(JugglingVideoSiteTest):
+    """
+    Tests for the pure Python MP4 box parser
+    """
+
+    def write_mp4(self, content):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        path = os.path.join(directory.name, 'video.mp4')
+        with open(path, 'wb') as mp4_file:
+            mp4_file.write(content)
+
+        return path
+
+    def test_probe_reads_duration_dimensions_and_size(self):
+        content, chunks = build_mp4(faststart = True)
+        path = self.write_mp4(content)
+
+        info = probe_mp4(path)
+
+        self.assertEqual(info.duration, 4.0)
+        self.assertEqual((info.width, info.height), (1280, 720))
+        self.assertEqual(info.file_size, len(content))
+        self.assertEqual(info.bitrate, round(len(content) * 8 / 4.0 / 1000))
+        self.assertTrue(info.is_faststart)
+
+    def test_probe_detects_files_that_are_not_faststart(self):
+        content, chunks = build_mp4(faststart = False)
+
+        self.assertFalse(probe_mp4(self.write_mp4(content)).is_faststart)
+
+    def test_probe_rejects_files_without_a_moov_box(self):
+        path = self.write_mp4(box(b'ftyp', b'isom') + box(b'mdat', MEDIA_DATA))
+
+        with self.assertRaises(MP4Error):
+            probe_mp4(path)
+
+    def test_probe_rejects_boxes_that_overrun_the_file(self):
+        path = self.write_mp4(struct.pack('>I4s', 1000, b'ftyp'))
+
+        with self.assertRaises(MP4Error):
+            probe_mp4(path)
+
+    def test_make_faststart_moves_moov_box_and_keeps_chunk_offsets_valid(self):
+        """
+        After the rewrite, the chunk offsets should still point at the same media data
+        """
+        content, chunks = build_mp4(faststart = False)
+        path = self.write_mp4(content)
+        output_path = f'{path}.faststart'
+
+        self.assertTrue(make_faststart(path, output_path))
+        offsets, new_content = read_chunk_offsets(output_path)
+
+        with open(output_path, 'rb') as mp4_file:
+            box_types = [found.type for found in iter_boxes(mp4_file, 0, len(new_content))]
+        self.assertEqual(box_types, [b'ftyp', b'moov', b'mdat'])
+        self.assertEqual(len(new_content), len(content))
+        self.assertEqual(new_content[offsets[0]:offsets[0] + len(chunks[0])], chunks[0])
+        self.assertEqual(new_content[offsets[1]:offsets[1] + len(chunks[1])], chunks[1])
+        self.assertTrue(probe_mp4(output_path).is_faststart)
+
+    def test_make_faststart_only_shifts_offsets_into_data_before_the_moov_box(self):
+        """
+        Media data after the old moov box stays where it was, and a moov box with a 64-bit size is read correctly
+        """
+        ftyp = box(b'ftyp', b'isom\0\0\0\0isomavc1')
+        chunks = [MEDIA_DATA[:1000], MEDIA_DATA[1000:]]
+        first_mdat = box(b'mdat', chunks[0])
+        moov_payload = build_moov([0, 0])[8:]
+        moov_size = 16 + len(moov_payload)
+        offsets = [len(ftyp) + 8, len(ftyp) + len(first_mdat) + moov_size + 8]
+        moov = struct.pack('>I4sQ', 1, b'moov', moov_size) + build_moov(offsets)[8:]
+        path = self.write_mp4(ftyp + first_mdat + moov + box(b'mdat', chunks[1]))
+        output_path = f'{path}.faststart'
+
+        self.assertTrue(make_faststart(path, output_path))
+        new_offsets, new_content = read_chunk_offsets(output_path)
+
+        self.assertEqual(new_offsets, (offsets[0] + moov_size, offsets[1]))
+        self.assertEqual(new_content[new_offsets[0]:new_offsets[0] + len(chunks[0])], chunks[0])
+        self.assertEqual(new_content[new_offsets[1]:new_offsets[1] + len(chunks[1])], chunks[1])
+
+    def test_make_faststart_leaves_faststart_files_alone(self):
+        content, chunks = build_mp4(faststart = True)
+        path = self.write_mp4(content)
+
+        self.assertFalse(make_faststart(path, f'{path}.faststart'))
+        self.assertFalse(os.path.exists(f'{path}.faststart'))
+
+
+class ProbeVideosCommandTest(JugglingVideoSiteTest):
+    """
+    Tests for recording video metadata on the model
+    """
+
+    def setUp(self):
+        super().setUp()
+        static_root = tempfile.TemporaryDirectory()
+        self.addCleanup(static_root.cleanup)
+        settings_override = override_settings(STATIC_ROOT = static_root.name)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        self.video = self.post_video()
+        self.video_path = os.path.join(static_root.name, self.video.get_static_filename())
+        os.makedirs(os.path.dirname(self.video_path))
+
+    def write_video(self, faststart):
+        content, chunks = build_mp4(faststart)
+        with open(self.video_path, 'wb') as video_file:
+            video_file.write(content)
+
+    def test_probe_videos_saves_metadata_on_the_model(self):
+        self.write_video(faststart = False)
+
+        call_command('probe_videos', stdout = StringIO())
+        self.video.refresh_from_db()
+
+        self.assertEqual((self.video.width, self.video.height, self.video.duration), (1280, 720, 4.0))
+        self.assertEqual(self.video.file_size, os.path.getsize(self.video_path))
+        self.assertFalse(self.video.is_faststart)
+
+    def test_probe_videos_can_remux_files_to_faststart(self):
+        self.write_video(faststart = False)
+
+        call_command('probe_videos', '--faststart', stdout = StringIO())
+        self.video.refresh_from_db()
+
+        self.assertTrue(self.video.is_faststart)
+        self.assertTrue(probe_mp4(self.video_path).is_faststart)
+        self.assertFalse(os.path.exists(f'{self.video_path}.faststart'))
+
+    def test_video_tags_include_dimensions_once_probed(self):
+        self.write_video(faststart = True)
+        call_command('probe_videos', stdout = StringIO())
+
+        response = self.client.get(reverse('vlog:detail', args = [self.video.id]))
+
+        self.assertContains(response, 'width="1280" height="720"')
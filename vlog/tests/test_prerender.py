@@ -0,0 +1,80 @@
+import json
+import tempfile
+from pathlib import Path
+from django.core.management import call_command
+from django.http import HttpResponse
+from django.test import RequestFactory, override_settings
+from django.urls import reverse
+from io import StringIO
+from jvlog.prerender import PrerenderedPageMiddleware, write_prerendered_pages, MANIFEST_NAME
+from .base import JugglingVideoSiteTest
+
+
+class PrerenderedPagesTest(JugglingVideoSiteTest):
+    """
+    Tests for pre-rendering pages that don't use the database
+    """
+
+    def setUp(self):
+        super().setUp()
+        temporary_directory = tempfile.TemporaryDirectory()
+        self.addCleanup(temporary_directory.cleanup)
+        self.root = Path(temporary_directory.name)
+        settings_override = override_settings(PRERENDER_ROOT = self.root, PRERENDERED_PAGES = ['vlog:learn', 'dev:portfolio'])
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def get_middleware(self):
+        return PrerenderedPageMiddleware(lambda request: HttpResponse('live response'))
+
+    def test_prerender_pages_command_writes_pages_and_manifest(self):
+        """
+        Each page should be written to a content-hashed file that is listed in the manifest
+        """
+        call_command('prerender_pages', stdout = StringIO())
+
+        manifest = json.loads((self.root / MANIFEST_NAME).read_text())
+        learn_file = self.root / manifest[reverse('vlog:learn')]['file']
+
+        self.assertEqual(set(manifest), {reverse('vlog:learn'), reverse('dev:portfolio')})
+        self.assertIn('This part of the site is still under construction.', learn_file.read_text())
+        self.assertIn(manifest[reverse('vlog:learn')]['etag'].strip('"'), learn_file.name)
+
+    def test_middleware_serves_prerendered_page_without_calling_the_view(self):
+        write_prerendered_pages()
+
+        response = self.get_middleware()(RequestFactory().get(reverse('vlog:learn')))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(b'This part of the site is still under construction.', response.content)
+        self.assertEqual(response['X-Frame-Options'], 'DENY')
+
+    def test_middleware_answers_matching_etag_with_not_modified(self):
+        manifest = write_prerendered_pages()
+        etag = manifest[reverse('vlog:learn')]['etag']
+
+        response = self.get_middleware()(RequestFactory().get(reverse('vlog:learn'), HTTP_IF_NONE_MATCH = etag))
+
+        self.assertEqual(response.status_code, 304)
+
+    def test_middleware_passes_other_requests_to_the_view(self):
+        write_prerendered_pages()
+
+        other_page = self.get_middleware()(RequestFactory().get(reverse('vlog:about')))
+        post_request = self.get_middleware()(RequestFactory().post(reverse('vlog:learn')))
+
+        self.assertEqual(other_page.content, b'live response')
+        self.assertEqual(post_request.content, b'live response')
+
+    def test_middleware_renders_live_pages_in_debug_mode(self):
+        write_prerendered_pages()
+
+        with self.settings(DEBUG = True):
+            response = self.get_middleware()(RequestFactory().get(reverse('vlog:learn')))
+
+        self.assertEqual(response.content, b'live response')
+
+    def test_middleware_renders_live_pages_if_pages_have_not_been_built(self):
+        response = self.get_middleware()(RequestFactory().get(reverse('vlog:learn')))
+
+        self.assertEqual(response.content, b'live response')
@@ -0,0 +1,141 @@
+from django.test import RequestFactory, SimpleTestCase, override_settings
+from django.urls import reverse
+from unittest.mock import patch
+from vlog.models import OutboundEmail, VideoComment
+from vlog.ratelimit import CacheCounterStore, LocalMemoryCounterStore, get_client_ip, is_over_limit
+from .base import JugglingVideoSiteTest
+
+
+class CounterStoreTest(SimpleTestCase):
+    """
+    Tests for the rate limit counter stores
+    """
+
+    def test_local_memory_store_discards_least_recently_used_counters(self):
+        store = LocalMemoryCounterStore(max_entries = 2)
+        store.increment('a', 60)
+        store.increment('b', 60)
+        store.increment('a', 60)
+        store.increment('c', 60)
+
+        self.assertEqual((store.get('a'), store.get('b'), store.get('c')), (2, 0, 1))
+
+    def test_local_memory_store_counters_expire(self):
+        store = LocalMemoryCounterStore()
+
+        with patch('vlog.ratelimit.time.monotonic', return_value = 1000):
+            store.increment('a', 60)
+        with patch('vlog.ratelimit.time.monotonic', return_value = 1061):
+            self.assertEqual(store.get('a'), 0)
+            self.assertEqual(store.increment('a', 60), 1)
+
+    def test_cache_store_counts_in_the_cache(self):
+        store = CacheCounterStore()
+
+        store.increment('vlog.test.counter', 60)
+
+        self.assertEqual(store.increment('vlog.test.counter', 60), 2)
+        self.assertEqual(CacheCounterStore().get('vlog.test.counter'), 2)
+
+
+class SlidingWindowTest(SimpleTestCase):
+
+    def setUp(self):
+        store_patch = patch('vlog.ratelimit.get_counter_store', return_value = LocalMemoryCounterStore())
+        store_patch.start()
+        self.addCleanup(store_patch.stop)
+
+    def count_requests(self, timestamp, number):
+        with patch('vlog.ratelimit.time.time', return_value = timestamp):
+            return [is_over_limit('key', limit = 10, window = 60) for _ in range(number)]
+
+    def test_requests_are_limited_within_a_window(self):
+        self.assertEqual(self.count_requests(600, 11), [False] * 10 + [True])
+
+    def test_previous_window_is_weighted_by_its_overlap(self):
+        self.count_requests(600, 10)
+
+        # A quarter of the way into the next window, three quarters of the previous count (7.5) still applies
+        self.assertEqual(self.count_requests(675, 3), [False, False, True])
+        # Two windows later, the earlier requests no longer count
+        self.assertEqual(self.count_requests(780, 10), [False] * 10)
+
+
+class PostRateLimitTest(JugglingVideoSiteTest):
+    """
+    Tests for rate limiting comment and contact form posts
+    """
+
+    @override_settings(RATE_LIMITS = {'comment': {'ip': (2, 60), 'video': (100, 60)}, 'contact': {'ip': (1, 600)}})
+    def test_comment_posts_over_the_limit_are_rejected_without_database_work(self):
+        video = self.post_video()
+        self.post_comment(video, 'First')
+        self.post_comment(video, 'Second')
+
+        with self.assertNumQueries(0):
+            response = self.post_comment(video, 'Third')
+
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response['Retry-After'], '60')
+        self.assertEqual(VideoComment.objects.count(), 2)
+
+    @override_settings(RATE_LIMITS = {'comment': {'ip': (100, 60), 'video': (1, 60)}, 'contact': {'ip': (1, 600)}})
+    def test_comment_posts_are_limited_per_video(self):
+        first_video = self.post_video(video = 'first')
+        second_video = self.post_video(video = 'second')
+        self.post_comment(first_video, 'First')
+
+        self.assertEqual(self.post_comment(first_video, 'Second', author = 'Someone else').status_code, 429)
+        self.assertEqual(self.post_comment(second_video, 'Second').status_code, 302)
+
+    @override_settings(RATE_LIMITS = {'comment': {'ip': (1, 60), 'video': (100, 60)}, 'contact': {'ip': (1, 600)}})
+    def test_comment_limit_is_per_client_ip(self):
+        video = self.post_video()
+        self.post_comment(video, 'First')
+
+        response = self.client.post(reverse('vlog:detail', args = [video.id]), {'text': 'Second'}, REMOTE_ADDR = '10.0.0.2')
+
+        self.assertEqual(response.status_code, 302)
+
+    @override_settings(
+        RATE_LIMITS = {'comment': {'ip': (1, 60), 'video': (100, 60)}, 'contact': {'ip': (1, 600)}},
+        RATE_LIMIT_IP_HEADER = 'HTTP_X_FORWARDED_FOR',
+    )
+    def test_client_supplied_forwarded_for_entries_are_ignored(self):
+        """
+        Only the address appended by the trusted proxy should count, so changing the earlier entries does not help
+        """
+        video = self.post_video()
+        url = reverse('vlog:detail', args = [video.id])
+        self.client.post(url, {'text': 'First'}, HTTP_X_FORWARDED_FOR = '1.1.1.1, 10.0.0.2')
+
+        response = self.client.post(url, {'text': 'Second'}, HTTP_X_FORWARDED_FOR = '2.2.2.2, 10.0.0.2')
+
+        self.assertEqual(response.status_code, 429)
+
+    @override_settings(
+        RATE_LIMIT_IP_HEADER = 'HTTP_X_FORWARDED_FOR',
+        RATE_LIMIT_PROXY_COUNT = 2,
+    )
+    def test_client_ip_is_found_behind_several_proxies(self):
+        request = RequestFactory().post('/', HTTP_X_FORWARDED_FOR = '1.1.1.1, 10.0.0.2, 172.16.0.3')
+
+        self.assertEqual(get_client_ip(request, {}), '10.0.0.2')
+
+    @override_settings(RATE_LIMITS = {'comment': {'ip': (1, 60), 'video': (100, 60)}, 'contact': {'ip': (1, 600)}})
+    def test_pages_can_still_be_viewed_over_the_limit(self):
+        video = self.post_video()
+        self.post_comment(video, 'First')
+        self.post_comment(video, 'Second')
+
+        self.assertEqual(self.client.get(reverse('vlog:detail', args = [video.id])).status_code, 200)
+
+    @override_settings(RATE_LIMITS = {'comment': {'ip': (5, 60), 'video': (30, 60)}, 'contact': {'ip': (1, 600)}})
+    def test_contact_posts_over_the_limit_are_rejected(self):
+        data = {'message': 'Hello', 'sender_name': 'Anonymous'}
+        self.client.post(reverse('vlog:contact'), data)
+
+        response = self.client.post(reverse('vlog:contact'), data)
+
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(OutboundEmail.objects.count(), 1)
@@ -0,0 +1,118 @@
+import tempfile
+from pathlib import Path
+from django.core.cache import cache
+from django.db import connections
+from django.test import Client, SimpleTestCase
+from django.urls import reverse
+from django.utils import timezone
+from datetime import timedelta
+from jvlog.database import get_databases
+from jvlog.routers import RECENT_CHANGE_KEY
+from vlog.models import JugglingVideo, VideoComment, VideoRendition
+from .base import JugglingVideoSiteTest
+
+
+class DatabaseConfigurationTest(SimpleTestCase):
+    """
+    Tests for building the DATABASES setting from environment variables
+    """
+
+    def test_sqlite_is_used_by_default(self):
+        databases = get_databases({}, Path('/site'))
+
+        self.assertEqual(list(databases), ['default'])
+        self.assertEqual(databases['default']['ENGINE'], 'jvlog.backends.sqlite3')
+        self.assertEqual(databases['default']['NAME'], Path('/site/db.sqlite3'))
+        self.assertEqual(databases['default']['CONN_MAX_AGE'], 600)
+
+    def test_sqlite_replica_is_a_second_file(self):
+        databases = get_databases({'DJANGO_DB_NAME': '/data/primary.sqlite3', 'DJANGO_DB_REPLICA_NAME': '/data/replica.sqlite3'}, Path('/site'))
+
+        self.assertEqual(databases['replica']['NAME'], '/data/replica.sqlite3')
+        self.assertEqual(databases['replica']['ENGINE'], 'jvlog.backends.sqlite3')
+        self.assertEqual(databases['replica']['TEST'], {'MIRROR': 'default'})
+
+    def test_postgresql_with_pooler_and_replica(self):
+        databases = get_databases({
+            'DJANGO_DB_ENGINE': 'postgresql',
+            'DJANGO_DB_NAME': 'jvlog',
+            'DJANGO_DB_HOST': 'db-primary',
+            'DJANGO_DB_REPLICA_HOST': 'db-replica',
+            'DJANGO_DB_POOLER': '1',
+            'DJANGO_CONN_MAX_AGE': '60',
+        }, Path('/site'))
+
+        self.assertEqual(databases['default']['ENGINE'], 'django.db.backends.postgresql')
+        self.assertEqual(databases['default']['HOST'], 'db-primary')
+        self.assertEqual(databases['default']['CONN_MAX_AGE'], 60)
+        self.assertTrue(databases['default']['CONN_HEALTH_CHECKS'])
+        self.assertTrue(databases['default']['DISABLE_SERVER_SIDE_CURSORS'])
+        self.assertEqual(databases['replica']['HOST'], 'db-replica')
+        self.assertEqual(databases['replica']['NAME'], 'jvlog')
+
+
+class ReplicaRoutingTest(JugglingVideoSiteTest):
+    """
+    Tests for sending the queries of read-only views to a replica, using a second SQLite file as the replica
+    """
+
+    def setUp(self):
+        super().setUp()
+        temporary_directory = tempfile.TemporaryDirectory()
+        self.addCleanup(temporary_directory.cleanup)
+        replica_settings = get_databases({'DJANGO_DB_NAME': ':memory:', 'DJANGO_DB_REPLICA_NAME': str(Path(temporary_directory.name) / 'replica.sqlite3')}, Path())['replica']
+        del replica_settings['TEST']
+        connections.settings['replica'] = connections.configure_settings({'default': {}, 'replica': replica_settings})['replica']
+        self.addCleanup(self.remove_replica)
+
+        # The replica has a copy of the schema, with content that differs from the primary's
+        with connections['replica'].schema_editor() as schema_editor:
+            for model in (JugglingVideo, VideoRendition, VideoComment):
+                schema_editor.create_model(model)
+        self.primary_video = self.post_video(video = 'first', pub_date = timezone.now() - timedelta(days = 1))
+        self.replica_video = JugglingVideo.objects.using('replica').create(
+            id = self.primary_video.id, filename = 'replica.mp4', title = 'Replica video',
+        )
+        # As if the replica had caught up with the change above
+        cache.delete(RECENT_CHANGE_KEY)
+
+    def remove_replica(self):
+        connections['replica'].close()
+        del connections['replica']
+        del connections.settings['replica']
+
+    def test_read_only_views_read_from_the_replica(self):
+        for url in (reverse('vlog:index'), reverse('vlog:detail', args = [self.primary_video.id])):
+            response = self.client.get(url)
+
+            self.assertContains(response, 'replica.mp4')
+            self.assertNotContains(response, self.primary_video.filename)
+
+    def test_comment_posts_are_written_to_the_primary(self):
+        self.post_comment(self.primary_video, 'Nice!')
+
+        self.assertTrue(VideoComment.objects.using('default').filter(text = 'Nice!').exists())
+        self.assertFalse(VideoComment.objects.using('replica').exists())
+
+    def test_views_read_from_the_primary_after_a_write(self):
+        """
+        Pages rendered just after a write must not come from a replica that may not have the change yet,
+        or they would be cached under the new page version
+        """
+        self.post_comment(self.primary_video, 'Nice!')
+
+        response = self.client.get(reverse('vlog:detail', args = [self.primary_video.id]))
+
+        self.assertContains(response, 'Nice!')
+        self.assertContains(response, self.primary_video.filename)
+
+    def test_replica_is_used_again_once_it_has_caught_up(self):
+        self.post_comment(self.primary_video, 'Nice!')
+        cache.delete(RECENT_CHANGE_KEY)
+
+        response = Client().get(reverse('vlog:index'))
+
+        self.assertContains(response, 'replica.mp4')
+
+    def test_other_reads_use_the_primary(self):
+        self.assertEqual(JugglingVideo.objects.get().title, self.primary_video.title)
@@ -0,0 +1,130 @@
+from django.core.cache import cache
+from django.core.management import call_command
+from django.urls import reverse
+from django.utils import timezone
+from datetime import timedelta
+from io import StringIO
+from unittest.mock import patch
+from vlog.scheduling import (
+    get_announced_up_to, get_next_pub_date, seconds_until_next_publication, publish_due_videos, video_published,
+)
+from .base import JugglingVideoSiteTest
+
+
+class SchedulingTest(JugglingVideoSiteTest):
+    """
+    Tests for tracking the publication of scheduled videos
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.published_videos = []
+        video_published.connect(self.record_publication)
+
+    def tearDown(self):
+        video_published.disconnect(self.record_publication)
+
+    def record_publication(self, sender, video, **kwargs):
+        self.published_videos.append(video)
+
+    def test_next_pub_date_is_the_earliest_future_pub_date(self):
+        """
+        Only videos with a publication date in the future should be considered
+        """
+        self.post_video(video = 'first', pub_date = timezone.now() - timedelta(days = 1))
+        later_video = self.post_video(video = 'second', pub_date = timezone.now() + timedelta(days = 2))
+        sooner_video = self.post_video(video = 'third', pub_date = timezone.now() + timedelta(days = 1))
+
+        self.assertEqual(get_next_pub_date(), sooner_video.pub_date)
+
+    def test_next_pub_date_is_none_if_nothing_is_scheduled(self):
+        self.post_video(pub_date = timezone.now() - timedelta(days = 1))
+
+        self.assertIsNone(get_next_pub_date())
+        self.assertEqual(seconds_until_next_publication(default = 60), 60)
+
+    def test_next_pub_date_is_cached_until_a_video_is_saved(self):
+        """
+        The next publication date should only be recalculated when the videos change
+        """
+        self.post_video(video = 'first', pub_date = timezone.now() + timedelta(days = 2))
+        get_next_pub_date()
+
+        with self.assertNumQueries(0):
+            get_next_pub_date()
+
+        sooner_video = self.post_video(video = 'second', pub_date = timezone.now() + timedelta(days = 1))
+
+        self.assertEqual(get_next_pub_date(), sooner_video.pub_date)
+
+    def test_seconds_until_next_publication(self):
+        self.post_video(pub_date = timezone.now() + timedelta(minutes = 10))
+
+        self.assertTrue(9 * 60 < seconds_until_next_publication() <= 10 * 60)
+
+    def test_video_published_is_sent_once_when_a_scheduled_video_goes_live(self):
+        """
+        The signal should be sent for the video once its publication date is reached
+        """
+        scheduled_video = self.post_video(pub_date = timezone.now() + timedelta(minutes = 10))
+        get_next_pub_date()
+
+        self.assertEqual(publish_due_videos(), [])
+
+        with patch('vlog.scheduling.timezone.now', return_value = timezone.now() + timedelta(minutes = 11)):
+            publish_due_videos()
+            publish_due_videos()
+
+        self.assertEqual(self.published_videos, [scheduled_video])
+
+    def test_scheduled_video_is_announced_if_the_cached_schedule_is_lost_after_it_goes_live(self):
+        """
+        Videos are announced from the stored watermark, so a video that went live unannounced is still announced
+        """
+        other_video = self.post_video(video = 'first', pub_date = timezone.now() - timedelta(days = 1))
+        scheduled_video = self.post_video(video = 'second', pub_date = timezone.now() + timedelta(minutes = 10))
+        get_next_pub_date()
+
+        with patch('vlog.scheduling.timezone.now', return_value = timezone.now() + timedelta(minutes = 11)):
+            other_video.title = 'Edited title'
+            other_video.save()
+            self.assertEqual(publish_due_videos(), [scheduled_video])
+            cache.clear()
+            self.assertEqual(publish_due_videos(), [])
+
+        self.assertEqual(self.published_videos, [scheduled_video])
+
+    def test_videos_published_before_the_watermark_are_not_announced(self):
+        """
+        Adding a video with a publication date that has already been announced up to should not announce it
+        """
+        get_announced_up_to()
+        self.post_video(pub_date = timezone.now() - timedelta(days = 1))
+
+        self.assertIsNone(get_next_pub_date())
+        self.assertEqual(publish_due_videos(), [])
+
+    def test_scheduled_video_replaces_cached_home_page_video_when_it_goes_live(self):
+        """
+        The cached home page should be invalidated when a scheduled video is published
+        """
+        self.post_video(video = 'first', pub_date = timezone.now() - timedelta(days = 1))
+        scheduled_video = self.post_video(video = 'second', pub_date = timezone.now() + timedelta(seconds = 1))
+        self.client.get(reverse('vlog:index'))
+
+        with patch('vlog.scheduling.timezone.now', return_value = timezone.now() + timedelta(seconds = 2)), \
+                patch('vlog.models.timezone.now', return_value = timezone.now() + timedelta(seconds = 2)):
+            response = self.client.get(reverse('vlog:index'))
+
+        self.assertContains(response, scheduled_video.filename)
+
+    def test_publish_scheduled_videos_command(self):
+        scheduled_video = self.post_video(pub_date = timezone.now() + timedelta(minutes = 10))
+        get_next_pub_date()
+        output = StringIO()
+
+        with patch('vlog.scheduling.timezone.now', return_value = timezone.now() + timedelta(minutes = 11)):
+            call_command('publish_scheduled_videos', stdout = output)
+
+        self.assertIn(scheduled_video.title, output.getvalue())
+        self.assertEqual(self.published_videos, [scheduled_video])
@@ -0,0 +1,164 @@
+import os
+import tempfile
+import time
+from django.core.management import call_command
+from django.test import SimpleTestCase, override_settings
+from io import StringIO
+from pathlib import Path
+from vlog.forms import CommentForm
+from vlog.models import VideoComment
+from vlog.spam import NaiveBayesModel, get_comment_classifier, tokenize, train_model
+from .base import JugglingVideoSiteTest
+
+
+HAM = [
+    'Great juggling, the five ball cascade looks really smooth',
+    'How long did it take you to learn the behind the back trick?',
+    'Nice video, I am practising three ball tricks at the moment',
+    'Brilliant catches, what balls are you juggling with?',
+]
+SPAM = [
+    'Cheap pills online, visit http://spam.example.com now',
+    'Buy cheap watches at www.spam.example.com',
+    'Earn money fast online, click http://spam.example.com',
+    'Cheap loans online, visit http://spam.example.com today',
+]
+
+
+class AlwaysSpamClassifier:
+
+    def is_spam(self, text, author = ''):
+        return True
+
+
+class NaiveBayesModelTest(SimpleTestCase):
+    """
+    Tests for the naive Bayes spam model
+    """
+
+    def setUp(self):
+        self.model = NaiveBayesModel.train([tokenize(text) for text in HAM], [tokenize(text) for text in SPAM])
+
+    def test_tokenize_finds_words_and_links(self):
+        self.assertEqual(tokenize('Visit http://example.com NOW', 'Bob'), {
+            'visit', 'http', 'example', 'com', 'now', '__link__', '__author__bob',
+        })
+
+    def test_model_separates_spam_from_ham(self):
+        self.assertGreater(self.model.spam_probability(tokenize('cheap pills at http://example.com')), 0.9)
+        self.assertLess(self.model.spam_probability(tokenize('what a smooth five ball cascade')), 0.1)
+
+    def test_new_words_are_neutral_with_imbalanced_training_data(self):
+        """
+        Most moderated comments are ham, so words the model has not seen should not count as evidence of spam
+        """
+        model = NaiveBayesModel.train([tokenize(text) for text in HAM * 25], [tokenize(text) for text in SPAM[:2]])
+
+        self.assertLess(model.spam_probability(tokenize('Brilliant stuff mate')), 0.1)
+        self.assertLess(model.spam_probability(tokenize('Wow, superb flourishes throughout')), 0.1)
+
+    def test_model_survives_serialisation(self):
+        model = NaiveBayesModel.from_dict(self.model.to_dict())
+        tokens = tokenize('cheap juggling balls')
+
+        self.assertEqual(model.spam_probability(tokens), self.model.spam_probability(tokens))
+
+    def test_very_long_comments_can_be_scored(self):
+        self.assertGreater(self.model.spam_probability(tokenize(' '.join(SPAM * 500) + ' word' * 5000)), 0.9)
+
+    def test_scoring_takes_well_under_a_millisecond(self):
+        tokens = tokenize(HAM[0] * 3)
+        start = time.perf_counter()
+        for _ in range(1000):
+            self.model.spam_probability(tokens)
+
+        self.assertLess((time.perf_counter() - start) / 1000, 0.0005)
+
+
+class CommentSpamFilterTest(JugglingVideoSiteTest):
+    """
+    Tests for filtering spam from new comments
+    """
+
+    def setUp(self):
+        super().setUp()
+        temporary_directory = tempfile.TemporaryDirectory()
+        self.addCleanup(temporary_directory.cleanup)
+        self.model_path = Path(temporary_directory.name) / 'spam_model.json'
+        settings_override = override_settings(SPAM_MODEL_PATH = self.model_path)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.video = self.post_video()
+
+    def add_training_comments(self):
+        for text in HAM:
+            VideoComment.objects.create(video = self.video, text = text)
+        for text in SPAM:
+            VideoComment.objects.create(video = self.video, text = text, is_approved = False, is_rejected = True)
+
+    def test_comments_are_approved_until_a_model_is_trained(self):
+        form = CommentForm(for_video = self.video, data = {'text': SPAM[0] + ' again'})
+
+        self.assertTrue(form.is_valid())
+        self.assertTrue(form.save().is_approved)
+
+    def test_spam_comments_are_saved_unapproved(self):
+        self.add_training_comments()
+        train_model()
+
+        self.post_comment(self.video, 'Cheap pills at http://spam.example.com')
+        self.post_comment(self.video, 'What a smooth cascade!')
+
+        self.assertFalse(VideoComment.objects.get(text = 'Cheap pills at http://spam.example.com').is_approved)
+        self.assertTrue(VideoComment.objects.get(text = 'What a smooth cascade!').is_approved)
+
+    def test_ham_with_new_words_is_approved_when_most_training_comments_are_ham(self):
+        # Comments must be unique per video
+        for number in range(25):
+            for text in HAM:
+                VideoComment.objects.create(video = self.video, text = f'{text} #{number}')
+        for text in SPAM[:2]:
+            VideoComment.objects.create(video = self.video, text = text, is_approved = False, is_rejected = True)
+        train_model()
+
+        self.post_comment(self.video, 'Brilliant stuff mate')
+
+        self.assertTrue(VideoComment.objects.get(text = 'Brilliant stuff mate').is_approved)
+
+    def test_comments_awaiting_moderation_are_not_used_for_training(self):
+        """
+        Only comments that a moderator approved or rejected should be used, not the filter's own held comments
+        """
+        self.add_training_comments()
+        VideoComment.objects.create(video = self.video, text = 'Held back by the filter', is_approved = False)
+
+        self.assertEqual(train_model(), (len(HAM), len(SPAM)))
+
+    def test_model_is_reloaded_when_the_file_changes(self):
+        classifier = get_comment_classifier()
+        self.assertFalse(classifier.is_spam('Cheap pills at http://spam.example.com'))
+
+        self.add_training_comments()
+        train_model()
+        # Some filesystems have coarse modification times
+        os.utime(self.model_path, ns = (time.time_ns(), time.time_ns() + 10 ** 9))
+
+        self.assertTrue(classifier.is_spam('Cheap pills at http://spam.example.com'))
+
+    @override_settings(COMMENT_CLASSIFIER = 'vlog.tests.test_spam.AlwaysSpamClassifier')
+    def test_classifier_is_pluggable(self):
+        form = CommentForm(for_video = self.video, data = {'text': 'Nice!'})
+
+        self.assertTrue(form.is_valid())
+        self.assertFalse(form.save().is_approved)
+
+    def test_train_and_benchmark_commands(self):
+        self.add_training_comments()
+        output = StringIO()
+
+        call_command('train_spam_filter', stdout = output)
+        call_command('benchmark_spam_filter', '--repeat', '1', stdout = output)
+
+        self.assertIn('Trained on 4 approved and 4 rejected comments', output.getvalue())
+        self.assertIn('Classified 8 comments', output.getvalue())
+        self.assertTrue(self.model_path.exists())
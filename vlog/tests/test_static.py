@@ -0,0 +1,169 @@
+import gzip
+import os
+import tempfile
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.management import call_command
+from django.test import SimpleTestCase, override_settings
+from django.urls import re_path, reverse
+from django.utils import timezone
+from datetime import timedelta
+from jvlog import static as static_views
+from jvlog.storage import CachedManifestStaticFilesStorage
+from .base import JugglingVideoSiteTest
+
+
+urlpatterns = [
+    re_path(r'^static/(?P<path>.*)$', static_views.serve),
+]
+
+# The production (non-DEBUG) storage
+HASHED_STORAGES = {
+    'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+    'staticfiles': {'BACKEND': 'jvlog.storage.CachedManifestStaticFilesStorage'},
+}
+
+
+@override_settings(ROOT_URLCONF = 'vlog.tests.test_static', STORAGES = HASHED_STORAGES)
+class HashedStaticFilesTest(SimpleTestCase):
+    """
+    Tests for the content-hashed static file storage and the static file view
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.static_root = tempfile.TemporaryDirectory()
+        cls.settings_override = override_settings(STATIC_ROOT = cls.static_root.name)
+        cls.settings_override.enable()
+        call_command('collectstatic', interactive = False, verbosity = 0)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.settings_override.disable()
+        cls.static_root.cleanup()
+        super().tearDownClass()
+
+    def test_static_urls_use_hashed_names(self):
+        self.assertRegex(staticfiles_storage.url('vlog/style/style.css'), r'^/static/vlog/style/style\.[0-9a-f]{12}\.css$')
+
+    def test_files_missing_from_the_manifest_keep_their_names(self):
+        """
+        Pages should still render (with unhashed URLs) if a file was not collected
+        """
+        self.assertEqual(staticfiles_storage.url('vlog/images/not_collected.png'), '/static/vlog/images/not_collected.png')
+
+    def test_manifest_is_loaded_when_the_storage_is_created(self):
+        storage = CachedManifestStaticFilesStorage()
+
+        self.assertTrue(storage.is_hashed(storage.stored_name('vlog/style/style.css')))
+        self.assertFalse(storage.is_hashed('vlog/style/style.css'))
+
+    def test_urls_are_memoised(self):
+        url = staticfiles_storage.url('vlog/scripts/vlog.js')
+
+        self.assertEqual(staticfiles_storage.url_cache['vlog/scripts/vlog.js'], url)
+
+    def test_hashed_files_are_served_as_immutable(self):
+        response = self.client.get(staticfiles_storage.url('vlog/style/style.css'))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('immutable', response['Cache-Control'])
+        self.assertIn('max-age=31536000', response['Cache-Control'])
+
+    def test_unhashed_files_must_be_revalidated(self):
+        response = self.client.get('/static/vlog/style/style.css')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('immutable', response['Cache-Control'])
+        self.assertIn('no-cache', response['Cache-Control'])
+
+    def test_missing_files_are_not_found(self):
+        response = self.client.get('/static/vlog/style/missing.css')
+
+        self.assertEqual(response.status_code, 404)
+
+    def test_collectstatic_writes_gzip_copies_of_compressible_files(self):
+        hashed_name = staticfiles_storage.stored_name('vlog/style/style.css')
+
+        with open(staticfiles_storage.path(hashed_name), 'rb') as original:
+            with gzip.open(staticfiles_storage.path(hashed_name + '.gz')) as compressed:
+                self.assertEqual(compressed.read(), original.read())
+        self.assertFalse(os.path.exists(staticfiles_storage.path('vlog/images/ico.png.gz')))
+
+    def test_gzip_copy_is_served_to_clients_that_accept_it(self):
+        url = staticfiles_storage.url('vlog/style/style.css')
+
+        response = self.client.get(url, HTTP_ACCEPT_ENCODING = 'gzip, deflate')
+
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(response['Content-Type'], 'text/css')
+        self.assertIn('Accept-Encoding', response['Vary'])
+        self.assertIn(b'.vid-container', gzip.decompress(b''.join(response.streaming_content)))
+
+    def test_uncompressed_file_is_served_to_other_clients(self):
+        for accept_encoding in ('', 'identity', 'gzip;q=0'):
+            response = self.client.get(staticfiles_storage.url('vlog/style/style.css'), HTTP_ACCEPT_ENCODING = accept_encoding)
+
+            self.assertFalse(response.has_header('Content-Encoding'))
+            self.assertIn('Accept-Encoding', response['Vary'])
+
+    def test_brotli_copy_is_preferred_if_present(self):
+        hashed_name = staticfiles_storage.stored_name('vlog/scripts/vlog.js')
+        with open(staticfiles_storage.path(hashed_name + '.br'), 'wb') as compressed:
+            compressed.write(b'brotli data')
+
+        response = self.client.get(staticfiles_storage.url('vlog/scripts/vlog.js'), HTTP_ACCEPT_ENCODING = 'gzip, br')
+
+        self.assertEqual(response['Content-Encoding'], 'br')
+        self.assertEqual(b''.join(response.streaming_content), b'brotli data')
+
+
+@override_settings(STORAGES = HASHED_STORAGES)
+class HashedStaticFilesPageTest(JugglingVideoSiteTest):
+    """
+    Tests for the video pages with the content-hashed static file storage
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.static_root = tempfile.TemporaryDirectory()
+        # jQuery is not kept in the repository, but the pages link to it
+        cls.extra_static = tempfile.TemporaryDirectory()
+        os.makedirs(os.path.join(cls.extra_static.name, 'vlog', 'scripts'))
+        with open(os.path.join(cls.extra_static.name, 'vlog', 'scripts', 'jquery-3.6.0.min.js'), 'w') as jquery:
+            jquery.write('/* jQuery */')
+        cls.settings_override = override_settings(STATIC_ROOT = cls.static_root.name, STATICFILES_DIRS = [cls.extra_static.name])
+        cls.settings_override.enable()
+        call_command('collectstatic', interactive = False, verbosity = 0)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.settings_override.disable()
+        cls.static_root.cleanup()
+        cls.extra_static.cleanup()
+        super().tearDownClass()
+
+    def test_video_pages_link_to_videos_that_are_not_in_the_manifest(self):
+        """
+        Videos, posters and playlists are added to STATIC_ROOT after collectstatic, so they are linked by their own names
+        """
+        older_video = self.post_video('second', pub_date = timezone.now() - timedelta(days = 1))
+        juggling_video = self.post_video()
+        for video in (older_video, juggling_video):
+            name = video.filename.removesuffix('.mp4')
+            video.poster = f'vlog/posters/{name}.jpg'
+            video.hls_playlist = f'vlog/hls/{name}/master.m3u8'
+            video.save()
+
+        for url in (reverse('vlog:index'), reverse('vlog:videos'), reverse('vlog:detail', args = [juggling_video.id])):
+            response = self.client.get(url)
+
+            self.assertEqual(response.status_code, 200)
+            self.assertRegex(response.content.decode(), r'src="/static/vlog/hls/\w+/master\.m3u8"')
+            self.assertRegex(response.content.decode(), r'src="/static/vlog/videos/\w+\.mp4"')
+            self.assertRegex(response.content.decode(), r'/static/vlog/style/style\.[0-9a-f]{12}\.css')
+
+        response = self.client.get(reverse('vlog:videos'))
+
+        self.assertContains(response, 'poster="/static/vlog/posters/behind_the_back_juggle.jpg"')
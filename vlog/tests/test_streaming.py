@@ -0,0 +1,141 @@
+import os
+import tempfile
+from django.test import override_settings
+from django.urls import reverse
+from django.utils import timezone
+from datetime import timedelta
+from vlog.streaming import parse_range_header, UnsatisfiableRange
+from .base import JugglingVideoSiteTest
+
+
+VIDEO_CONTENT = bytes(range(256)) * 4
+
+
+class RangeHeaderTest(JugglingVideoSiteTest):
+    """
+    Tests for parsing the Range request header
+    """
+
+    def test_no_range_header(self):
+        self.assertIsNone(parse_range_header(None, 1024))
+        self.assertIsNone(parse_range_header('', 1024))
+
+    def test_closed_and_open_ended_ranges(self):
+        self.assertEqual(parse_range_header('bytes=0-99', 1024), (0, 99))
+        self.assertEqual(parse_range_header('bytes=1000-', 1024), (1000, 1023))
+        self.assertEqual(parse_range_header('bytes=1000-5000', 1024), (1000, 1023))
+
+    def test_suffix_range(self):
+        self.assertEqual(parse_range_header('bytes=-24', 1024), (1000, 1023))
+        self.assertEqual(parse_range_header('bytes=-5000', 1024), (0, 1023))
+
+    def test_unsupported_ranges_are_ignored(self):
+        self.assertIsNone(parse_range_header('bytes=0-1,5-6', 1024))
+        self.assertIsNone(parse_range_header('items=0-1', 1024))
+
+    def test_unsatisfiable_ranges(self):
+        for header in ('bytes=1024-', 'bytes=50-10', 'bytes=-0'):
+            with self.assertRaises(UnsatisfiableRange):
+                parse_range_header(header, 1024)
+
+
+class VideoStreamViewTest(JugglingVideoSiteTest):
+    """
+    Tests for the byte-serving video stream view
+    """
+
+    def setUp(self):
+        super().setUp()
+        static_root = tempfile.TemporaryDirectory()
+        self.addCleanup(static_root.cleanup)
+        settings_override = override_settings(STATIC_ROOT = static_root.name)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        self.video = self.post_video()
+        video_path = os.path.join(static_root.name, self.video.get_static_filename())
+        os.makedirs(os.path.dirname(video_path))
+        with open(video_path, 'wb') as video_file:
+            video_file.write(VIDEO_CONTENT)
+        self.video_path = video_path
+        self.url = reverse('vlog:stream', args = [self.video.id])
+
+    def test_full_file_is_served_without_a_range_header(self):
+        response = self.client.get(self.url)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b''.join(response.streaming_content), VIDEO_CONTENT)
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+        self.assertEqual(response['Content-Type'], 'video/mp4')
+        self.assertEqual(response['Content-Length'], str(len(VIDEO_CONTENT)))
+
+    def test_range_request_responds_with_partial_content(self):
+        response = self.client.get(self.url, HTTP_RANGE = 'bytes=100-199')
+
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(b''.join(response.streaming_content), VIDEO_CONTENT[100:200])
+        self.assertEqual(response['Content-Range'], f'bytes 100-199/{len(VIDEO_CONTENT)}')
+        self.assertEqual(response['Content-Length'], '100')
+
+    def test_open_ended_range_request_is_served_to_the_end_of_the_file(self):
+        response = self.client.get(self.url, HTTP_RANGE = 'bytes=1000-')
+
+        self.assertEqual(b''.join(response.streaming_content), VIDEO_CONTENT[1000:])
+
+    def test_unsatisfiable_range_responds_with_416(self):
+        response = self.client.get(self.url, HTTP_RANGE = f'bytes={len(VIDEO_CONTENT)}-')
+
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(response['Content-Range'], f'bytes */{len(VIDEO_CONTENT)}')
+
+    def test_if_range_mismatch_serves_the_full_file(self):
+        """
+        If the file has changed since the client's partial download, the whole file should be sent
+        """
+        response = self.client.get(self.url, HTTP_RANGE = 'bytes=100-199', HTTP_IF_RANGE = '"stale-etag"')
+
+        self.assertEqual(response.status_code, 200)
+
+    def test_if_range_match_serves_the_range(self):
+        etag = self.client.get(self.url)['ETag']
+
+        response = self.client.get(self.url, HTTP_RANGE = 'bytes=100-199', HTTP_IF_RANGE = etag)
+
+        self.assertEqual(response.status_code, 206)
+
+    @override_settings(VIDEO_SENDFILE = 'x-accel-redirect', VIDEO_ACCEL_REDIRECT_PREFIX = '/protected/videos/')
+    def test_x_accel_redirect_offload(self):
+        response = self.client.get(self.url, HTTP_RANGE = 'bytes=100-199')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['X-Accel-Redirect'], f'/protected/videos/{self.video.filename}')
+        self.assertEqual(response.content, b'')
+
+    @override_settings(VIDEO_SENDFILE = 'x-sendfile')
+    def test_x_sendfile_offload(self):
+        response = self.client.get(self.url)
+
+        self.assertEqual(response['X-Sendfile'], self.video_path)
+
+    def test_missing_video_file_responds_with_404(self):
+        os.remove(self.video_path)
+
+        response = self.client.get(self.url)
+
+        self.assertEqual(response.status_code, 404)
+
+    def test_unpublished_video_cannot_be_streamed(self):
+        future_video = self.post_video(video = 'second', pub_date = timezone.now() + timedelta(days = 5))
+
+        response = self.client.get(reverse('vlog:stream', args = [future_video.id]))
+
+        self.assertEqual(response.status_code, 404)
+
+    def test_video_pages_use_the_stream_with_the_static_file_as_a_fallback(self):
+        for response in (
+            self.client.get(reverse('vlog:index')),
+            self.client.get(reverse('vlog:detail', args = [self.video.id])),
+        ):
+            content = response.content.decode()
+            self.assertIn(f'<source src="{self.url}" type="video/mp4">', content)
+            self.assertLess(content.index(self.url), content.index(self.video.get_static_filename()))
@@ -0,0 +1,66 @@
+from django.core.management import call_command
+from django.urls import reverse
+from django.utils import timezone
+from datetime import timedelta
+from io import StringIO
+from unittest.mock import patch
+from vlog.models import JugglingVideo
+from vlog.thumbnails import generate_poster, PosterError
+from .base import JugglingVideoSiteTest
+
+
+class PosterTest(JugglingVideoSiteTest):
+    """
+    Tests for poster frame extraction and the archive's poster rendering
+    """
+
+    @patch('vlog.thumbnails.os.makedirs')
+    @patch('vlog.thumbnails.run_ffmpeg')
+    @patch('vlog.thumbnails.find_video_file', return_value = '/srv/static/vlog/videos/five_ball_juggle_50_catches.mp4')
+    def test_generate_poster_extracts_a_frame_and_records_it(self, mock_find, mock_ffmpeg, mock_makedirs):
+        juggling_video = self.post_video()
+
+        generate_poster(juggling_video)
+        juggling_video.refresh_from_db()
+        arguments = mock_ffmpeg.call_args[0][0]
+
+        self.assertEqual(juggling_video.poster, 'vlog/videos/posters/five_ball_juggle_50_catches.jpg')
+        self.assertEqual(arguments[-1], '/srv/static/vlog/videos/posters/five_ball_juggle_50_catches.jpg')
+        self.assertEqual(arguments[arguments.index('-frames:v') + 1], '1')
+
+    @patch('vlog.thumbnails.find_video_file', return_value = None)
+    def test_generate_poster_for_a_missing_file_raises_an_error(self, mock_find):
+        with self.assertRaises(PosterError):
+            generate_poster(self.post_video())
+
+    @patch('vlog.management.commands.generate_posters.generate_poster', return_value = 'poster.jpg')
+    def test_command_only_processes_videos_without_posters(self, mock_generate):
+        new_video = self.post_video()
+        JugglingVideo.objects.create(filename = 'done.mp4', poster = 'vlog/videos/posters/done.jpg')
+
+        call_command('generate_posters', stdout = StringIO())
+
+        self.assertEqual([call[0][0] for call in mock_generate.call_args_list], [new_video])
+
+    def test_archive_shows_posters_without_preloading_the_videos(self):
+        """
+        Archive videos with a poster should not fetch any video data until they are played
+        """
+        older_video = self.post_video(video = 'first', pub_date = timezone.now() - timedelta(days = 5))
+        older_video.poster = 'vlog/videos/posters/five_ball_juggle_50_catches.jpg'
+        older_video.save()
+        self.post_video(video = 'second')
+
+        response = self.client.get(reverse('vlog:videos'))
+
+        self.assertContains(response, 'preload="none"')
+        self.assertContains(response, 'poster="/static/vlog/videos/posters/five_ball_juggle_50_catches.jpg"')
+        self.assertNotContains(response, 'preload="metadata"')
+
+    def test_archive_videos_without_posters_preload_metadata(self):
+        self.post_video(video = 'first', pub_date = timezone.now() - timedelta(days = 5))
+        self.post_video(video = 'second')
+
+        response = self.client.get(reverse('vlog:videos'))
+
+        self.assertContains(response, 'preload="metadata"')
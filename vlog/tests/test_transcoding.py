@@ -0,0 +1,106 @@
+from django.core.management import call_command, CommandError
+from django.urls import reverse
+from io import StringIO
+from unittest.mock import patch
+from vlog.models import JugglingVideo
+from vlog.transcoding import select_renditions, build_hls_arguments, transcode_to_hls, TranscodingError, SEGMENT_SECONDS
+from .base import JugglingVideoSiteTest
+
+
+SOURCE_PATH = '/srv/static/vlog/videos/five_ball_juggle_50_catches.mp4'
+STREAMS = [
+    {'codec_type': 'video', 'width': 1280, 'height': 720},
+    {'codec_type': 'audio'},
+]
+
+
+class HLSTranscodingTest(JugglingVideoSiteTest):
+    """
+    Tests for encoding videos as adaptive bitrate (HLS) streams
+    """
+
+    def test_renditions_are_no_taller_than_the_source(self):
+        renditions = select_renditions(1280, 720)
+
+        self.assertEqual([rendition[0] for rendition in renditions], ['720p', '480p', '360p'])
+        self.assertEqual(renditions[1][1:3], (854, 480))
+
+    def test_small_sources_still_get_the_smallest_rendition(self):
+        self.assertEqual([rendition[0] for rendition in select_renditions(320, 240)], ['360p'])
+
+    def test_hls_arguments_encode_every_rendition_in_one_pass(self):
+        arguments = build_hls_arguments('in.mp4', 'out', select_renditions(1280, 720))
+
+        self.assertEqual(arguments[arguments.index('-var_stream_map') + 1], 'v:0,a:0,name:720p v:1,a:1,name:480p v:2,a:2,name:360p')
+        self.assertEqual(arguments[arguments.index('-master_pl_name') + 1], 'master.m3u8')
+        self.assertIn('[0:v]split=3[v0][v1][v2]', arguments[arguments.index('-filter_complex') + 1])
+
+    def test_hls_arguments_force_keyframes_at_segment_boundaries(self):
+        """
+        Keyframes are placed by time rather than by frame count, so segments line up at any frame rate
+        """
+        arguments = build_hls_arguments('in.mp4', 'out', select_renditions(1280, 720))
+
+        self.assertEqual(arguments[arguments.index('-force_key_frames') + 1], f'expr:gte(t,n_forced*{SEGMENT_SECONDS})')
+        self.assertEqual(arguments[arguments.index('-hls_time') + 1], str(SEGMENT_SECONDS))
+        self.assertNotIn('-g', arguments)
+
+    def test_hls_arguments_for_silent_videos_do_not_map_audio(self):
+        arguments = build_hls_arguments('in.mp4', 'out', select_renditions(1280, 720), has_audio = False)
+
+        self.assertNotIn('a:0', arguments)
+        self.assertEqual(arguments[arguments.index('-var_stream_map') + 1], 'v:0,name:720p v:1,name:480p v:2,name:360p')
+
+    @patch('vlog.transcoding.os.makedirs')
+    @patch('vlog.transcoding.run_ffmpeg')
+    @patch('vlog.transcoding.probe_streams', return_value = STREAMS)
+    @patch('vlog.transcoding.find_video_file', return_value = SOURCE_PATH)
+    def test_transcoding_records_renditions_and_master_playlist(self, mock_find, mock_probe, mock_ffmpeg, mock_makedirs):
+        juggling_video = self.post_video()
+
+        transcode_to_hls(juggling_video)
+        juggling_video.refresh_from_db()
+        arguments = mock_ffmpeg.call_args[0][0]
+
+        self.assertEqual(juggling_video.hls_playlist, 'vlog/videos/hls/five_ball_juggle_50_catches/master.m3u8')
+        self.assertEqual(
+            list(juggling_video.renditions.values_list('name', 'height', 'playlist')),
+            [
+                ('720p', 720, 'vlog/videos/hls/five_ball_juggle_50_catches/720p/index.m3u8'),
+                ('480p', 480, 'vlog/videos/hls/five_ball_juggle_50_catches/480p/index.m3u8'),
+                ('360p', 360, 'vlog/videos/hls/five_ball_juggle_50_catches/360p/index.m3u8'),
+            ]
+        )
+        self.assertEqual(arguments[-1], '/srv/static/vlog/videos/hls/five_ball_juggle_50_catches/%v/index.m3u8')
+
+    @patch('vlog.transcoding.find_video_file', return_value = None)
+    def test_transcoding_a_missing_file_raises_an_error(self, mock_find):
+        with self.assertRaises(TranscodingError):
+            transcode_to_hls(self.post_video())
+
+    @patch('vlog.management.commands.transcode_hls.transcode_to_hls')
+    def test_command_skips_videos_that_already_have_a_stream(self, mock_transcode):
+        mock_transcode.return_value = []
+        new_video = self.post_video(video = 'first')
+        JugglingVideo.objects.create(filename = 'done.mp4', hls_playlist = 'vlog/videos/hls/done/master.m3u8')
+
+        call_command('transcode_hls', stdout = StringIO())
+
+        self.assertEqual([call[0][0] for call in mock_transcode.call_args_list], [new_video])
+
+    @patch('vlog.management.commands.transcode_hls.transcode_to_hls', side_effect = TranscodingError('no file'))
+    def test_command_reports_failures(self, mock_transcode):
+        self.post_video()
+
+        with self.assertRaises(CommandError):
+            call_command('transcode_hls', stdout = StringIO(), stderr = StringIO())
+
+    def test_video_pages_prefer_the_hls_stream(self):
+        juggling_video = self.post_video()
+        juggling_video.hls_playlist = 'vlog/videos/hls/five_ball_juggle_50_catches/master.m3u8'
+        juggling_video.save()
+
+        content = self.client.get(reverse('vlog:detail', args = [juggling_video.id])).content.decode()
+
+        self.assertIn('type="application/vnd.apple.mpegurl"', content)
+        self.assertLess(content.index('master.m3u8'), content.index(reverse('vlog:stream', args = [juggling_video.id])))
@@ -1,9 +1,11 @@
 from os import environ as os_environ
-from django.test import TestCase
+from django.core import mail
+from django.test import TestCase, Client
 from django.urls import reverse
 from django.utils import timezone
 import vlog.views
-from vlog.models import JugglingVideo, VideoComment, Acknowledgement
+from vlog.cache import invalidate_comment_threads
+from vlog.models import JugglingVideo, VideoComment, Acknowledgement, OutboundEmail
 from vlog.forms import CommentForm, EMPTY_COMMENT_ERROR, DUPLICATE_COMMENT_ERROR
 from datetime import timedelta
 from .base import JugglingVideoSiteTest
@@ -416,6 +418,38 @@ class VideoDetailViewTest(JugglingVideoSiteTest):
 
         self.assertIsInstance(response.context['form'], CommentForm)
 
+    def test_detail_view_passes_approved_comments_and_count_to_template(self):
+        """
+        The approved comments should be passed to the template, oldest first, along with their count
+        """
+        juggling_video = self.post_video()
+        first_comment = VideoComment.objects.create(text = 'First comment!', video = juggling_video)
+        VideoComment.objects.create(text = 'Inappropriate comment', video = juggling_video, is_approved = False)
+        second_comment = VideoComment.objects.create(text = 'Nice video!', video = juggling_video)
+
+        response = self.client.get(reverse('vlog:detail', args = [juggling_video.id]))
+
+        self.assertEqual(list(response.context['comments']), [first_comment, second_comment])
+        self.assertEqual(response.context['video'].approved_comment_count, 2)
+
+    def test_detail_view_query_count_does_not_depend_on_number_of_comments(self):
+        """
+        The detail page should fetch its ETag, the video and its comments with one query each, however many comments there are
+        """
+        juggling_video = self.post_video()
+        # Looks up (and caches) the next scheduled publication date
+        self.client.get(reverse('vlog:detail', args = [juggling_video.id]))
+
+        for number_of_comments in (0, 1, 10):
+            for i in range(number_of_comments):
+                VideoComment.objects.create(text = f'Comment {number_of_comments}-{i}', video = juggling_video)
+
+            # A first-time visitor, so that the page is rendered rather than served from the cache,
+            # with the comment thread retired so that it is rendered too
+            invalidate_comment_threads([juggling_video.id])
+            with self.assertNumQueries(3):
+                Client().get(reverse('vlog:detail', args = [juggling_video.id]))
+
     def test_duplicate_comment_validation_errors_are_displayed_on_video_detail_page(self):
         """
         An error message should be displayed on the video detail page if a comment is duplicated
@@ -492,6 +526,16 @@ class VideosListViewTest(JugglingVideoSiteTest):
         self.assertContains(response, older_video.filename)
         self.assertContains(response, oldest_video.filename)
 
+    def test_videos_page_displays_comment_counts(self):
+        older_video = self.post_video(video = 'first', pub_date = timezone.now() - timedelta(days = 5))
+        self.post_video(video = 'second')
+        VideoComment.objects.create(text = 'Nice!', video = older_video)
+        VideoComment.objects.create(text = 'Spam', video = older_video, is_approved = False)
+
+        response = self.client.get(reverse('vlog:videos'))
+
+        self.assertContains(response, '<span class="comment_count">1 comment</span>', html = True)
+
     def test_videos_page_not_affected_by_videos_with_a_publication_date_in_the_future(self):
         """
         The videos page should ignore videos with a publication date in the future
@@ -518,6 +562,99 @@ class VideosListViewTest(JugglingVideoSiteTest):
         """
         self.check_context_dict_contains_correct_selected_item_for_view('vlog:videos', 'Videos')
 
+    def post_archive(self, number_of_videos):
+        """
+        Creates a number of published videos, one day apart, and returns them newest first
+        """
+        videos = [
+            JugglingVideo.objects.create(filename = f'video_{i}.mp4', title = f'Video {i}', pub_date = timezone.now() - timedelta(days = i))
+            for i in range(number_of_videos)
+        ]
+
+        return videos
+
+    @patch('vlog.views.ARCHIVE_PAGE_SIZE', 2)
+    def test_videos_page_only_displays_one_page_of_the_archive(self):
+        """
+        The first page of the archive should skip the homepage video and stop after a page of videos
+        """
+        videos = self.post_archive(5)
+
+        response = self.client.get(reverse('vlog:videos'))
+
+        self.assertEqual(response.context['videos_list'], videos[1:3])
+        self.assertFalse(response.context['page'].has_newer)
+        self.assertTrue(response.context['page'].has_older)
+
+    @patch('vlog.views.ARCHIVE_PAGE_SIZE', 2)
+    def test_older_link_leads_to_the_next_page_of_the_archive(self):
+        """
+        Following the older videos link should display the videos after the end of the current page
+        """
+        videos = self.post_archive(5)
+
+        first_page = self.client.get(reverse('vlog:videos'))
+        older_cursor = first_page.context['page'].older_cursor
+        second_page = self.client.get(reverse('vlog:videos'), {'before': older_cursor})
+
+        self.assertContains(first_page, f'?before={older_cursor}')
+        self.assertEqual(second_page.context['videos_list'], videos[3:5])
+        self.assertFalse(second_page.context['page'].has_older)
+        self.assertTrue(second_page.context['page'].has_newer)
+
+    @patch('vlog.views.ARCHIVE_PAGE_SIZE', 2)
+    def test_newer_link_leads_back_to_the_previous_page_of_the_archive(self):
+        """
+        Following the newer videos link should display the previous page, without the homepage video
+        """
+        videos = self.post_archive(5)
+
+        older_cursor = self.client.get(reverse('vlog:videos')).context['page'].older_cursor
+        second_page = self.client.get(reverse('vlog:videos'), {'before': older_cursor})
+        newer_cursor = second_page.context['page'].newer_cursor
+        first_page = self.client.get(reverse('vlog:videos'), {'after': newer_cursor})
+
+        self.assertContains(second_page, f'?after={newer_cursor}')
+        self.assertEqual(first_page.context['videos_list'], videos[1:3])
+        self.assertFalse(first_page.context['page'].has_newer)
+
+    @patch('vlog.views.ARCHIVE_PAGE_SIZE', 2)
+    def test_deep_archive_pages_use_a_constant_number_of_queries(self):
+        """
+        Seeking from a cursor should not depend on how far into the archive the page is
+        """
+        videos = self.post_archive(8)
+        cursor = self.client.get(reverse('vlog:videos')).context['page'].older_cursor
+
+        while cursor:
+            with self.assertNumQueries(2):
+                response = self.client.get(reverse('vlog:videos'), {'before': cursor})
+            cursor = response.context['page'].older_cursor
+
+    def test_invalid_archive_cursor_responds_with_404(self):
+        """
+        A malformed cursor should not cause a server error
+        """
+        response = self.client.get(reverse('vlog:videos'), {'before': 'not-a-cursor'})
+
+        self.assertEqual(response.status_code, 404)
+
+    @patch('vlog.views.ARCHIVE_PAGE_SIZE', 2)
+    def test_videos_more_returns_the_next_page_as_a_json_fragment(self):
+        """
+        The infinite scroll endpoint should return the rendered videos and the cursor for the page after them
+        """
+        videos = self.post_archive(5)
+        cursor = self.client.get(reverse('vlog:videos')).context['page'].older_cursor
+
+        response = self.client.get(reverse('vlog:videos_more'), {'before': cursor})
+        data = response.json()
+
+        self.assertIn(videos[3].filename, data['html'])
+        self.assertIn(videos[4].filename, data['html'])
+        self.assertNotIn(videos[2].filename, data['html'])
+        self.assertIsNone(data['older_cursor'])
+
 
 class LearnViewTest(JugglingVideoSiteTest):
     """
@@ -637,13 +774,12 @@ class HistoryViewTest(JugglingVideoSiteTest):
         """
         self.check_context_dict_contains_correct_selected_item_for_view('vlog:history', 'About')
 
-@patch('vlog.views.send_mail')
 class ContactViewTest(JugglingVideoSiteTest):
     """
     Tests for the Contact page
     """
 
-    def test_contact_view_uses_correct_template(self, mock_send_mail):
+    def test_contact_view_uses_correct_template(self):
         """
         Test that this view uses the correct template
         """
@@ -651,7 +787,7 @@ class ContactViewTest(JugglingVideoSiteTest):
 
         self.assertTemplateUsed(response, 'vlog/contact.html')
 
-    def test_contact_post_redirects_to_contact_page(self, mock_send_mail):
+    def test_contact_post_redirects_to_contact_page(self):
         """
         Test that the page redirects to the contact form after the form is submitted
         """
@@ -662,22 +798,24 @@ class ContactViewTest(JugglingVideoSiteTest):
 
         self.assertRedirects(response, reverse('vlog:contact'))
 
-    def test_contact_post_sends_email(self, mock_send_mail):
+    @patch.dict('os.environ', {'OUTBOUND_EMAIL_ADDRESS': 'website@example.com', 'EMAIL_ADDRESS': 'me@example.com'})
+    def test_contact_post_queues_email(self):
         """
-        Uses mocks to check that a POST request to the contact form calls send_mail in the correct manner
+        A POST request to the contact form should add the email to the outbound queue without sending it
         """
         self.client.post(reverse('vlog:contact'), data = {
             'message': 'Love the website!',
             'sender_name': 'Anonymous',
         })
 
-        self.assertTrue(mock_send_mail.called)
-        (subject, body, from_email, to_list), kwargs = mock_send_mail.call_args
-        self.assertEqual(subject, "A message from a website visitor")
-        self.assertEqual(from_email, os_environ.get('OUTBOUND_EMAIL_ADDRESS'))
-        self.assertEqual(to_list, [os_environ.get('EMAIL_ADDRESS')])
+        queued_email = OutboundEmail.objects.get()
+        self.assertEqual(queued_email.subject, "A message from a website visitor")
+        self.assertEqual(queued_email.from_email, 'website@example.com')
+        self.assertEqual(queued_email.recipient_list, ['me@example.com'])
+        self.assertIsNone(queued_email.sent_at)
+        self.assertEqual(mail.outbox, [])
 
-    def test_contact_post_includes_form_data_in_email(self, mock_send_mail):
+    def test_contact_post_includes_form_data_in_email(self):
         """
         The contact form's sender and message fields should be included in the body of the email that is sent
         """
@@ -686,11 +824,11 @@ class ContactViewTest(JugglingVideoSiteTest):
             'message': 'Great website!',
         })
 
-        (subject, body, from_email, to_list), kwargs = mock_send_mail.call_args
+        body = OutboundEmail.objects.get().body
         self.assertIn('From: A juggling fan', body)
         self.assertIn('Message: Great website!', body)
 
-    def test_contact_form_submission_adds_success_message(self, mock_send_mail):
+    def test_contact_form_submission_adds_success_message(self):
         """
         A success message should be displayed when the contact form is submitted
         """
@@ -703,7 +841,7 @@ class ContactViewTest(JugglingVideoSiteTest):
         self.assertEqual(message.message, 'Your message has been sent!')
         self.assertEqual(message.tags, 'success')
 
-    def test_contact_form_submission_without_message_adds_warning_message(self, mock_send_mail):
+    def test_contact_form_submission_without_message_adds_warning_message(self):
         """
         A warning message should be displayed when the contact form is submitted with a blank message field
         """
@@ -716,14 +854,14 @@ class ContactViewTest(JugglingVideoSiteTest):
         self.assertEqual(message.message, 'Please enter a message.')
         self.assertEqual(message.tags, 'warning')
 
-    def test_contact_post_without_message_does_not_send_email(self, mock_send_mail):
+    def test_contact_post_without_message_does_not_send_email(self):
         """
-        Uses mocks to check that a POST request to the contact form without a message property does not call send_mail
+        A POST request to the contact form without a message property should not queue an email
         """
         self.client.post(reverse('vlog:contact'), data = {
             'message': '',
             'sender_name': 'Anonymous',
         })
 
-        self.assertFalse(mock_send_mail.called)
+        self.assertFalse(OutboundEmail.objects.exists())
 
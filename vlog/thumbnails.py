@@ -0,0 +1,50 @@
+"""
+Poster frames for juggling videos, so that list pages can show an image instead of loading each video
+"""
+import os
+from vlog.media import find_video_file, get_output_path, run_ffmpeg
+
+
+POSTER_TIME = '00:00:01'
+POSTER_WIDTH = 640
+
+
+class PosterError(Exception):
+    pass
+
+
+def get_poster_static_path(video):
+    static_dir, filename = os.path.split(video.get_static_filename())
+
+    return f'{static_dir}/posters/{os.path.splitext(filename)[0]}.jpg'
+
+
+def build_poster_arguments(source, output):
+    return [
+        '-ss', POSTER_TIME,
+        '-i', source,
+        '-frames:v', '1',
+        '-vf', f'scale={POSTER_WIDTH}:-2',
+        '-q:v', '4',
+        output,
+    ]
+
+
+def generate_poster(video):
+    """
+    Extracts a frame from the video as a JPEG poster (stored in posters/ beside the video) and records it on the model
+    """
+    source = find_video_file(video)
+    if source is None:
+        raise PosterError(f'Could not find the video file for {video.filename}')
+
+    poster = get_poster_static_path(video)
+    output = get_output_path(source, video.get_static_filename(), poster)
+    os.makedirs(os.path.dirname(output), exist_ok = True)
+
+    run_ffmpeg(build_poster_arguments(source, output))
+
+    video.poster = poster
+    video.save(update_fields = ['poster'])
+
+    return poster
@@ -0,0 +1,131 @@
+"""
+Adaptive bitrate (HLS) transcoding of juggling videos with a locally installed ffmpeg
+
+The renditions and master playlist for a video are written next to its MP4, in hls/<video name>/,
+so that they are served from the same static directory as the original file.
+"""
+import os
+from django.db import transaction
+from vlog.media import find_video_file, get_output_path, run_ffmpeg, probe_streams
+from vlog.models import VideoRendition
+
+
+# (name, height, video kbit/s, audio kbit/s)
+RENDITIONS = [
+    ('1080p', 1080, 5000, 192),
+    ('720p', 720, 2800, 128),
+    ('480p', 480, 1400, 128),
+    ('360p', 360, 800, 96),
+]
+SEGMENT_SECONDS = 6
+MASTER_PLAYLIST_NAME = 'master.m3u8'
+
+
+class TranscodingError(Exception):
+    pass
+
+
+def select_renditions(source_width, source_height):
+    """
+    Returns the renditions (with widths that keep the source's aspect ratio) that are no taller than the source
+    The smallest rendition is always included
+    """
+    renditions = [rendition for rendition in RENDITIONS if rendition[1] <= source_height] or RENDITIONS[-1:]
+
+    return [
+        (name, 2 * round(source_width * height / source_height / 2), height, video_bitrate, audio_bitrate)
+        for name, height, video_bitrate, audio_bitrate in renditions
+    ]
+
+
+def build_hls_arguments(source, output_dir, renditions, has_audio = True):
+    """
+    Returns the ffmpeg arguments that encode all of the renditions, and a master playlist, in a single pass
+    """
+    split_outputs = ''.join(f'[v{i}]' for i in range(len(renditions)))
+    filters = [f'[0:v]split={len(renditions)}{split_outputs}'] + [
+        f'[v{i}]scale={width}:{height}[v{i}out]' for i, (name, width, height, *bitrates) in enumerate(renditions)
+    ]
+    arguments = ['-i', source, '-filter_complex', ';'.join(filters)]
+    stream_map = []
+
+    for i, (name, width, height, video_bitrate, audio_bitrate) in enumerate(renditions):
+        arguments += [
+            '-map', f'[v{i}out]',
+            f'-c:v:{i}', 'libx264',
+            f'-b:v:{i}', f'{video_bitrate}k',
+            f'-maxrate:v:{i}', f'{int(video_bitrate * 1.07)}k',
+            f'-bufsize:v:{i}', f'{int(video_bitrate * 1.5)}k',
+        ]
+        if has_audio:
+            arguments += ['-map', 'a:0', f'-c:a:{i}', 'aac', f'-b:a:{i}', f'{audio_bitrate}k']
+            stream_map.append(f'v:{i},a:{i},name:{name}')
+        else:
+            stream_map.append(f'v:{i},name:{name}')
+
+    arguments += [
+        # Keyframes on segment boundaries (whatever the frame rate) so that players can switch renditions between segments
+        '-preset', 'veryfast', '-force_key_frames', f'expr:gte(t,n_forced*{SEGMENT_SECONDS})', '-sc_threshold', '0',
+        '-f', 'hls',
+        '-hls_time', str(SEGMENT_SECONDS),
+        '-hls_playlist_type', 'vod',
+        '-hls_flags', 'independent_segments',
+        '-hls_segment_filename', os.path.join(output_dir, '%v', 'segment_%03d.ts'),
+        '-master_pl_name', MASTER_PLAYLIST_NAME,
+        '-var_stream_map', ' '.join(stream_map),
+        os.path.join(output_dir, '%v', 'index.m3u8'),
+    ]
+
+    return arguments
+
+
+def get_hls_directory(video):
+    """
+    Returns the static path of the directory that holds a video's HLS files
+    """
+    static_dir, filename = os.path.split(video.get_static_filename())
+
+    return f'{static_dir}/hls/{os.path.splitext(filename)[0]}'
+
+
+def transcode_to_hls(video):
+    """
+    Encodes the video's renditions and records them (and the master playlist) on the model
+    Returns the list of VideoRendition objects
+    """
+    source = find_video_file(video)
+    if source is None:
+        raise TranscodingError(f'Could not find the video file for {video.filename}')
+
+    streams = probe_streams(source)
+    video_stream = next((stream for stream in streams if stream.get('codec_type') == 'video'), None)
+    if video_stream is None:
+        raise TranscodingError(f'{video.filename} does not contain a video stream')
+
+    has_audio = any(stream.get('codec_type') == 'audio' for stream in streams)
+    renditions = select_renditions(int(video_stream['width']), int(video_stream['height']))
+    hls_directory = get_hls_directory(video)
+    output_dir = get_output_path(source, video.get_static_filename(), hls_directory)
+    for name, *details in renditions:
+        os.makedirs(os.path.join(output_dir, name), exist_ok = True)
+
+    run_ffmpeg(build_hls_arguments(source, output_dir, renditions, has_audio))
+
+    with transaction.atomic():
+        video.renditions.all().delete()
+        created = VideoRendition.objects.bulk_create([
+            VideoRendition(
+                video = video,
+                name = name,
+                width = width,
+                height = height,
+                video_bitrate = video_bitrate,
+                audio_bitrate = audio_bitrate if has_audio else 0,
+                playlist = f'{hls_directory}/{name}/index.m3u8',
+            )
+            for name, width, height, video_bitrate, audio_bitrate in renditions
+        ])
+        video.hls_playlist = f'{hls_directory}/{MASTER_PLAYLIST_NAME}'
+        video.save(update_fields = ['hls_playlist'])
+
+    return created
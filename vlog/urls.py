@@ -21,7 +21,9 @@ app_name = 'vlog'
 urlpatterns = [
     path('', views.index, name = 'index'),
     path('videos/', views.videos_list, name = 'videos'),
+    path('videos/more/', views.videos_more, name = 'videos_more'),
     path('videos/<int:jugglingvideo_id>/', views.video_detail, name = 'detail'),
+    path('videos/<int:jugglingvideo_id>/stream/', views.video_stream, name = 'stream'),
     path('learn/', views.learn, name = 'learn'),
     path('about/', views.about, name = 'about'),
     path('about/thanks/', views.thanks, name = 'thanks'),
@@ -1,14 +1,27 @@
 from os import environ as os_environ
 from django.shortcuts import render, redirect, reverse, get_object_or_404 
-from django.utils import timezone
+from django.http import JsonResponse, Http404
+from django.template.loader import render_to_string
 from django.core.exceptions import ValidationError
-from django.core.mail import send_mail
 from django.contrib import messages
+from jvlog.routers import read_from_replica
 from vlog.models import JugglingVideo, VideoComment, Acknowledgement
 from vlog.forms import CommentForm, EMPTY_COMMENT_ERROR
+from vlog.mail import enqueue_mail
+from vlog.ratelimit import rate_limit_posts
+from vlog.pagination import ARCHIVE_PAGE_SIZE, get_archive_page
+from vlog.media import find_video_file
+from vlog.streaming import serve_file_range
+from vlog.cache import (
+    cache_published_page, conditional_page, published_videos_validators, video_detail_validators,
+    get_comment_version, COMMENT_THREAD_TIMEOUT,
+)
 
 # Create your views here.
 
+@read_from_replica
+@conditional_page(published_videos_validators)
+@cache_published_page
 def index(request):
 
     return render(request, 'vlog/index.html', {
@@ -21,19 +34,49 @@ def index_redirect(request):
     return redirect(reverse('vlog:index'))
 
 
+def get_requested_archive_page(request):
+    return get_archive_page(
+        JugglingVideo.published.for_listing(),
+        before = request.GET.get('before'),
+        after = request.GET.get('after'),
+        page_size = ARCHIVE_PAGE_SIZE,
+    )
+
+
+@read_from_replica
+@conditional_page(published_videos_validators)
+@cache_published_page
 def videos_list(request):
+    page = get_requested_archive_page(request)
 
     return render(request, 'vlog/videos.html', {
         'selected': 'Videos',
-        'videos_list': JugglingVideo.get_archive_videos()
+        'videos_list': page.videos,
+        'page': page,
+    })
+
+
+@read_from_replica
+@conditional_page(published_videos_validators)
+@cache_published_page
+def videos_more(request):
+    """
+    Returns the next page of the archive as an HTML fragment (for infinite scrolling)
+    """
+    page = get_requested_archive_page(request)
+
+    return JsonResponse({
+        'html': render_to_string('vlog/archive_videos.html', {'videos_list': page.videos}, request),
+        'older_cursor': page.older_cursor,
     })
 
 
+@rate_limit_posts('comment')
+@read_from_replica
+@conditional_page(video_detail_validators)
+@cache_published_page
 def video_detail(request, jugglingvideo_id):
-    juggling_video = get_object_or_404(
-        JugglingVideo.objects.filter(pub_date__lte = timezone.now()),
-        id = jugglingvideo_id
-    )
+    juggling_video = get_object_or_404(JugglingVideo.published, id = jugglingvideo_id)
     form = CommentForm(for_video = juggling_video)
 
     if request.method == 'POST':
@@ -49,11 +92,25 @@ def video_detail(request, jugglingvideo_id):
         {
             'selected': 'Videos',
             'video': juggling_video,
+            # Only evaluated if the cached comment thread has to be rendered again
+            'comments': juggling_video.get_approved_comments(),
+            'comment_version': get_comment_version(juggling_video.id),
+            'comment_thread_timeout': COMMENT_THREAD_TIMEOUT,
             'form': form,
         }
     )
 
 
+def video_stream(request, jugglingvideo_id):
+    juggling_video = get_object_or_404(JugglingVideo.published.for_listing(), id = jugglingvideo_id)
+    path = find_video_file(juggling_video)
+
+    if path is None:
+        raise Http404('Video file not found')
+
+    return serve_file_range(request, path, juggling_video.filename)
+
+
 def learn(request):
     return render(request, 'vlog/learn.html', {
         'selected': 'Learn',
@@ -66,6 +123,7 @@ def about(request):
     })
 
 
+@read_from_replica
 def thanks(request):
     acknowledgements = Acknowledgement.objects.all()
 
@@ -80,11 +138,12 @@ def history(request):
         'selected': 'About',
     })
 
+@rate_limit_posts('contact')
 def contact(request):
     if request.method == 'POST':
         email_body = f"From: {request.POST['sender_name']}\nMessage: {request.POST['message']}"
         if request.POST['message']:
-            send_mail('A message from a website visitor', email_body, os_environ.get('OUTBOUND_EMAIL_ADDRESS'), [os_environ.get('EMAIL_ADDRESS')])
+            enqueue_mail('A message from a website visitor', email_body, os_environ.get('OUTBOUND_EMAIL_ADDRESS'), [os_environ.get('EMAIL_ADDRESS')])
             messages.success(request, 'Your message has been sent!')
         else:
             messages.warning(request, 'Please enter a message.')